@@ -1,16 +1,133 @@
+import argparse
 import gc
-import torch
-from editor.editor_docx import revisar_docx_otimizado
-
-# Lista de arquivos a serem revisados
-arquivos_para_revisar = [
-                        "Divine Emperor of Death 2001-2100.docx",
-                        ]
-
-# Executa revisão sequencialmente
-for nome_arquivo in arquivos_para_revisar:
-    revisar_docx_otimizado(nome_arquivo)
-    # Liberação de memória após o arquivo
-    gc.collect()    
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
+import os
+import time
+import traceback
+
+from editor.editor_docx import revisar_docx_otimizado, revisar_varios_docx
+from editor.fila_trabalhos import CONCLUIDO, EXECUTANDO, FALHOU, FilaTrabalhos
+from editor.planejamento import planejar
+from modelo.carregador import liberar_memoria
+from processamento.agendador import AgendadorBlocos
+from processamento.trabalhadores import PoolTrabalhadores
+from utils.config import FILA_IDADE_MINIMA, FILA_INTERVALO_OBSERVACAO, TRABALHADORES
+
+
+def processar_pendentes(fila: FilaTrabalhos, agendador: AgendadorBlocos, intercalar: bool = False) -> None:
+    """
+    Revisa todos os trabalhos pendentes da fila, um atrás do outro, com o mesmo modelo carregado.
+
+    Args:
+        fila (FilaTrabalhos): Fila persistente de trabalhos.
+        agendador (AgendadorBlocos): Agendador (e backend) compartilhado entre os arquivos.
+        intercalar (bool): Se True, blocos de arquivos diferentes dividem os mesmos lotes.
+    """
+    pendentes = fila.pendentes()
+    if not pendentes:
+        return
+
+    if intercalar:
+        for nome in pendentes:
+            fila.marcar(nome, EXECUTANDO)
+        try:
+            revisar_varios_docx(pendentes, agendador=agendador, ao_concluir=lambda nome: fila.marcar(nome, CONCLUIDO))
+        except Exception as erro:
+            traceback.print_exc()
+            for nome in pendentes:
+                if fila.trabalhos[nome]["estado"] == EXECUTANDO:
+                    fila.marcar(nome, FALHOU, erro=repr(erro))
+        finally:
+            gc.collect()
+            liberar_memoria()
+        return
+
+    for nome in pendentes:
+        print(f"\n[🗂️] Trabalho: {nome}")
+        fila.marcar(nome, EXECUTANDO)
+        try:
+            revisar_docx_otimizado(nome, agendador=agendador)
+            fila.marcar(nome, CONCLUIDO)
+        except Exception as erro:
+            # O checkpoint guarda os capítulos prontos; a próxima tentativa retoma dali
+            traceback.print_exc()
+            fila.marcar(nome, FALHOU, erro=repr(erro))
+        finally:
+            # Liberação de memória após o arquivo (o modelo continua carregado)
+            gc.collect()
+            liberar_memoria()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Revisa os .docx de dados/entrada com o modelo configurado.")
+    parser.add_argument("arquivos", nargs="*",
+                        help="arquivos de dados/entrada a enfileirar (padrão: todos os .docx novos)")
+    parser.add_argument("--observar", action="store_true",
+                        help="continua observando dados/entrada e revisa os arquivos que chegarem")
+    parser.add_argument("--intervalo", type=float, default=FILA_INTERVALO_OBSERVACAO,
+                        help="segundos entre varreduras no modo --observar")
+    parser.add_argument("--intercalar", action="store_true",
+                        help="mistura blocos de vários arquivos nos mesmos lotes de geração")
+    parser.add_argument("--reprocessar-falhas", action="store_true",
+                        help="recoloca na fila os trabalhos que falharam")
+    parser.add_argument("--trabalhadores", type=int, default=TRABALHADORES,
+                        help="processos de revisão em paralelo, cada um com o seu modelo (GPU ou grupo de núcleos)")
+    parser.add_argument("--status", action="store_true", help="mostra a fila e sai")
+    parser.add_argument("--planejar", action="store_true",
+                        help="estima o tempo de revisão dos arquivos (sem carregar o modelo) e sai")
+    parser.add_argument("--detalhar", action="store_true", help="com --planejar, mostra cada capítulo")
+    args = parser.parse_args()
+
+    fila = FilaTrabalhos()
+
+    if args.status:
+        for nome, trabalho in sorted(fila.trabalhos.items()):
+            erro = f" ({trabalho['erro']})" if trabalho["erro"] else ""
+            print(f"{trabalho['estado']:<10} {nome}{erro}")
+        print(fila.resumo())
+        return
+
+    if args.planejar:
+        # Só lê e segmenta: não mexe na fila nem carrega o modelo
+        for nome in args.arquivos:
+            if not os.path.isfile(os.path.join(fila.pasta_entrada, nome)):
+                parser.error(f"arquivo não encontrado em {fila.pasta_entrada}: {nome}")
+        nomes = args.arquivos or sorted(set(fila.pendentes()) | set(fila.novos(idade_minima=0)))
+        if not nomes:
+            print("[✅] Nada a revisar.")
+            return
+        planejar(nomes, detalhar=args.detalhar, pasta_entrada=fila.pasta_entrada)
+        return
+
+    if args.reprocessar_falhas:
+        for nome in fila.reprocessar_falhas():
+            print(f"[🔁] Reenfileirado: {nome}")
+
+    for nome in args.arquivos:
+        if not os.path.isfile(os.path.join(fila.pasta_entrada, nome)):
+            parser.error(f"arquivo não encontrado em {fila.pasta_entrada}: {nome}")
+        fila.adicionar(nome)
+    if not args.arquivos:
+        # Fora do modo --observar, os arquivos já estão completos na pasta
+        fila.escanear(idade_minima=0 if not args.observar else FILA_IDADE_MINIMA)
+
+    # Um único agendador (e backend) para todos os arquivos: o modelo é carregado uma vez
+    # (com --trabalhadores, uma vez por processo trabalhador)
+    agendador = PoolTrabalhadores(args.trabalhadores) if args.trabalhadores > 1 else AgendadorBlocos()
+
+    try:
+        while True:
+            processar_pendentes(fila, agendador, intercalar=args.intercalar)
+            if not args.observar:
+                break
+            time.sleep(args.intervalo)
+            for nome in fila.escanear():
+                print(f"[📥] Novo arquivo na fila: {nome}")
+    finally:
+        if isinstance(agendador, PoolTrabalhadores):
+            agendador.fechar()
+
+    print(f"\n[🗂️] Fila: {fila.resumo()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark da decodificação assistida por busca no prompt.
+
+Gera os mesmos lotes de blocos com o `BackendHF` normal e com
+`assistida=True` e compara tokens/s, forwards poupados e a taxa de aceitação
+do rascunho. O ganho depende de quanto a resposta copia da entrada: com um
+modelo que revisa de verdade (ou um modelo pequeno treinado para copiar) a
+aceitação é alta; com pesos aleatórios ela é zero e o modo assistido só
+paga o custo da verificação.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_assistida --modelo Qwen/Qwen2.5-0.5B-Instruct --blocos 16 --lote 4
+    python -m benchmarks.bench_assistida --modelo /caminho/modelo --rascunho 5 10 20 --dispositivo cpu
+"""
+import argparse
+import time
+
+from benchmarks.bench_prefixo_kv import gerar_blocos
+from modelo.carregador import BackendHF
+from processamento.revisor_llm import calcular_orcamento, montar_prompt
+from utils.config import ASSISTIDA_TOKENS_RASCUNHO, MODEL_NAME
+
+
+def medir(backend: BackendHF, prompts: list, orcamentos: list, lote: int, temperatura: float) -> dict:
+    """
+    Gera todos os prompts em lotes de `lote` e soma tokens, rascunho e tempo.
+    """
+    gerados = propostos = aceitos = 0
+    inicio = time.perf_counter()
+    for i in range(0, len(prompts), lote):
+        for saida in backend.gerar(prompts[i:i + lote], max_new_tokens=orcamentos[i:i + lote], temperature=temperatura):
+            gerados += saida.tokens_gerados
+            propostos += saida.rascunho_propostos
+            aceitos += saida.rascunho_aceitos
+    if backend._torch.cuda.is_available():
+        backend._torch.cuda.synchronize()
+    segundos = time.perf_counter() - inicio
+    return {"segundos": segundos, "gerados": gerados, "tokens_por_segundo": gerados / segundos,
+            "propostos": propostos, "aceitos": aceitos}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modelo", default=MODEL_NAME)
+    parser.add_argument("--blocos", type=int, default=16)
+    parser.add_argument("--lote", type=int, default=4)
+    parser.add_argument("--tokens", type=int, default=None, help="orçamento fixo (padrão: calcular_orcamento do bloco)")
+    parser.add_argument("--temperatura", type=float, default=0.35)
+    parser.add_argument("--rascunho", type=int, nargs="+", default=[ASSISTIDA_TOKENS_RASCUNHO],
+                        help="tamanhos de rascunho a comparar")
+    parser.add_argument("--dispositivo", default="auto")
+    args = parser.parse_args()
+
+    backend = BackendHF(model_id=args.modelo, batch_size=args.lote, dispositivo=args.dispositivo)
+    blocos = gerar_blocos(args.blocos)
+    prompts = [montar_prompt(b) for b in blocos]
+    orcamentos = [args.tokens or calcular_orcamento(len(backend.tokenizer(b, add_special_tokens=False).input_ids))
+                  for b in blocos]
+
+    # Aquecimento dos dois caminhos (inclui o KV do prefixo)
+    for assistida in (False, True):
+        backend.assistida = assistida
+        backend.gerar(prompts[:args.lote], max_new_tokens=4, temperature=args.temperatura)
+
+    backend.assistida = False
+    base = medir(backend, prompts, orcamentos, args.lote, args.temperatura)
+    print(f"Modelo: {args.modelo} | {args.blocos} blocos | lote {args.lote} | {base['gerados']:,} tokens gerados")
+    print(f"{'modo':<16} {'tempo':>8} {'tokens/s':>10} {'aceitação':>10} {'ganho':>7}")
+    print(f"{'normal':<16} {base['segundos']:>7.2f}s {base['tokens_por_segundo']:>10.1f} {'-':>10} {'1.00x':>7}")
+
+    backend.assistida = True
+    for tamanho in args.rascunho:
+        backend.tamanho_rascunho = tamanho
+        r = medir(backend, prompts, orcamentos, args.lote, args.temperatura)
+        taxa = r["aceitos"] / r["propostos"] if r["propostos"] else 0.0
+        print(f"{f'assistida ({tamanho})':<16} {r['segundos']:>7.2f}s {r['tokens_por_segundo']:>10.1f} "
+              f"{taxa:>10.0%} {base['segundos'] / r['segundos']:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
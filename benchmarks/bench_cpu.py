@@ -0,0 +1,100 @@
+"""
+Benchmark do modo CPU: vazão de geração e pico de memória por tipo de peso.
+
+Para cada modo de `CPU_QUANTIZACAO` ("fp32", "bf16", "int8") sobe um processo
+novo — o pico de RSS (`ru_maxrss`) é do processo inteiro —, carrega o
+`BackendHF` na CPU, gera os mesmos lotes de blocos e mede tokens/s, tempo de
+carregamento e pico de RSS. Use um modelo causal pequeno: a ideia é comparar
+os caminhos, não revisar um volume.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_cpu --modelo Qwen/Qwen2.5-0.5B-Instruct --blocos 16 --lote 4 --tokens 64
+    python -m benchmarks.bench_cpu --modelo /caminho/modelo --modos fp32 int8 --threads 8
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_prefixo_kv import gerar_blocos
+from utils.config import MODEL_NAME
+
+MODOS = ("fp32", "bf16", "int8")
+
+
+def medir_modo(args) -> dict:
+    """
+    Roda no processo filho: carrega o modelo no modo pedido e mede a geração.
+    """
+    from modelo.carregador import BackendHF
+    from processamento.revisor_llm import montar_prompt
+
+    inicio = time.perf_counter()
+    backend = BackendHF(model_id=args.modelo, batch_size=args.lote, dispositivo="cpu",
+                        quantizacao=args.modo, threads=args.threads)
+    carregamento = time.perf_counter() - inicio
+
+    prompts = [montar_prompt(b) for b in gerar_blocos(args.blocos)]
+    backend.gerar(prompts[:args.lote], max_new_tokens=4, temperature=0.35)  # aquecimento
+
+    gerados = 0
+    inicio = time.perf_counter()
+    for i in range(0, len(prompts), args.lote):
+        respostas = backend.gerar(prompts[i:i + args.lote], max_new_tokens=args.tokens, temperature=0.35)
+        gerados += sum(r.tokens_gerados for r in respostas)
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "modo": args.modo,
+        "carregamento_segundos": carregamento,
+        "geracao_segundos": duracao,
+        "tokens_gerados": gerados,
+        "tokens_por_segundo": gerados / duracao if duracao else 0.0,
+        "pico_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # KB no Linux
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modelo", default=MODEL_NAME)
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=list(MODOS))
+    parser.add_argument("--blocos", type=int, default=16)
+    parser.add_argument("--lote", type=int, default=4)
+    parser.add_argument("--tokens", type=int, default=64, help="max_new_tokens por bloco")
+    parser.add_argument("--threads", type=int, default=None, help="padrão: CPU_THREADS / núcleos disponíveis")
+    parser.add_argument("--saida", default=None, help="grava os resultados neste JSON")
+    parser.add_argument("--modo", choices=MODOS, help=argparse.SUPPRESS)  # processo filho
+    args = parser.parse_args()
+
+    if args.modo:
+        print(json.dumps(medir_modo(args)))
+        return
+
+    resultados = []
+    for modo in args.modos:
+        comando = [sys.executable, "-m", "benchmarks.bench_cpu", "--modo", modo, "--modelo", args.modelo,
+                   "--blocos", str(args.blocos), "--lote", str(args.lote), "--tokens", str(args.tokens)]
+        if args.threads:
+            comando += ["--threads", str(args.threads)]
+        processo = subprocess.run(comando, capture_output=True, text=True)
+        if processo.returncode != 0:
+            print(f"[⚠️] Modo {modo} falhou:\n{processo.stderr.strip()[-2000:]}")
+            continue
+        resultados.append(json.loads(processo.stdout.strip().splitlines()[-1]))
+
+    print(f"Modelo: {args.modelo} | {args.blocos} blocos | lote {args.lote} | até {args.tokens} tokens por bloco")
+    print(f"{'modo':<6} {'carregar':>9} {'tokens/s':>10} {'pico RSS':>11}")
+    for r in resultados:
+        print(f"{r['modo']:<6} {r['carregamento_segundos']:>8.1f}s {r['tokens_por_segundo']:>10.1f} "
+              f"{r['pico_rss_mb']:>8.0f} MB")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"[💾] Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark da leitura da entrada: python-docx x leitor em streaming.
+
+Compara `separar_capitulos(Document(caminho))` (a árvore inteira do
+documento, estilo resolvido parágrafo a parágrafo) com
+`editor.leitor_entrada.iterar_capitulos` (zip + `iterparse`, um capítulo de
+cada vez). Cada leitor roda num processo novo, porque o pico de RSS
+(`ru_maxrss`) é do processo inteiro. Mede o tempo até o primeiro capítulo, o
+tempo total e o pico de memória acima do processo já com os imports, e
+confere que os dois produzem os mesmos capítulos.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_leitura_docx --capitulos 200
+    python -m benchmarks.bench_leitura_docx --docx "dados/entrada/Volume 3.docx" --leitores streaming
+"""
+import argparse
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+LEITORES = ("python-docx", "streaming")
+
+
+def _pico_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB no Linux
+
+
+def medir_leitor(leitor: str, caminho: str) -> dict:
+    """
+    Roda no processo filho: lê o .docx inteiro com o leitor pedido.
+    """
+    from docx import Document
+
+    from editor.editor_docx import separar_capitulos
+    from editor.leitor_entrada import iterar_capitulos
+
+    base = _pico_rss_mb()
+    inicio = time.perf_counter()
+    if leitor == "python-docx":
+        capitulos = iter(separar_capitulos(Document(caminho)))
+    else:
+        capitulos = iterar_capitulos(caminho)
+
+    # Os capítulos são consumidos e descartados, como a revisão faria com um leitor preguiçoso
+    resumo = hashlib.sha256()
+    primeiro = None
+    quantidade = paragrafos = 0
+    for titulo, pars in capitulos:
+        if primeiro is None:
+            primeiro = time.perf_counter() - inicio
+        quantidade += 1
+        paragrafos += len(pars)
+        resumo.update(json.dumps([titulo, pars], ensure_ascii=False).encode("utf-8"))
+    total = time.perf_counter() - inicio
+
+    return {
+        "leitor": leitor,
+        "capitulos": quantidade,
+        "paragrafos": paragrafos,
+        "primeiro_capitulo_segundos": primeiro or total,
+        "total_segundos": total,
+        "pico_rss_mb": _pico_rss_mb(),
+        "acrescimo_rss_mb": _pico_rss_mb() - base,
+        "resumo": resumo.hexdigest(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docx", default=None, help="volume real (padrão: corpus sintético)")
+    parser.add_argument("--capitulos", type=int, default=200, help="capítulos do corpus sintético")
+    parser.add_argument("--leitores", nargs="+", choices=LEITORES, default=list(LEITORES))
+    parser.add_argument("--saida", default=None, help="grava os resultados neste JSON")
+    parser.add_argument("--leitor", choices=LEITORES, help=argparse.SUPPRESS)  # processo filho
+    args = parser.parse_args()
+
+    if args.leitor:
+        print(json.dumps(medir_leitor(args.leitor, args.docx)))
+        return
+
+    pasta = None
+    caminho = args.docx
+    if caminho is None:
+        from benchmarks.corpus import gerar_capitulos, salvar_docx
+        pasta = tempfile.mkdtemp(prefix="bench_leitura_")
+        caminho = os.path.join(pasta, "volume.docx")
+        salvar_docx(gerar_capitulos(args.capitulos), caminho)
+
+    resultados = []
+    try:
+        for leitor in args.leitores:
+            processo = subprocess.run([sys.executable, "-m", "benchmarks.bench_leitura_docx",
+                                       "--leitor", leitor, "--docx", caminho], capture_output=True, text=True)
+            if processo.returncode != 0:
+                print(f"[⚠️] Leitor {leitor} falhou:\n{processo.stderr.strip()[-2000:]}")
+                continue
+            resultados.append(json.loads(processo.stdout.strip().splitlines()[-1]))
+    finally:
+        if pasta:
+            os.remove(caminho)
+            os.rmdir(pasta)
+
+    tamanho = os.path.getsize(args.docx) / 2**20 if args.docx else None
+    origem = f"{args.docx} ({tamanho:.1f} MB)" if args.docx else f"corpus sintético, {args.capitulos} capítulos"
+    print(f"Entrada: {origem}")
+    print(f"{'leitor':<12} {'capítulos':>9} {'1º capítulo':>12} {'total':>9} {'pico RSS':>10} {'acréscimo':>10}")
+    for r in resultados:
+        print(f"{r['leitor']:<12} {r['capitulos']:>9} {r['primeiro_capitulo_segundos']:>11.3f}s "
+              f"{r['total_segundos']:>8.2f}s {r['pico_rss_mb']:>7.0f} MB {r['acrescimo_rss_mb']:>7.0f} MB")
+    if len({r["resumo"] for r in resultados}) > 1:
+        print("[❌] Os leitores produziram capítulos diferentes!")
+    elif len(resultados) > 1:
+        print("[✅] Mesma divisão de capítulos nos dois leitores")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"[💾] Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark do lote adaptativo: lote fixo x orçamento de tokens x recuo por falta de memória.
+
+Usa o backend fake com latência por chamada (o custo que lotes maiores
+amortizam) e memória simulada (`memoria_tokens`): lotes que passam dela
+levantam `MemoriaEsgotada`, como um OOM da GPU. Compara:
+
+- fixo: `tamanho_lote` fixo, sem orçamento (o comportamento antigo);
+- adaptativo: até `LOTE_MAXIMO` blocos dentro do orçamento estimado;
+- otimista: a estimativa do backend é o dobro da memória real, então os
+  primeiros lotes estouram e o limite recua (e depois volta a subir).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_lote_adaptativo --capitulos 40 --memoria 6000
+"""
+import argparse
+import time
+
+from benchmarks.corpus import gerar_capitulos
+from modelo.backend_fake import BackendFake
+from processamento.agendador import AgendadorBlocos, TarefaCapitulo
+from processamento.segmentador import segmentar_capitulo
+from utils.config import LOTE_MAXIMO
+
+
+def medir(nome: str, tarefas, backend: BackendFake, **opcoes) -> dict:
+    agendador = AgendadorBlocos(backend=backend, usar_cache=False, triagem=False, dedup=False, **opcoes)
+    inicio = time.perf_counter()
+    revisados = [r.revisados for r in agendador.executar(tarefas)]
+    duracao = time.perf_counter() - inicio
+    controle = agendador.controle_lote
+    return {"nome": nome, "segundos": duracao, "lotes": backend.chamadas_gerar, "recuos": controle.recuos,
+            "ampliacoes": controle.ampliacoes, "tamanhos": dict(sorted(controle.tamanhos.items())),
+            "limite_final": controle.maximo, "revisados": revisados}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capitulos", type=int, default=40)
+    parser.add_argument("--lote-fixo", type=int, default=4)
+    parser.add_argument("--memoria", type=int, default=6000, help="tokens que cabem num lote simulado")
+    parser.add_argument("--latencia-fixa", type=float, default=0.02, help="segundos por chamada de geração")
+    parser.add_argument("--latencia-decodificacao", type=float, default=0.0002, help="segundos por passo")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    tarefas = [TarefaCapitulo(chave=i, titulo=titulo, blocos=segmentar_capitulo("\n".join(pars)))
+               for i, (titulo, pars) in enumerate(gerar_capitulos(args.capitulos, semente=args.semente))]
+    latencias = {"latencia_fixa": args.latencia_fixa, "latencia_decodificacao": args.latencia_decodificacao}
+
+    resultados = [
+        medir(f"fixo ({args.lote_fixo})", tarefas, BackendFake(memoria_tokens=args.memoria, **latencias),
+              tamanho_lote=args.lote_fixo, adaptativo=False),
+        medir(f"adaptativo (até {LOTE_MAXIMO})", tarefas,
+              BackendFake(memoria_tokens=args.memoria, memoria_estimada=args.memoria, **latencias)),
+        medir("otimista (estimativa 2x)", tarefas,
+              BackendFake(memoria_tokens=args.memoria, memoria_estimada=2 * args.memoria, **latencias)),
+    ]
+
+    blocos = sum(len(t.blocos) for t in tarefas)
+    print(f"{args.capitulos} capítulos | {blocos} blocos | memória simulada: {args.memoria} tokens por lote")
+    print(f"{'modo':<26} {'segundos':>9} {'lotes':>6} {'recuos':>7} {'subidas':>8} {'limite':>7} {'saída':>7}")
+    for r in resultados:
+        igual = r["revisados"] == resultados[0]["revisados"]
+        print(f"{r['nome']:<26} {r['segundos']:>8.2f}s {r['lotes']:>6} {r['recuos']:>7} {r['ampliacoes']:>8} "
+              f"{r['limite_final']:>7} {'igual' if igual else 'DIFERE':>7}")
+    for r in resultados:
+        print(f"  {r['nome']}: tamanhos de lote {r['tamanhos']}")
+
+
+if __name__ == "__main__":
+    main()
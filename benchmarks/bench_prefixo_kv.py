@@ -0,0 +1,73 @@
+"""
+Benchmark do prefill com e sem o KV-cache do prefixo de sistema.
+
+Mede o tempo de `BackendHF.gerar(..., max_new_tokens=1)` — praticamente só o
+prefill — para os mesmos lotes de prompts, alternando `usar_cache_prefixo`.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_prefixo_kv --modelo NousResearch/Hermes-2-Pro-Mistral-7B --blocos 64 --lote 4
+"""
+import argparse
+import random
+import time
+
+from modelo.carregador import BackendHF
+from processamento.revisor_llm import montar_prompt
+from utils.config import MODEL_NAME
+
+FRASES = [
+    "Lin Feng raised his head and looked at the elder with cold eyes.",
+    '"You dare?" the young master shouted.',
+    "The spiritual energy of heaven and earth surged into his dantian.",
+    "He nodded.",
+    "Everyone in the sect fell silent as the immortal descended from the clouds.",
+]
+
+
+def gerar_blocos(quantidade: int, semente: int = 0) -> list:
+    aleatorio = random.Random(semente)
+    return ["\n".join(aleatorio.choice(FRASES) for _ in range(aleatorio.randint(1, 7))) for _ in range(quantidade)]
+
+
+def medir(backend: BackendHF, prompts: list, lote: int, repeticoes: int) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for i in range(0, len(prompts), lote):
+            backend.gerar(prompts[i:i + lote], max_new_tokens=1, temperature=0.35)
+        if backend._torch.cuda.is_available():
+            backend._torch.cuda.synchronize()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modelo", default=MODEL_NAME)
+    parser.add_argument("--blocos", type=int, default=64)
+    parser.add_argument("--lote", type=int, default=4)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    backend = BackendHF(model_id=args.modelo, batch_size=args.lote)
+    prompts = [montar_prompt(b) for b in gerar_blocos(args.blocos)]
+
+    # Aquecimento (inclui o cálculo único do KV do prefixo)
+    for uso in (False, True):
+        backend.usar_cache_prefixo = uso
+        backend.gerar(prompts[:args.lote], max_new_tokens=1, temperature=0.35)
+
+    tempos = {}
+    for uso in (False, True):
+        backend.usar_cache_prefixo = uso
+        tempos[uso] = medir(backend, prompts, args.lote, args.repeticoes)
+
+    prefixo = len(backend._prefixo_kv[1]) if backend._prefixo_kv else 0
+    print(f"Modelo: {args.modelo} | {args.blocos} blocos | lote {args.lote} | prefixo {prefixo} tokens")
+    print(f"Prefill sem cache do prefixo: {tempos[False]:.3f}s")
+    print(f"Prefill com cache do prefixo: {tempos[True]:.3f}s")
+    print(f"Ganho: {tempos[False] / tempos[True]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compara os modos de segmentação para ajustar `SEGMENTACAO_ALVO_TOKENS` / `SEGMENTACAO_MAX_TOKENS`.
+
+Para cada configuração mostra a quantidade de blocos, o histograma de tamanho
+em tokens e o padding que os lotes teriam no `AgendadorBlocos` (blocos
+ordenados por tamanho e fatiados em lotes). Menos padding e tamanhos parecidos
+= mais vazão na GPU; blocos pequenos demais, por outro lado, multiplicam o
+custo fixo do prompt de sistema por bloco.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_segmentacao                       # volume sintético
+    python -m benchmarks.bench_segmentacao --docx "dados/entrada/Volume 3.docx" --alvos 96 128 160 224
+"""
+import argparse
+from typing import Callable, List
+
+from benchmarks.corpus import gerar_capitulos
+from editor.leitor_entrada import iterar_capitulos
+from processamento.segmentador import (estimar_tokens, formatar_histograma, histograma_blocos,
+                                       segmentar_em_blocos, segmentar_por_orcamento)
+
+
+def padding_lotes(tamanhos: List[int], lote: int) -> float:
+    """Fração de padding com os blocos ordenados por tamanho e fatiados em lotes."""
+    ordenados = sorted(tamanhos)
+    total = desperdicio = 0
+    for i in range(0, len(ordenados), lote):
+        fatia = ordenados[i:i + lote]
+        total += max(fatia) * len(fatia)
+        desperdicio += sum(max(fatia) - n for n in fatia)
+    return desperdicio / total if total else 0.0
+
+
+def relatar(nome: str, textos: List[str], segmentar: Callable[[str], List[str]], lote: int, template: int) -> None:
+    tamanhos = [estimar_tokens(bloco) for texto in textos for bloco in segmentar(texto)]
+    media = sum(tamanhos) / len(tamanhos) if tamanhos else 0.0
+    desvio = (sum((n - media) ** 2 for n in tamanhos) / len(tamanhos)) ** 0.5 if tamanhos else 0.0
+    print(f"\n== {nome} ==")
+    print(f"Blocos: {len(tamanhos)} | média {media:.0f} tokens | desvio {desvio:.0f} | máx {max(tamanhos, default=0)}")
+    print(f"Padding nos lotes de {lote}: {padding_lotes(tamanhos, lote):.1%} | "
+          f"prompt de sistema repetido: {template * len(tamanhos):,} tokens")
+    for linha in formatar_histograma(histograma_blocos(tamanhos)):
+        print(linha)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docx", default=None, help="volume real (padrão: corpus sintético)")
+    parser.add_argument("--capitulos", type=int, default=40)
+    parser.add_argument("--alvos", type=int, nargs="+", default=[96, 128, 160, 224])
+    parser.add_argument("--maximo-fator", type=float, default=1.6, help="máximo = alvo * fator")
+    parser.add_argument("--lote", type=int, default=8)
+    parser.add_argument("--template", type=int, default=170, help="tokens do prompt fixo por bloco")
+    args = parser.parse_args()
+
+    if args.docx:
+        capitulos = list(iterar_capitulos(args.docx))
+    else:
+        capitulos = gerar_capitulos(args.capitulos)
+    textos = ["\n".join(paragrafos) for _, paragrafos in capitulos]
+
+    relatar("linhas (max_linhas=7)", textos, lambda t: segmentar_em_blocos(t, max_linhas=7), args.lote, args.template)
+    for alvo in args.alvos:
+        maximo = int(alvo * args.maximo_fator)
+        relatar(f"orcamento (alvo={alvo}, maximo={maximo})", textos,
+                lambda t: segmentar_por_orcamento(t, alvo=alvo, maximo=maximo), args.lote, args.template)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Suíte de benchmarks reprodutível do revisor, sem GPU.
+
+Gera um volume sintético (benchmarks/corpus.py), mede cada etapa da revisão
+e grava os resultados em JSON:
+- carregamento do .docx e separação dos capítulos,
+- segmentação em blocos,
+- montagem dos prompts,
+- tokenização,
+- `limpar_resposta`,
+- escrita do .docx revisado,
+- ponta a ponta (`revisar_docx_otimizado` com o BackendFake e latência simulada de GPU).
+
+Com `--baseline`, compara a vazão de cada etapa com uma execução anterior e
+termina com código 1 se alguma ficar mais lenta que o limite.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_suite --gravar-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_suite --baseline benchmarks/baseline.json --limite 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+
+from benchmarks.corpus import gerar_capitulos, salvar_docx
+from editor.editor_docx import revisar_docx_otimizado
+from editor.escritor_saida import EscritorVolume
+from editor.leitor_entrada import iterar_capitulos
+from modelo.backend_fake import BackendFake
+from processamento.agendador import AgendadorBlocos
+from processamento.revisor_llm import limpar_resposta, montar_prompt
+from processamento.segmentador import segmentar_capitulo
+
+# Artefatos que o modelo real às vezes deixa na resposta
+ARTEFATOS = ["", "<|im_end|>", "\nassistant: ", "<note>edited for clarity</note>", "```\n```", "<pad3>"]
+
+
+def medir(funcao: Callable[[], int], repeticoes: int) -> Dict[str, float]:
+    """
+    Executa `funcao` (que devolve a quantidade de itens processados) e guarda a melhor vazão.
+    """
+    melhor = float("inf")
+    itens = 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        itens = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return {"segundos": melhor, "itens": itens, "por_segundo": itens / melhor if melhor else 0.0}
+
+
+def executar(args, pasta: str) -> Dict[str, Dict[str, float]]:
+    capitulos = gerar_capitulos(args.capitulos, semente=args.semente)
+    os.makedirs(os.path.join(pasta, "dados", "entrada"), exist_ok=True)
+    caminho = os.path.join(pasta, "dados", "entrada", "volume.docx")
+    salvar_docx(capitulos, caminho)
+
+    backend = BackendFake(batch_size=args.lote, latencia_fixa=args.latencia_fixa,
+                          latencia_prefill=args.latencia_prefill, latencia_decodificacao=args.latencia_decodificacao)
+    resultados = {}
+
+    resultados["carregar_docx"] = medir(lambda: sum(1 for _ in iterar_capitulos(caminho)), args.repeticoes)
+
+    blocos = [b for _, pars in capitulos for b in segmentar_capitulo("\n".join(pars))]
+    resultados["segmentacao"] = medir(
+        lambda: sum(len(segmentar_capitulo("\n".join(pars))) for _, pars in capitulos),
+        args.repeticoes)
+
+    prompts = [montar_prompt(b) for b in blocos]
+    resultados["montagem_prompt"] = medir(lambda: len([montar_prompt(b) for b in blocos]), args.repeticoes)
+    resultados["tokenizacao"] = medir(lambda: len(backend.tokenizar(prompts)), args.repeticoes)
+
+    respostas = [g.texto + ARTEFATOS[i % len(ARTEFATOS)]
+                 for i, g in enumerate(BackendFake().gerar(prompts, max_new_tokens=10_000, temperature=0.0))]
+    resultados["limpeza"] = medir(
+        lambda: len([limpar_resposta(r, indice_bloco=i, texto_completo=False) for i, r in enumerate(respostas)]),
+        args.repeticoes)
+
+    def escrever_docx() -> int:
+        saida = EscritorVolume(os.path.join(pasta, "escrita.docx"), formatos_extras=[], publicar_a_cada=0)
+        for i, (titulo, pars) in enumerate(capitulos):
+            saida.adicionar_capitulo(i, titulo, pars)
+        saida.finalizar()
+        return len(capitulos)
+    resultados["escrita_docx"] = medir(escrever_docx, args.repeticoes)
+
+    # Ponta a ponta: caminhos relativos (dados/...) dentro da pasta temporária, sem cache de revisões
+    def ponta_a_ponta() -> int:
+        shutil.rmtree(os.path.join(pasta, "dados", "saida"), ignore_errors=True)
+        agendador = AgendadorBlocos(backend=backend, usar_cache=False)
+        revisar_docx_otimizado("volume.docx", agendador=agendador)
+        return len(blocos)
+    diretorio = os.getcwd()
+    os.chdir(pasta)
+    try:
+        resultados["ponta_a_ponta"] = medir(ponta_a_ponta, 1)
+    finally:
+        os.chdir(diretorio)
+
+    return resultados
+
+
+def comparar(resultados: dict, baseline: dict, limite: float) -> bool:
+    """
+    Imprime a variação de vazão por etapa. Devolve False se alguma etapa piorou mais que `limite`.
+    """
+    ok = True
+    print(f"\n{'etapa':<16} {'baseline/s':>12} {'atual/s':>12} {'variação':>9}")
+    for etapa, atual in resultados.items():
+        base = baseline.get("resultados", {}).get(etapa)
+        if not base or not base["por_segundo"]:
+            print(f"{etapa:<16} {'-':>12} {atual['por_segundo']:>12,.1f} {'nova':>9}")
+            continue
+        variacao = atual["por_segundo"] / base["por_segundo"] - 1
+        marca = ""
+        if variacao < -limite:
+            ok = False
+            marca = "  <-- regressão"
+        print(f"{etapa:<16} {base['por_segundo']:>12,.1f} {atual['por_segundo']:>12,.1f} {variacao:>+9.1%}{marca}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capitulos", type=int, default=40)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--lote", type=int, default=8)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--latencia-fixa", type=float, default=0.002, help="segundos por lote")
+    parser.add_argument("--latencia-prefill", type=float, default=0.0, help="segundos por token de prompt no lote")
+    parser.add_argument("--latencia-decodificacao", type=float, default=0.0002, help="segundos por passo de geração")
+    parser.add_argument("--saida", default=None, help="grava os resultados neste JSON")
+    parser.add_argument("--baseline", default=None, help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--gravar-baseline", default=None, help="grava os resultados como novo baseline")
+    parser.add_argument("--limite", type=float, default=0.15, help="piora máxima tolerada na vazão (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_revisor_") as pasta:
+        resultados = executar(args, pasta)
+
+    relatorio = {
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("saida", "baseline", "gravar_baseline")},
+        "ambiente": {"python": platform.python_version(), "plataforma": platform.platform()},
+        "resultados": resultados,
+    }
+
+    for etapa, r in resultados.items():
+        print(f"[⏱️] {etapa:<16} {r['itens']:>6} itens em {r['segundos']:.3f}s ({r['por_segundo']:,.1f}/s)")
+
+    for destino in (args.saida, args.gravar_baseline):
+        if destino:
+            with open(destino, "w", encoding="utf-8") as f:
+                json.dump(relatorio, f, ensure_ascii=False, indent=2)
+            print(f"[💾] Resultados gravados em {destino}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("parametros") != relatorio["parametros"]:
+            print("[⚠️] Parâmetros diferentes do baseline; a comparação pode não ser justa.")
+        if not comparar(resultados, baseline, args.limite):
+            print(f"\n[❌] Regressão acima de {args.limite:.0%} em pelo menos uma etapa.")
+            sys.exit(1)
+        print(f"\n[✓] Nenhuma etapa piorou mais que {args.limite:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
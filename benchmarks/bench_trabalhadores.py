@@ -0,0 +1,79 @@
+"""
+Benchmark do pool de trabalhadores: capítulos por segundo com 1, 2, 4... processos.
+
+Usa o backend fake com latência simulada (cada trabalhador "carrega" o seu),
+sem cache de revisões, triagem ou deduplicação — todo bloco passa pela
+geração. Com a latência dominando, a vazão deve crescer quase linearmente com
+o número de trabalhadores. Confere também que a saída é idêntica à de um
+único processo.
+
+Com `--derrubar`, mata um trabalhador no meio da execução para mostrar os
+capítulos dele sendo reatribuídos (a saída continua idêntica).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_trabalhadores --capitulos 48 --trabalhadores 1 2 4
+    python -m benchmarks.bench_trabalhadores --capitulos 24 --trabalhadores 2 --derrubar
+"""
+import argparse
+import os
+import time
+
+from benchmarks.corpus import gerar_capitulos
+from processamento.agendador import TarefaCapitulo
+from processamento.segmentador import segmentar_capitulo
+from processamento.trabalhadores import PoolTrabalhadores
+
+
+def medir(tarefas, trabalhadores: int, args, derrubar: bool = False) -> dict:
+    opcoes_backend = {"batch_size": args.lote, "latencia_fixa": args.latencia_fixa,
+                      "latencia_decodificacao": args.latencia_decodificacao}
+    opcoes_agendador = {"usar_cache": False, "triagem": False, "dedup": False}
+    with PoolTrabalhadores(trabalhadores, tipo_backend="fake", opcoes_backend=opcoes_backend,
+                           janela_capitulos=args.janela, opcoes_agendador=opcoes_agendador) as pool:
+        # Aquecimento: sobe os processos antes de medir
+        list(pool.executar(tarefas[:trabalhadores]))
+
+        revisados = []
+        inicio = time.perf_counter()
+        for k, resultado in enumerate(pool.executar(tarefas)):
+            revisados.append(resultado.revisados)
+            if derrubar and k == len(tarefas) // 4:
+                vitima = next(iter(pool._trabalhadores.values()))
+                print(f"[💥] Matando o trabalhador {vitima.id} (pid {vitima.processo.pid})")
+                vitima.processo.kill()
+        duracao = time.perf_counter() - inicio
+
+    return {"trabalhadores": trabalhadores, "segundos": duracao,
+            "capitulos_por_segundo": len(tarefas) / duracao, "quedas": pool.quedas, "revisados": revisados}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capitulos", type=int, default=48)
+    parser.add_argument("--trabalhadores", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--janela", type=int, default=4, help="capítulos por janela em cada trabalhador")
+    parser.add_argument("--lote", type=int, default=8)
+    parser.add_argument("--latencia-fixa", type=float, default=0.05, help="segundos por chamada de geração")
+    parser.add_argument("--latencia-decodificacao", type=float, default=0.0005, help="segundos por token gerado")
+    parser.add_argument("--derrubar", action="store_true", help="mata um trabalhador no meio da execução")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    tarefas = [TarefaCapitulo(chave=i, titulo=titulo, blocos=segmentar_capitulo("\n".join(pars)))
+               for i, (titulo, pars) in enumerate(gerar_capitulos(args.capitulos, semente=args.semente))]
+    blocos = sum(len(t.blocos) for t in tarefas)
+    print(f"{args.capitulos} capítulos | {blocos} blocos | lote {args.lote} | {os.cpu_count()} núcleos")
+
+    referencia = None
+    print(f"{'trab.':>5} {'segundos':>9} {'cap/s':>8} {'speedup':>8} {'quedas':>7} {'saída':>7}")
+    for n in args.trabalhadores:
+        r = medir(tarefas, n, args, derrubar=args.derrubar and n > 1)
+        referencia = referencia or r
+        igual = r["revisados"] == referencia["revisados"]
+        print(f"{n:>5} {r['segundos']:>8.2f}s {r['capitulos_por_segundo']:>8.1f} "
+              f"{r['capitulos_por_segundo'] / referencia['capitulos_por_segundo']:>7.2f}x {r['quedas']:>7} "
+              f"{'igual' if igual else 'DIFERE':>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Corpus sintético e determinístico de webnovel para os benchmarks.
+
+Os capítulos imitam o material real: muitas falas curtas, uma frase por
+linha, parágrafos narrativos mais longos de vez em quando, separadores
+("***") e notas do tradutor — a estrutura que `segmentar_em_blocos` quebra.
+A mesma semente sempre gera o mesmo texto.
+"""
+import random
+from typing import List, Tuple
+
+from docx import Document
+
+NOMES = ["Lin Feng", "Xiao Yan", "Elder Mo", "Su Qing", "the young master", "Patriarch Long"]
+
+FALAS = [
+    '"You dare?" {a} shouted.',
+    '"Hmph. Courting death," {a} said coldly.',
+    '"Senior brother, wait!"',
+    '"What did you just say?" {a} asked, his eyes narrowing.',
+    '"I will not forgive you," {a} whispered.',
+    '"Haha, good, good, good!"',
+    '"This junior greets the elder."',
+    '"Is that all you have?"',
+]
+
+NARRACAO = [
+    "{a} raised his head and looked at {b} with cold eyes.",
+    "The spiritual energy of heaven and earth surged into {a}'s dantian.",
+    "Everyone in the sect fell silent as the immortal descended from the clouds.",
+    "{a} nodded.",
+    "A terrifying pressure swept across the arena, and the disciples knelt one after another.",
+    "{a} clenched his fists.  His  heart demon stirred, but he suppressed it with his dao heart.",
+    "the blade light flashed , and the magical beast let out a miserable howl",
+    "Silence.",
+]
+
+RUIDO = ["***", "TL Note: cultivation realms are listed in the glossary.", "Please support the author!"]
+
+
+def gerar_capitulo(aleatorio: random.Random, numero: int) -> Tuple[str, List[str]]:
+    """
+    Um capítulo: título e 40-120 parágrafos curtos, com ~60% de falas.
+    """
+    paragrafos = []
+    for _ in range(aleatorio.randint(40, 120)):
+        a, b = aleatorio.sample(NOMES, 2)
+        sorteio = aleatorio.random()
+        if sorteio < 0.6:
+            modelo = aleatorio.choice(FALAS)
+        elif sorteio < 0.97:
+            modelo = aleatorio.choice(NARRACAO)
+        else:
+            modelo = aleatorio.choice(RUIDO)
+        paragrafos.append(modelo.format(a=a, b=b))
+    return f"Chapter {numero}: {aleatorio.choice(['Surging Will', 'Heart Demon', 'The Elder', 'Tribulation'])}", paragrafos
+
+
+def gerar_capitulos(quantidade: int, semente: int = 0) -> List[Tuple[str, List[str]]]:
+    """
+    Gera `quantidade` capítulos determinísticos para a semente informada.
+    """
+    aleatorio = random.Random(semente)
+    return [gerar_capitulo(aleatorio, numero) for numero in range(1, quantidade + 1)]
+
+
+def salvar_docx(capitulos: List[Tuple[str, List[str]]], caminho: str) -> None:
+    """
+    Grava os capítulos no formato de entrada do revisor (título Heading 1 + parágrafos).
+    """
+    doc = Document()
+    for titulo, paragrafos in capitulos:
+        doc.add_paragraph(titulo, style="Heading 1")
+        for par in paragrafos:
+            doc.add_paragraph(par)
+    doc.save(caminho)
@@ -0,0 +1,81 @@
+import json
+import os
+import shutil
+from typing import List, Optional
+
+PASTA_CHECKPOINTS = os.path.join("dados", "checkpoints")
+
+
+def gravar_json_atomico(caminho: str, dados: dict) -> None:
+    """
+    Grava JSON de forma atômica: escreve num temporário e troca com `os.replace`.
+
+    Um crash no meio da escrita deixa o arquivo anterior intacto (ou nenhum).
+    """
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+class CheckpointRevisao:
+    """
+    Checkpoint por arquivo da revisão, um JSON por capítulo concluído.
+
+    Estrutura em disco: `dados/checkpoints/<nome_base>/capitulo_00001.json`, com
+    a impressão digital do capítulo de entrada, os blocos revisados e as estatísticas.
+
+    Cada capítulo é conferido sozinho, quando a leitura da entrada chega nele:
+    se a impressão mudou (capítulo editado, inserido ou removido antes dele),
+    o capítulo salvo é ignorado e revisado de novo. Assim a retomada não precisa
+    ler o volume inteiro antes de começar.
+    """
+
+    def __init__(self, nome_base: str, pasta_raiz: str = PASTA_CHECKPOINTS):
+        self.pasta = os.path.join(pasta_raiz, nome_base)
+        os.makedirs(self.pasta, exist_ok=True)
+
+    def _caminho_capitulo(self, indice: int) -> str:
+        return os.path.join(self.pasta, f"capitulo_{indice:05d}.json")
+
+    def carregar_capitulo(self, indice: int, impressao: str) -> Optional[dict]:
+        """
+        Lê um capítulo concluído, se houver um salvo para a mesma entrada.
+
+        Args:
+            indice (int): Posição do capítulo no arquivo.
+            impressao (str): Impressão do capítulo de entrada atual (ver `editor.manifesto.impressao_capitulo`).
+
+        Returns:
+            dict | None: Dados salvos (`titulo`, `revisados`, `estatisticas`), ou None.
+        """
+        try:
+            with open(self._caminho_capitulo(indice), "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            # Sem arquivo ou corrompido: o capítulo simplesmente será revisado de novo
+            return None
+        if not isinstance(dados, dict) or dados.get("impressao") != impressao:
+            return None
+        return dados
+
+    def salvar_capitulo(self, indice: int, titulo: str, impressao: str, revisados: List[str],
+                        estatisticas: dict) -> None:
+        """
+        Persiste atomicamente um capítulo concluído.
+        """
+        gravar_json_atomico(self._caminho_capitulo(indice), {
+            "indice": indice,
+            "titulo": titulo,
+            "impressao": impressao,
+            "revisados": revisados,
+            "estatisticas": estatisticas,
+        })
+
+    def remover(self) -> None:
+        """
+        Apaga o checkpoint depois que o arquivo final foi salvo.
+        """
+        shutil.rmtree(self.pasta, ignore_errors=True)
@@ -1,136 +1,369 @@
 import os
 import time
-from docx import Document
-from processamento.segmentador import segmentar_em_blocos
-from processamento.revisor_llm import revisar_blocos_em_lote
-from utils.config import AUTHOR
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from processamento.segmentador import estimar_tokens, formatar_histograma, histograma_blocos, segmentar_capitulo
+from processamento.agendador import AgendadorBlocos, ResultadoCapitulo, TarefaCapitulo
+from processamento.pipeline import PipelineRevisao, formatar_relatorio
+from processamento.trabalhadores import PoolTrabalhadores
+from utils.config import PIPELINE_ATIVO, TRABALHADORES
 from utils.logger import LoggerProcesso
-from transformers.tokenization_utils_fast import PreTrainedTokenizerFast
-from modelo.carregador import tokenizer
+from editor.checkpoint import CheckpointRevisao
+from editor.escritor_saida import EscritorVolume
+from editor.leitor_entrada import ESTILOS_TITULO, agrupar_capitulos, iterar_capitulos
+from editor.manifesto import ManifestoRevisao, impressao_capitulo
+from modelo.carregador import BackendInferencia, obter_backend
 
 
-def contar_tokens(blocos: list, tokenizer: PreTrainedTokenizerFast) -> int:
+def contar_tokens(blocos: list, backend: Optional[BackendInferencia] = None) -> int:
     """
     Soma o total de tokens dos blocos fornecidos.
 
     Args:
         blocos (list): Lista de blocos de texto.
-        tokenizer (PreTrainedTokenizerFast): Tokenizador usado pelo modelo LLM.
+        backend (BackendInferencia, opcional): Backend cujo tokenizador será usado.
+            Se omitido, usa o backend do processo.
 
     Returns:
         int: Total de tokens nas entradas.
     """
-    return sum(len(tokenizer(bloco).input_ids) for bloco in blocos if isinstance(bloco, str) and bloco.strip())
+    validos = [bloco for bloco in blocos if isinstance(bloco, str) and bloco.strip()]
+    if not validos:
+        return 0
+    backend = backend or obter_backend()
+    return sum(len(ids) for ids in backend.tokenizar(validos))
 
 
-def revisar_docx_otimizado(nome_arquivo: str):
+def separar_capitulos(doc) -> List[Tuple[str, List[str]]]:
     """
-    Função principal que carrega um arquivo .docx com capítulos de uma webnovel,
-    segmenta o texto em blocos, envia cada bloco para revisão por LLM e salva o resultado final revisado.
+    Separa os parágrafos do documento em capítulos, usando títulos Heading 1/Heading 2.
 
-    Também gera log com:
-    - tempo por capítulo,
-    - blocos e tokens (entrada e saída),
-    - quantidade de erros (fallbacks),
-    - tempo total de execução.
+    A revisão lê a entrada com `editor.leitor_entrada.iterar_capitulos`, que
+    faz a mesma divisão em streaming, sem montar o documento na memória.
 
     Args:
-        nome_arquivo (str): Nome do arquivo .docx na pasta 'dados/entrada'.
+        doc (Document): Documento python-docx já carregado.
 
     Returns:
-        None. Salva documento revisado em 'dados/saida' e log em 'dados/logs'.
+        List[Tuple[str, List[str]]]: Lista de (título, parágrafos não vazios).
     """
+    return list(agrupar_capitulos(
+        (bool(par.style and par.style.name in ESTILOS_TITULO), par.text) for par in doc.paragraphs
+    ))
 
-    # Define caminhos
-    caminho_entrada = os.path.join("dados", "entrada", nome_arquivo)
-    nome_base = os.path.splitext(nome_arquivo)[0]
-    caminho_saida = os.path.join("dados", "saida", f"{nome_base}_revisado.docx")
 
-    # Carrega documento original
-    doc = Document(caminho_entrada)
+def adicionar_capitulo(novo_doc, indice: int, titulo: str, revisados: List[str]) -> int:
+    """
+    Acrescenta um capítulo revisado a um `Document` do python-docx
+    (quebra de página, título Heading 1 e um parágrafo por linha).
 
-    # Separa capítulos com base nos títulos
-    capitulos = []
-    titulo_atual = None
-    buffer = []
+    A revisão grava a saída com `editor.escritor_saida.EscritorDocx`, que gera
+    os mesmos parágrafos em streaming, sem montar o documento na memória.
 
-    for par in doc.paragraphs:
-        if par.style and par.style.name in ("Heading 1", "Heading 2"):
-            if titulo_atual and buffer:
-                capitulos.append((titulo_atual, buffer))
-                buffer = []
-            titulo_atual = par.text.strip()
-        else:
-            texto = par.text.strip()
-            if texto and texto != titulo_atual:
-                buffer.append(texto)
+    Returns:
+        int: Quantidade de parágrafos acrescentados (incluindo quebra e título).
+    """
+    total = 0
+    if indice > 0:
+        novo_doc.add_page_break()
+        total += 1
 
-    if titulo_atual and buffer:
-        capitulos.append((titulo_atual, buffer))
+    novo_doc.add_paragraph(titulo, style="Heading 1")
+    total += 1
 
-    print(f"[📘] Total de capítulos identificados: {len(capitulos)}")
+    for bloco in revisados:
+        paragrafos = bloco.strip().split("\n")
+        for par in paragrafos:
+            novo_doc.add_paragraph(par.strip() if par.strip() else "")
+            total += 1
+    return total
 
-    # Cria novo doc e inicia logger
-    novo_doc = Document()
-    novo_doc.core_properties.author = AUTHOR
-    logger = LoggerProcesso(nome_base)
-    inicio_total = time.time()
 
-    for i, (titulo, paragrafos) in enumerate(capitulos):
-        print(f"[📖] {i+1}/{len(capitulos)}: {titulo}")
-        inicio_capitulo = time.time()
+class RevisaoArquivo:
+    """
+    Estado da revisão de um arquivo .docx: capítulos, checkpoint, escritor da saída e log.
+
+    A entrada é lida em streaming por `pendentes()`: cada capítulo é conferido
+    no checkpoint e no manifesto da saída anterior quando a leitura chega nele,
+    e só os que precisam de revisão seguem adiante. O primeiro capítulo começa
+    a ser revisado sem esperar o resto do volume ser lido.
 
-        # Segmenta texto em blocos
+    Os capítulos pendentes são identificados por `chave` — o índice do capítulo ou,
+    quando vários arquivos dividem os mesmos lotes, `(chave_arquivo, índice)`.
+
+    Args:
+        nome_arquivo (str): Nome do arquivo .docx na pasta 'dados/entrada'.
+        chave_arquivo (int, opcional): Posição do arquivo numa revisão intercalada.
+    """
+
+    def __init__(self, nome_arquivo: str, chave_arquivo: Optional[int] = None):
+        # Define caminhos
+        self.nome_arquivo = nome_arquivo
+        self.chave_arquivo = chave_arquivo
+        self.caminho_entrada = os.path.join("dados", "entrada", nome_arquivo)
+        self.nome_base = os.path.splitext(nome_arquivo)[0]
+        self.caminho_saida = os.path.join("dados", "saida", f"{self.nome_base}_revisado.docx")
+
+        # Preenchidos conforme `pendentes()` lê a entrada (título e impressão de cada capítulo)
+        self.titulos: List[str] = []
+        self.impressoes: List[str] = []
+
+        # Checkpoint: capítulos concluídos numa execução anterior (mesma entrada) são reaproveitados
+        # Manifesto: capítulos inalterados desde a última revisão são copiados da saída anterior
+        # (ambos à espera da escrita, que os tira daqui)
+        self.checkpoint = CheckpointRevisao(self.nome_base)
+        self.manifesto = ManifestoRevisao(self.caminho_saida)
+        self.concluidos: Dict[int, dict] = {}
+        self.reaproveitados: Dict[int, dict] = {}
+
+        # Abre a saída (gravada capítulo a capítulo) e inicia logger
+        self.saida = EscritorVolume(self.caminho_saida)
+        self.logger = LoggerProcesso(self.nome_base)
+        self.inicio_total = time.time()
+        self.proximo = 0     # próximo capítulo a entrar no documento
+        self._paragrafos = 0
+        self._tempo_segmentacao: Dict[int, float] = {}
+        self.tamanhos_blocos: List[int] = []  # tokens estimados de cada bloco segmentado
+
+    def _chave(self, indice: int):
+        return indice if self.chave_arquivo is None else (self.chave_arquivo, indice)
+
+    def _indice(self, chave) -> int:
+        return chave if self.chave_arquivo is None else chave[1]
+
+    def pendentes(self) -> Iterator[Tuple[Any, str, List[str]]]:
+        """
+        Lê a entrada capítulo a capítulo e devolve (chave, título, parágrafos) dos
+        que não estão no checkpoint nem na saída anterior.
+        """
+        retomados = reaproveitados = 0
+        for i, (titulo, paragrafos) in enumerate(iterar_capitulos(self.caminho_entrada)):
+            impressao = impressao_capitulo(titulo, paragrafos)
+            self.titulos.append(titulo)
+            self.impressoes.append(impressao)
+            # O manifesto casa os capítulos em ordem: é consultado mesmo quando o checkpoint tem o capítulo
+            anterior = self.manifesto.reaproveitar(impressao, titulo)
+            salvo = self.checkpoint.carregar_capitulo(i, impressao)
+            if salvo is not None:
+                self.concluidos[i] = salvo
+                retomados += 1
+            elif anterior is not None:
+                self.reaproveitados[i] = anterior
+                reaproveitados += 1
+            else:
+                yield self._chave(i), titulo, paragrafos
+
+        total = len(self.titulos)
+        print(f"[📘] {self.nome_arquivo}: total de capítulos identificados: {total}")
+        if retomados:
+            print(f"[⏩] Retomado do checkpoint: {retomados}/{total} capítulos já concluídos")
+        if reaproveitados:
+            print(f"[♻️] {reaproveitados}/{total} capítulos inalterados reaproveitados de {self.caminho_saida}")
+
+    def segmentar(self, chave, titulo: str, paragrafos: List[str]) -> TarefaCapitulo:
+        """
+        Segmenta um capítulo pendente em blocos.
+        """
+        print(f"[📖] {self.nome_arquivo} {self._indice(chave)+1}: {titulo}")
+        inicio = time.perf_counter()
         texto_capitulo = "\n".join(paragrafos).strip()
-        blocos = segmentar_em_blocos(texto_capitulo, max_linhas=7)
-        tokens_entrada = contar_tokens(blocos, tokenizer)
+        blocos = segmentar_capitulo(texto_capitulo)
+        self.tamanhos_blocos.extend(estimar_tokens(bloco) for bloco in blocos)
+        self._tempo_segmentacao[self._indice(chave)] = time.perf_counter() - inicio
+        return TarefaCapitulo(chave=chave, titulo=titulo, blocos=blocos, nome_base=self.nome_base, logger=self.logger)
 
-        # Revisão via LLM
-        revisados, erros, tokens_saida, rev1, rev2, orig, recuperados_finais = revisar_blocos_em_lote(blocos, nome_base=nome_base, logger=logger)
+    def _adicionar(self, i: int, titulo: str, revisados: List[str], estatisticas: dict) -> None:
+        # Escreve o capítulo e anota no manifesto a faixa de parágrafos do corpo
+        inicio = self._paragrafos + (2 if i > 0 else 1)
+        self._paragrafos += self.saida.adicionar_capitulo(i, titulo, revisados)
+        self.manifesto.registrar(titulo, self.impressoes[i], (inicio, self._paragrafos), estatisticas)
 
+    def _escrever_retomados(self, limite: int) -> None:
+        # Reconstrói os capítulos do checkpoint (e os totais do log) e copia os inalterados da saída anterior
+        while self.proximo < limite:
+            titulo = self.titulos[self.proximo]
+            if self.proximo in self.concluidos:
+                salvo = self.concluidos.pop(self.proximo)
+                self._adicionar(self.proximo, salvo["titulo"], salvo["revisados"], salvo["estatisticas"])
+                self.logger.registrar_capitulo(titulo=salvo["titulo"], **{**salvo["estatisticas"], "retomado": True})
+            elif self.proximo in self.reaproveitados:
+                anterior = self.reaproveitados.pop(self.proximo)
+                self._adicionar(self.proximo, titulo, anterior["paragrafos"], anterior["estatisticas"])
+                self.logger.registrar_capitulo_reaproveitado(titulo)
+            self.proximo += 1
+
+    def escrever(self, resultado: ResultadoCapitulo) -> None:
+        """
+        Acrescenta um capítulo revisado ao documento (os resultados chegam em ordem) e grava o checkpoint.
+        """
+        i = self._indice(resultado.chave)
+        self._escrever_retomados(i)
 
         # Adiciona quebra de página e conteúdo revisado
-        if i > 0:
-            novo_doc.add_page_break()
-
-        novo_doc.add_paragraph(titulo, style="Heading 1")
-
-        for bloco in revisados:
-            paragrafos = bloco.strip().split("\n")
-            for par in paragrafos:
-                novo_doc.add_paragraph(par.strip() if par.strip() else "")
-
-        duracao = time.time() - inicio_capitulo
-        logger.registrar_capitulo(
-            titulo=titulo,
-            blocos=len(blocos),
-            tokens=tokens_entrada,
-            erros=erros,
-            duracao_segundos=duracao,
-            tokens_saida=tokens_saida,
-            rev1=rev1,
-            rev2=rev2,
-            orig=orig,
-            recuperados=recuperados_finais,
+        inicio = time.perf_counter()
+        self._adicionar(i, resultado.titulo, resultado.revisados, resultado.estatisticas)
+        tempos = resultado.estatisticas.setdefault("tempos_etapas", {})
+        tempos["segmentacao"] = self._tempo_segmentacao.pop(i, 0.0)
+        tempos["escrita_docx"] = time.perf_counter() - inicio
+
+        self.logger.registrar_capitulo(titulo=resultado.titulo, **resultado.estatisticas)
+        self.checkpoint.salvar_capitulo(i, resultado.titulo, self.impressoes[i], resultado.revisados,
+                                        resultado.estatisticas)
+        duracao = resultado.estatisticas["duracao_segundos"]
+        print(f"[✅] Finalizado: {resultado.titulo} ({int(duracao // 60)}m {int(duracao % 60)}s)")
+        self.proximo = i + 1
+
+    def finalizar(self, agendador: AgendadorBlocos, etapas: Optional[dict] = None) -> None:
+        """
+        Completa o documento com os capítulos retomados restantes, grava as saídas e fecha o log.
+        Chamado depois que `pendentes()` leu a entrada até o fim.
+
+        Args:
+            agendador (AgendadorBlocos): Fornece as métricas de lote acumuladas.
+            etapas (dict, opcional): Relatório das etapas do pipeline para o log.
+        """
+        self._escrever_retomados(len(self.titulos))
+
+        # Salva arquivo final
+        arquivos = self.saida.finalizar()
+        self.manifesto.salvar()
+        if self.tamanhos_blocos:
+            histograma = histograma_blocos(self.tamanhos_blocos)
+            self.logger.registrar_histograma(formatar_histograma(histograma), histograma)
+        if etapas:
+            self.logger.registrar_etapas(formatar_relatorio(etapas), etapas)
+        self.logger.finalizar_log(
+            desperdicio_padding=agendador.desperdicio_padding(),
+            tokens_por_segundo=agendador.tokens_por_segundo(),
+            perfil=agendador.perfil(),
         )
-        print(f"[✅] Finalizado: {titulo} ({int(duracao // 60)}m {int(duracao % 60)}s)")
+        self.checkpoint.remover()
+
+        # Tempo total
+        duracao_total = time.time() - self.inicio_total
+        horas = int(duracao_total // 3600)
+        minutos = int((duracao_total % 3600) // 60)
+        segundos = int(duracao_total % 60)
+
+        print(f"\n[✓] Revisão concluída: {self.nome_arquivo}")
+        for caminho in arquivos:
+            print(f"[💾] Arquivo salvo em: {caminho}")
+        print(f"[⏱️] Tempo total: {horas}h {minutos}m {segundos}s")
+
+
+def _revisar(capitulos: Iterable[Tuple[Any, str, List[str]]], segmentar, escrever,
+             agendador: AgendadorBlocos) -> Optional[dict]:
+    """
+    Revisão via LLM: blocos de vários capítulos são agrupados em lotes por tamanho.
+
+    Com um `PoolTrabalhadores` a geração já roda em outros processos, então os
+    capítulos seguem direto para ele, sem o pipeline de threads.
+
+    Returns:
+        dict | None: Relatório das etapas, quando roda em pipeline.
+    """
+    if not PIPELINE_ATIVO or isinstance(agendador, PoolTrabalhadores):
+        for resultado in agendador.executar(segmentar(*capitulo) for capitulo in capitulos):
+            escrever(resultado)
+        return None
+
+    # Segmentação, lotes, limpeza e escrita em paralelo com a geração
+    relatorio = PipelineRevisao(agendador, segmentar, escrever).executar(capitulos)
+    for linha in formatar_relatorio(relatorio):
+        print(f"[⚙️] {linha}")
+    return relatorio
+
+
+def _novo_agendador(backend: Optional[BackendInferencia] = None):
+    """
+    Agendador padrão: um `PoolTrabalhadores` quando `TRABALHADORES` > 1 (e não
+    foi passado um backend já carregado), senão um `AgendadorBlocos` neste processo.
+    """
+    if backend is None and TRABALHADORES > 1:
+        return PoolTrabalhadores()
+    return AgendadorBlocos(backend=backend)
 
 
-    # Salva arquivo final
-    os.makedirs(os.path.dirname(caminho_saida), exist_ok=True)
-    novo_doc.save(caminho_saida)
-    logger.finalizar_log()
+def revisar_docx_otimizado(nome_arquivo: str, backend: Optional[BackendInferencia] = None,
+                           agendador: Optional[AgendadorBlocos] = None):
+    """
+    Função principal que carrega um arquivo .docx com capítulos de uma webnovel,
+    segmenta o texto em blocos, envia cada bloco para revisão por LLM e salva o resultado final revisado.
+
+    Também gera log com:
+    - tempo por capítulo,
+    - blocos e tokens (entrada e saída),
+    - quantidade de erros (fallbacks),
+    - tempo total de execução.
+
+    Cada capítulo concluído é gravado em checkpoint (`dados/checkpoints/`). Se a execução
+    cair no meio, a próxima chamada com a mesma entrada pula os capítulos já prontos.
+
+    Args:
+        nome_arquivo (str): Nome do arquivo .docx na pasta 'dados/entrada'.
+        backend (BackendInferencia, opcional): Backend de geração. Se omitido, usa o do processo.
+        agendador (AgendadorBlocos | PoolTrabalhadores, opcional): Agendador compartilhado
+            entre arquivos (mantém as métricas de lote acumuladas). Se omitido, cria um novo.
+
+    Returns:
+        None. Salva documento revisado em 'dados/saida' e log em 'dados/logs'.
+    """
+    revisao = RevisaoArquivo(nome_arquivo)
+    proprio = agendador is None
+    agendador = agendador or _novo_agendador(backend)
+    try:
+        etapas = _revisar(revisao.pendentes(), revisao.segmentar, revisao.escrever, agendador)
+    finally:
+        if proprio and isinstance(agendador, PoolTrabalhadores):
+            agendador.fechar()
+    revisao.finalizar(agendador, etapas)
+
+
+def revisar_varios_docx(nomes_arquivos: List[str], backend: Optional[BackendInferencia] = None,
+                        agendador: Optional[AgendadorBlocos] = None,
+                        ao_concluir: Optional[Callable[[str], None]] = None) -> None:
+    """
+    Revisa vários arquivos intercalados: os blocos de capítulos de arquivos
+    diferentes dividem os mesmos lotes de geração (útil para volumes pequenos,
+    cujos capítulos sozinhos não enchem uma janela do agendador).
+
+    Cada arquivo só é aberto quando o anterior terminou de entrar na fila, e é
+    salvo assim que o primeiro capítulo do arquivo seguinte sai revisado.
+
+    Args:
+        nomes_arquivos (List[str]): Arquivos .docx na pasta 'dados/entrada'.
+        backend (BackendInferencia, opcional): Backend de geração. Se omitido, usa o do processo.
+        agendador (AgendadorBlocos | PoolTrabalhadores, opcional): Agendador compartilhado.
+            Se omitido, cria um novo.
+        ao_concluir (Callable, opcional): Chamado com o nome de cada arquivo salvo.
+    """
+    proprio = agendador is None
+    agendador = agendador or _novo_agendador(backend)
+    revisoes: Dict[int, RevisaoArquivo] = {}
+    abertas: List[int] = []  # arquivos ainda não salvos, em ordem
 
-    # Tempo total
-    duracao_total = time.time() - inicio_total
-    horas = int(duracao_total // 3600)
-    minutos = int((duracao_total % 3600) // 60)
-    segundos = int(duracao_total % 60)
+    def finalizar_ate(limite: int, etapas: Optional[dict] = None) -> None:
+        while abertas and abertas[0] < limite:
+            revisao = revisoes.pop(abertas.pop(0))
+            revisao.finalizar(agendador, etapas)
+            if ao_concluir:
+                ao_concluir(revisao.nome_arquivo)
 
-    print(f"\n[✓] Revisão concluída: {nome_arquivo}")
-    print(f"[💾] Arquivo salvo em: {caminho_saida}")
-    print(f"[⏱️] Tempo total: {horas}h {minutos}m {segundos}s")
-    
+    def capitulos():
+        for k, nome in enumerate(nomes_arquivos):
+            revisoes[k] = RevisaoArquivo(nome, chave_arquivo=k)
+            abertas.append(k)
+            yield from revisoes[k].pendentes()
 
+    def segmentar(chave, titulo, paragrafos):
+        return revisoes[chave[0]].segmentar(chave, titulo, paragrafos)
 
+    def escrever(resultado):
+        finalizar_ate(resultado.chave[0])
+        revisoes[resultado.chave[0]].escrever(resultado)
 
+    try:
+        etapas = _revisar(capitulos(), segmentar, escrever, agendador)
+    finally:
+        if proprio and isinstance(agendador, PoolTrabalhadores):
+            agendador.fechar()
+    finalizar_ate(len(nomes_arquivos), etapas)
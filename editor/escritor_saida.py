@@ -0,0 +1,354 @@
+import hashlib
+import io
+import os
+import re
+import shutil
+import zipfile
+from datetime import datetime, timezone
+from typing import List, Optional
+from xml.sax.saxutils import escape
+
+from docx import Document
+
+from utils.config import AUTHOR, SAIDA_FORMATOS_EXTRAS, SAIDA_PUBLICAR_A_CADA
+
+# Caracteres de controle que o XML 1.0 não aceita (o python-docx recusaria o texto inteiro)
+_PADRAO_INVALIDO_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _linhas(revisados: List[str]) -> List[str]:
+    """Um item por parágrafo de saída, como `adicionar_capitulo` faz no .docx."""
+    return [par.strip() for bloco in revisados for par in bloco.strip().split("\n")]
+
+
+def _texto_xml(texto: str) -> str:
+    return escape(_PADRAO_INVALIDO_XML.sub("", texto))
+
+
+class EscritorSaida:
+    """
+    Escreve o volume revisado capítulo a capítulo, sem guardar o documento inteiro na memória.
+
+    Cada capítulo vai para o disco assim que chega; `publicar()` monta uma
+    cópia legível do que já foi escrito em `caminho_parcial` e `finalizar()`
+    grava o arquivo definitivo em `caminho` (e apaga o parcial).
+
+    Args:
+        caminho_base (str): Caminho de saída sem extensão (ex: "dados/saida/Volume 1_revisado").
+        autor (str): Autor gravado nos metadados, quando o formato tem metadados.
+    """
+
+    extensao = ""
+
+    def __init__(self, caminho_base: str, autor: str = AUTHOR):
+        self.caminho = caminho_base + self.extensao
+        self.caminho_parcial = caminho_base + ".parcial" + self.extensao
+        self.titulo_volume = os.path.basename(caminho_base)
+        self.autor = autor
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+
+    def adicionar_capitulo(self, indice: int, titulo: str, revisados: List[str]) -> int:
+        """
+        Acrescenta um capítulo. Devolve a quantidade de parágrafos escritos (incluindo quebra e título).
+        """
+        raise NotImplementedError
+
+    def publicar(self) -> None:
+        """Torna legível, em `caminho_parcial`, tudo o que já foi escrito."""
+        return None
+
+    def finalizar(self) -> None:
+        """Grava o arquivo definitivo e remove os intermediários."""
+        raise NotImplementedError
+
+
+class EscritorDocx(EscritorSaida):
+    """
+    .docx em streaming: o corpo do documento (WordprocessingML) é acrescentado a
+    um arquivo intermediário a cada capítulo, e o pacote .docx é montado a
+    partir dele copiando em blocos — o uso de memória não cresce com o volume.
+
+    Os parágrafos gerados são os mesmos de `editor_docx.adicionar_capitulo`
+    (quebra de página, título Heading 1 e um parágrafo por linha), então as
+    faixas de parágrafos do manifesto continuam valendo.
+    """
+
+    extensao = ".docx"
+
+    def __init__(self, caminho_base: str, autor: str = AUTHOR):
+        super().__init__(caminho_base, autor)
+
+        # Documento vazio do python-docx como modelo: estilos, metadados e seção da página
+        modelo = Document()
+        modelo.core_properties.author = autor
+        self._estilo_titulo = modelo.styles["Heading 1"].style_id
+        memoria = io.BytesIO()
+        modelo.save(memoria)
+        self._modelo = memoria.getvalue()
+
+        with zipfile.ZipFile(io.BytesIO(self._modelo)) as pacote:
+            documento = pacote.read("word/document.xml")
+        abertura = documento.index(b"<w:body>") + len(b"<w:body>")
+        self._cabecalho = documento[:abertura]
+        self._rodape = documento[abertura:]  # <w:sectPr>...</w:sectPr></w:body></w:document>
+
+        self._caminho_corpo = self.caminho + ".corpo.xml"
+        self._corpo = open(self._caminho_corpo, "wb")
+
+    def _paragrafo(self, texto: str, estilo: Optional[str] = None) -> str:
+        propriedades = f'<w:pPr><w:pStyle w:val="{estilo}"/></w:pPr>' if estilo else ""
+        if not texto:
+            return f"<w:p>{propriedades}</w:p>" if propriedades else "<w:p/>"
+        partes = []
+        for k, trecho in enumerate(texto.split("\t")):
+            if k:
+                partes.append("<w:tab/>")
+            if trecho:
+                espaco = ' xml:space="preserve"' if trecho != trecho.strip() else ""
+                partes.append(f"<w:t{espaco}>{_texto_xml(trecho)}</w:t>")
+        return f"<w:p>{propriedades}<w:r>{''.join(partes)}</w:r></w:p>"
+
+    def adicionar_capitulo(self, indice: int, titulo: str, revisados: List[str]) -> int:
+        xml = []
+        if indice > 0:
+            xml.append('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+        xml.append(self._paragrafo(titulo, self._estilo_titulo))
+        xml.extend(self._paragrafo(linha) for linha in _linhas(revisados))
+        self._corpo.write("".join(xml).encode("utf-8"))
+        self._corpo.flush()
+        return len(xml)
+
+    def _montar(self, destino: str) -> None:
+        # Escreve ao lado e troca: quem estiver lendo nunca vê um .docx pela metade
+        temporario = destino + ".tmp"
+        with zipfile.ZipFile(io.BytesIO(self._modelo)) as modelo, \
+                zipfile.ZipFile(temporario, "w", zipfile.ZIP_DEFLATED) as pacote:
+            for item in modelo.infolist():
+                if item.filename != "word/document.xml":
+                    pacote.writestr(item, modelo.read(item.filename))
+                    continue
+                with pacote.open(item.filename, "w", force_zip64=True) as documento, \
+                        open(self._caminho_corpo, "rb") as corpo:
+                    documento.write(self._cabecalho)
+                    shutil.copyfileobj(corpo, documento, 1 << 20)
+                    documento.write(self._rodape)
+        os.replace(temporario, destino)
+
+    def publicar(self) -> None:
+        self._montar(self.caminho_parcial)
+
+    def finalizar(self) -> None:
+        self._corpo.close()
+        self._montar(self.caminho)
+        for caminho in (self._caminho_corpo, self.caminho_parcial):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+
+class EscritorTexto(EscritorSaida):
+    """
+    Texto puro: título, linha em branco e um parágrafo por linha.
+    O arquivo parcial já é legível; ao final ele só é renomeado.
+    """
+
+    extensao = ".txt"
+
+    def __init__(self, caminho_base: str, autor: str = AUTHOR):
+        super().__init__(caminho_base, autor)
+        self._arquivo = open(self.caminho_parcial, "w", encoding="utf-8")
+
+    def _formatar(self, indice: int, titulo: str, linhas: List[str]) -> str:
+        separador = "\n\n" if indice > 0 else ""
+        return separador + titulo + "\n\n" + "\n".join(linhas) + "\n"
+
+    def adicionar_capitulo(self, indice: int, titulo: str, revisados: List[str]) -> int:
+        linhas = _linhas(revisados)
+        self._arquivo.write(self._formatar(indice, titulo, linhas))
+        self._arquivo.flush()
+        return len(linhas) + 1
+
+    def finalizar(self) -> None:
+        self._arquivo.close()
+        os.replace(self.caminho_parcial, self.caminho)
+
+
+class EscritorMarkdown(EscritorTexto):
+    """
+    Markdown: `# título` por capítulo e parágrafos separados por linha em branco.
+
+    Linhas que o Markdown leria como título, citação ou lista ganham escape;
+    separadores como "***" continuam virando uma linha horizontal.
+    """
+
+    extensao = ".md"
+
+    _PADRAO_MARCACAO = re.compile(r"^(#|>|[-+*] |\d+[.)] )")
+
+    def _formatar(self, indice: int, titulo: str, linhas: List[str]) -> str:
+        corpo = "\n\n".join(self._PADRAO_MARCACAO.sub(r"\\\1", linha) for linha in linhas if linha)
+        separador = "\n" if indice > 0 else ""
+        return f"{separador}# {titulo}\n\n{corpo}\n"
+
+
+class EscritorEpub(EscritorSaida):
+    """
+    EPUB 3 (com toc.ncx para leitores antigos): um XHTML por capítulo, gravado
+    numa pasta intermediária assim que o capítulo chega; o pacote é montado em
+    `publicar`/`finalizar`. Só os títulos ficam na memória (para o sumário).
+    """
+
+    extensao = ".epub"
+
+    def __init__(self, caminho_base: str, autor: str = AUTHOR):
+        super().__init__(caminho_base, autor)
+        self._pasta = self.caminho + ".capitulos"
+        shutil.rmtree(self._pasta, ignore_errors=True)
+        os.makedirs(self._pasta)
+        self._titulos: List[str] = []
+        self._identificador = "urn:sha256:" + hashlib.sha256(caminho_base.encode("utf-8")).hexdigest()[:32]
+
+    def _arquivo_capitulo(self, n: int) -> str:
+        return f"cap_{n + 1:05d}.xhtml"
+
+    def adicionar_capitulo(self, indice: int, titulo: str, revisados: List[str]) -> int:
+        linhas = _linhas(revisados)
+        corpo = "\n".join(f"<p>{_texto_xml(linha)}</p>" if linha else "<p/>" for linha in linhas)
+        xhtml = (
+            '<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE html>\n'
+            '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">\n'
+            f"<head><meta charset=\"utf-8\"/><title>{_texto_xml(titulo)}</title></head>\n"
+            f'<body><section epub:type="chapter">\n<h1>{_texto_xml(titulo)}</h1>\n{corpo}\n</section></body>\n</html>\n'
+        )
+        with open(os.path.join(self._pasta, self._arquivo_capitulo(len(self._titulos))), "w", encoding="utf-8") as f:
+            f.write(xhtml)
+        self._titulos.append(titulo)
+        return len(linhas) + 1
+
+    def _opf(self) -> str:
+        itens = "\n".join(f'<item id="c{n}" href="{self._arquivo_capitulo(n)}" media-type="application/xhtml+xml"/>'
+                          for n in range(len(self._titulos)))
+        espinha = "\n".join(f'<itemref idref="c{n}"/>' for n in range(len(self._titulos)))
+        modificado = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="uid">\n'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+            f'<dc:identifier id="uid">{self._identificador}</dc:identifier>\n'
+            f"<dc:title>{_texto_xml(self.titulo_volume)}</dc:title>\n"
+            f"<dc:creator>{_texto_xml(self.autor)}</dc:creator>\n"
+            "<dc:language>en</dc:language>\n"
+            f'<meta property="dcterms:modified">{modificado}</meta>\n'
+            "</metadata>\n<manifest>\n"
+            '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>\n'
+            '<item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>\n'
+            f'{itens}\n</manifest>\n<spine toc="ncx">\n{espinha}\n</spine>\n</package>\n'
+        )
+
+    def _nav(self) -> str:
+        itens = "\n".join(f'<li><a href="{self._arquivo_capitulo(n)}">{_texto_xml(t)}</a></li>'
+                          for n, t in enumerate(self._titulos))
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE html>\n'
+            '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">\n'
+            f"<head><meta charset=\"utf-8\"/><title>{_texto_xml(self.titulo_volume)}</title></head>\n"
+            f'<body><nav epub:type="toc"><ol>\n{itens}\n</ol></nav></body>\n</html>\n'
+        )
+
+    def _ncx(self) -> str:
+        pontos = "\n".join(
+            f'<navPoint id="p{n}" playOrder="{n + 1}"><navLabel><text>{_texto_xml(t)}</text></navLabel>'
+            f'<content src="{self._arquivo_capitulo(n)}"/></navPoint>'
+            for n, t in enumerate(self._titulos))
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">\n'
+            f'<head><meta name="dtb:uid" content="{self._identificador}"/></head>\n'
+            f"<docTitle><text>{_texto_xml(self.titulo_volume)}</text></docTitle>\n"
+            f"<navMap>\n{pontos}\n</navMap>\n</ncx>\n"
+        )
+
+    def _montar(self, destino: str) -> None:
+        temporario = destino + ".tmp"
+        with zipfile.ZipFile(temporario, "w", zipfile.ZIP_DEFLATED) as pacote:
+            # O "mimetype" precisa ser o primeiro item e sem compressão
+            pacote.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+            pacote.writestr("META-INF/container.xml",
+                            '<?xml version="1.0" encoding="utf-8"?>\n'
+                            '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">\n'
+                            '<rootfiles><rootfile full-path="OEBPS/content.opf" '
+                            'media-type="application/oebps-package+xml"/></rootfiles>\n</container>\n')
+            pacote.writestr("OEBPS/content.opf", self._opf())
+            pacote.writestr("OEBPS/nav.xhtml", self._nav())
+            pacote.writestr("OEBPS/toc.ncx", self._ncx())
+            for n in range(len(self._titulos)):
+                nome = self._arquivo_capitulo(n)
+                pacote.write(os.path.join(self._pasta, nome), "OEBPS/" + nome)
+        os.replace(temporario, destino)
+
+    def publicar(self) -> None:
+        self._montar(self.caminho_parcial)
+
+    def finalizar(self) -> None:
+        self._montar(self.caminho)
+        shutil.rmtree(self._pasta, ignore_errors=True)
+        if os.path.exists(self.caminho_parcial):
+            os.remove(self.caminho_parcial)
+
+
+ESCRITORES = {
+    "docx": EscritorDocx,
+    "txt": EscritorTexto,
+    "md": EscritorMarkdown,
+    "epub": EscritorEpub,
+}
+
+
+class EscritorVolume:
+    """
+    Saída de uma revisão: sempre o .docx, mais os formatos de `SAIDA_FORMATOS_EXTRAS`.
+
+    A cada `publicar_a_cada` capítulos, publica as cópias parciais legíveis
+    (`<saida>.parcial.docx`, `.parcial.epub`...), para acompanhar um volume
+    ainda em revisão. O .docx definitivo só é substituído em `finalizar()` — o
+    manifesto da revisão anterior continua apontando para um arquivo completo.
+
+    Args:
+        caminho_docx (str): Caminho do .docx revisado; os outros formatos usam o mesmo nome.
+        formatos_extras (List[str], opcional): Formatos além do .docx ("txt", "md", "epub").
+        publicar_a_cada (int, opcional): Capítulos entre publicações parciais (0 desliga).
+    """
+
+    def __init__(self, caminho_docx: str, formatos_extras: Optional[List[str]] = None,
+                 publicar_a_cada: int = SAIDA_PUBLICAR_A_CADA, autor: str = AUTHOR):
+        base = os.path.splitext(caminho_docx)[0]
+        extras = SAIDA_FORMATOS_EXTRAS if formatos_extras is None else formatos_extras
+        desconhecidos = [f for f in extras if f not in ESCRITORES or f == "docx"]
+        if desconhecidos:
+            raise ValueError(f"Formatos de saída inválidos: {desconhecidos}")
+        self.docx = EscritorDocx(base, autor)
+        self.escritores: List[EscritorSaida] = [self.docx] + [ESCRITORES[f](base, autor) for f in extras]
+        self.publicar_a_cada = publicar_a_cada
+        self._desde_publicacao = 0
+
+    def adicionar_capitulo(self, indice: int, titulo: str, revisados: List[str]) -> int:
+        """
+        Escreve o capítulo em todos os formatos. Devolve os parágrafos acrescentados ao .docx.
+        """
+        paragrafos = self.docx.adicionar_capitulo(indice, titulo, revisados)
+        for escritor in self.escritores[1:]:
+            escritor.adicionar_capitulo(indice, titulo, revisados)
+
+        self._desde_publicacao += 1
+        if self.publicar_a_cada and self._desde_publicacao >= self.publicar_a_cada:
+            for escritor in self.escritores:
+                escritor.publicar()
+            self._desde_publicacao = 0
+        return paragrafos
+
+    def finalizar(self) -> List[str]:
+        """
+        Grava os arquivos definitivos. Devolve os caminhos gravados.
+        """
+        for escritor in self.escritores:
+            escritor.finalizar()
+        return [escritor.caminho for escritor in self.escritores]
@@ -0,0 +1,144 @@
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from editor.checkpoint import gravar_json_atomico
+from utils.config import FILA_IDADE_MINIMA, FILA_TRABALHOS_CAMINHO
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+FALHOU = "falhou"
+
+
+class FilaTrabalhos:
+    """
+    Fila persistente de arquivos .docx a revisar, um trabalho por arquivo de `pasta_entrada`.
+
+    Estados: pendente → executando → concluido | falhou. O estado fica num JSON
+    (`FILA_TRABALHOS_CAMINHO`) gravado a cada transição; um trabalho que estava
+    "executando" quando o processo caiu volta para "pendente" (o checkpoint do
+    arquivo retoma de onde parou). Um arquivo concluído que for alterado depois
+    volta para a fila.
+
+    Args:
+        pasta_entrada (str): Pasta com os .docx de entrada.
+        caminho (str): JSON de estado da fila.
+    """
+
+    def __init__(self, pasta_entrada: str = os.path.join("dados", "entrada"),
+                 caminho: str = FILA_TRABALHOS_CAMINHO):
+        self.pasta_entrada = pasta_entrada
+        self.caminho = caminho
+        self.trabalhos: Dict[str, dict] = {}
+
+        if os.path.exists(caminho):
+            with open(caminho, "r", encoding="utf-8") as f:
+                self.trabalhos = json.load(f)
+        for nome, trabalho in self.trabalhos.items():
+            if trabalho["estado"] == EXECUTANDO:
+                print(f"[⏩] '{nome}' foi interrompido na última execução; voltando para a fila.")
+                trabalho["estado"] = PENDENTE
+        self._salvar()
+
+    def _impressao(self, nome: str) -> str:
+        info = os.stat(os.path.join(self.pasta_entrada, nome))
+        return f"{info.st_size}:{info.st_mtime_ns}"
+
+    def escanear(self, idade_minima: float = FILA_IDADE_MINIMA) -> List[str]:
+        """
+        Enfileira os .docx novos (ou alterados) da pasta de entrada.
+
+        Args:
+            idade_minima (float): Segundos desde a última modificação para considerar
+                o arquivo completo (evita pegar um arquivo no meio da cópia).
+
+        Returns:
+            List[str]: Arquivos enfileirados nesta varredura.
+        """
+        novos = self.novos(idade_minima)
+        for nome in novos:
+            self.adicionar(nome)
+        return novos
+
+    def novos(self, idade_minima: float = FILA_IDADE_MINIMA) -> List[str]:
+        """
+        Os .docx que `escanear` enfileiraria, sem mexer na fila.
+        """
+        if not os.path.isdir(self.pasta_entrada):
+            return []
+
+        novos = []
+        agora = time.time()
+        for nome in sorted(os.listdir(self.pasta_entrada)):
+            caminho = os.path.join(self.pasta_entrada, nome)
+            # "~$..." são arquivos de trava do Word
+            if not nome.lower().endswith(".docx") or nome.startswith("~$") or not os.path.isfile(caminho):
+                continue
+            if agora - os.path.getmtime(caminho) < idade_minima:
+                continue
+            trabalho = self.trabalhos.get(nome)
+            if trabalho is None or (trabalho["estado"] == CONCLUIDO and trabalho["impressao"] != self._impressao(nome)):
+                novos.append(nome)
+        return novos
+
+    def adicionar(self, nome: str) -> None:
+        """
+        Coloca (ou recoloca) um arquivo da pasta de entrada na fila.
+        """
+        self.trabalhos[nome] = {
+            "estado": PENDENTE,
+            "impressao": self._impressao(nome),
+            "tentativas": self.trabalhos.get(nome, {}).get("tentativas", 0),
+            "erro": "",
+            "atualizado": datetime.now().isoformat(timespec="seconds"),
+        }
+        self._salvar()
+
+    def pendentes(self) -> List[str]:
+        """
+        Trabalhos pendentes cujo arquivo ainda existe, em ordem alfabética.
+        """
+        return sorted(
+            nome for nome, t in self.trabalhos.items()
+            if t["estado"] == PENDENTE and os.path.isfile(os.path.join(self.pasta_entrada, nome))
+        )
+
+    def marcar(self, nome: str, estado: str, erro: Optional[str] = None) -> None:
+        """
+        Registra a transição de estado de um trabalho.
+        """
+        trabalho = self.trabalhos[nome]
+        trabalho["estado"] = estado
+        trabalho["erro"] = erro or ""
+        trabalho["atualizado"] = datetime.now().isoformat(timespec="seconds")
+        if estado == EXECUTANDO:
+            trabalho["tentativas"] += 1
+        if estado == CONCLUIDO and os.path.isfile(os.path.join(self.pasta_entrada, nome)):
+            trabalho["impressao"] = self._impressao(nome)
+        self._salvar()
+
+    def reprocessar_falhas(self) -> List[str]:
+        """
+        Devolve para a fila os trabalhos que falharam.
+        """
+        falhas = [nome for nome, t in self.trabalhos.items() if t["estado"] == FALHOU]
+        for nome in falhas:
+            self.marcar(nome, PENDENTE)
+        return falhas
+
+    def resumo(self) -> Dict[str, int]:
+        """
+        Quantidade de trabalhos por estado.
+        """
+        contagem = {estado: 0 for estado in (PENDENTE, EXECUTANDO, CONCLUIDO, FALHOU)}
+        for trabalho in self.trabalhos.values():
+            contagem[trabalho["estado"]] += 1
+        return contagem
+
+    def _salvar(self) -> None:
+        if os.path.dirname(self.caminho):
+            os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        gravar_json_atomico(self.caminho, self.trabalhos)
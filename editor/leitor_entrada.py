@@ -0,0 +1,184 @@
+"""
+Leitura em streaming do .docx de entrada.
+
+O python-docx monta a árvore inteira do documento e resolve o estilo de cada
+parágrafo varrendo todos os estilos do arquivo; em volumes com milhares de
+capítulos isso leva minutos e boa parte da memória. Aqui o `word/document.xml`
+é lido direto do zip com `iterparse`, parágrafo a parágrafo (cada um é
+descartado depois de lido), e os estilos são resolvidos uma vez, por id.
+
+O resultado é o mesmo de `separar_capitulos(Document(caminho))`: mesmos
+parágrafos (só os do corpo, fora de tabelas), mesmo texto e mesmos títulos.
+"""
+import posixpath
+import zipfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from docx.parts.styles import StylesPart
+from docx.styles import BabelFish
+from lxml import etree
+
+# Estilos que abrem um capítulo (nomes como o python-docx mostra)
+ESTILOS_TITULO = ("Heading 1", "Heading 2")
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_RELACAO = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+_TIPO_DOCUMENTO = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+_TIPO_ESTILOS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+
+# Texto dos elementos de um run, como `Run.text` do python-docx (w:t e w:br tratados à parte)
+_TEXTO_FIXO = {_W + "tab": "\t", _W + "ptab": "\t", _W + "cr": "\n", _W + "noBreakHyphen": "-"}
+
+
+def agrupar_capitulos(paragrafos: Iterable[Tuple[bool, str]]) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Agrupa parágrafos em capítulos, à medida que chegam.
+
+    Um título abre um capítulo novo; o anterior só é emitido se tiver
+    parágrafos. Parágrafos vazios e repetições do título são descartados.
+
+    Args:
+        paragrafos (Iterable[Tuple[bool, str]]): (é título, texto) de cada parágrafo, em ordem.
+
+    Yields:
+        Tuple[str, List[str]]: (título, parágrafos não vazios).
+    """
+    titulo_atual = None
+    buffer = []
+
+    for eh_titulo, texto in paragrafos:
+        if eh_titulo:
+            if titulo_atual and buffer:
+                yield titulo_atual, buffer
+                buffer = []
+            titulo_atual = texto.strip()
+        else:
+            texto = texto.strip()
+            if texto and texto != titulo_atual:
+                buffer.append(texto)
+
+    if titulo_atual and buffer:
+        yield titulo_atual, buffer
+
+
+def _relacoes(pacote: zipfile.ZipFile, parte: str) -> Dict[str, str]:
+    """
+    Tipo de relação -> parte de destino (caminho no zip), a partir do `.rels` da parte.
+    """
+    diretorio, nome = posixpath.split(parte)
+    try:
+        raiz = etree.fromstring(pacote.read(posixpath.join(diretorio, "_rels", nome + ".rels")))
+    except KeyError:
+        return {}
+    destinos: Dict[str, str] = {}
+    for relacao in raiz.iter(_RELACAO):
+        if relacao.get("TargetMode") == "External":
+            continue
+        alvo = posixpath.normpath(posixpath.join("/" + diretorio, relacao.get("Target", "")))
+        destinos.setdefault(relacao.get("Type"), alvo.lstrip("/"))
+    return destinos
+
+
+def _estilos_titulo(xml_estilos: bytes) -> Tuple[set, bool, set]:
+    """
+    Resolve os estilos de parágrafo como o python-docx faz.
+
+    Um id vale o primeiro `w:style` com ele, desde que seja de parágrafo; id
+    ausente, desconhecido ou de outro tipo cai no estilo de parágrafo padrão
+    (o último marcado `w:default`).
+
+    Returns:
+        Tuple[set, bool, set]: (ids de parágrafo que são título, se o estilo padrão
+            é título, todos os ids de parágrafo).
+    """
+    raiz = etree.fromstring(xml_estilos)
+    de_paragrafo: Dict[str, bool] = {}
+    vistos = set()
+    padrao_titulo = False
+    for estilo in raiz.iterchildren(_W + "style"):
+        nome = estilo.find(_W + "name")
+        eh_titulo = nome is not None and BabelFish.internal2ui(nome.get(_W + "val")) in ESTILOS_TITULO
+        paragrafo = estilo.get(_W + "type") == "paragraph"
+        if paragrafo and estilo.get(_W + "default") in ("1", "true", "on"):
+            padrao_titulo = eh_titulo
+        id_estilo = estilo.get(_W + "styleId")
+        if id_estilo is not None and id_estilo not in vistos:
+            vistos.add(id_estilo)
+            if paragrafo:
+                de_paragrafo[id_estilo] = eh_titulo
+    return {i for i, titulo in de_paragrafo.items() if titulo}, padrao_titulo, set(de_paragrafo)
+
+
+def _texto_run(run, partes: List[str]) -> None:
+    for filho in run:
+        tag = filho.tag
+        if tag == _W + "t":
+            partes.append(filho.text or "")
+        elif tag == _W + "br":
+            # Quebras de página/coluna não viram texto, só as de linha
+            partes.append("\n" if filho.get(_W + "type", "textWrapping") == "textWrapping" else "")
+        elif tag in _TEXTO_FIXO:
+            partes.append(_TEXTO_FIXO[tag])
+
+
+def _texto_paragrafo(paragrafo) -> str:
+    """Texto de um `w:p`, como `Paragraph.text` (runs diretos e runs de hyperlinks)."""
+    partes: List[str] = []
+    for filho in paragrafo:
+        if filho.tag == _W + "r":
+            _texto_run(filho, partes)
+        elif filho.tag == _W + "hyperlink":
+            for run in filho.iterchildren(_W + "r"):
+                _texto_run(run, partes)
+    return "".join(partes)
+
+
+def _id_estilo(paragrafo) -> Optional[str]:
+    propriedades = paragrafo.find(_W + "pPr")
+    if propriedades is None:
+        return None
+    estilo = propriedades.find(_W + "pStyle")
+    return None if estilo is None else estilo.get(_W + "val")
+
+
+def iterar_paragrafos(caminho: str) -> Iterator[Tuple[bool, str]]:
+    """
+    (é título, texto) de cada parágrafo do corpo do .docx, lidos em streaming.
+
+    Args:
+        caminho (str): Caminho do .docx.
+    """
+    with zipfile.ZipFile(caminho) as pacote:
+        documento = _relacoes(pacote, "").get(_TIPO_DOCUMENTO, "word/document.xml")
+        parte_estilos = _relacoes(pacote, documento).get(_TIPO_ESTILOS)
+        if parte_estilos in pacote.namelist():
+            xml_estilos = pacote.read(parte_estilos)
+        else:
+            # Sem estilos no pacote, o python-docx usa os do seu modelo padrão
+            xml_estilos = StylesPart._default_styles_xml()
+        ids_titulo, padrao_titulo, ids_paragrafo = _estilos_titulo(xml_estilos)
+
+        with pacote.open(documento) as xml:
+            for _, paragrafo in etree.iterparse(xml, events=("end",), tag=_W + "p", huge_tree=True):
+                corpo = paragrafo.getparent()
+                if corpo is None or corpo.tag != _W + "body":
+                    continue  # tabelas, caixas de texto etc.: fora de `doc.paragraphs`
+                id_estilo = _id_estilo(paragrafo)
+                eh_titulo = id_estilo in ids_titulo if id_estilo in ids_paragrafo else padrao_titulo
+                texto = _texto_paragrafo(paragrafo)
+                # Descarta o parágrafo e tudo o que veio antes dele no corpo: a memória fica constante
+                paragrafo.clear()
+                while paragrafo.getprevious() is not None:
+                    del corpo[0]
+                yield eh_titulo, texto
+
+
+def iterar_capitulos(caminho: str) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Capítulos (título, parágrafos não vazios) do .docx, um de cada vez, sem
+    carregar o documento inteiro. Mesma divisão de `separar_capitulos`.
+
+    Args:
+        caminho (str): Caminho do .docx.
+    """
+    return agrupar_capitulos(iterar_paragrafos(caminho))
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import zipfile
+from typing import Dict, List, Optional, Tuple
+
+from editor.checkpoint import gravar_json_atomico
+from editor.leitor_entrada import iterar_paragrafos
+from utils.config import (ABORTO_ATIVO, ABORTO_FOLGA_TAMANHO, ABORTO_LOOP_MAX_NGRAM, ABORTO_LOOP_MIN_TOKENS,
+                          ABORTO_LOOP_REPETICOES, ABORTO_MARCADORES, ABORTO_RAZAO_TAMANHO, BACKEND, MODEL_NAME,
+                          PROMPT_TEMPLATE, TEMPERATURA_RETENTATIVA, TEMPERATURE, TRIAGEM_ATIVA, TRIAGEM_LIMIAR)
+
+
+def impressao_capitulo(titulo: str, paragrafos: List[str]) -> str:
+    """
+    Impressão digital (sha256) de um capítulo: título mais o hash de cada parágrafo.
+    """
+    h = hashlib.sha256(titulo.encode("utf-8"))
+    for par in paragrafos:
+        h.update(hashlib.sha256(par.encode("utf-8")).digest())
+    return h.hexdigest()
+
+
+def impressao_configuracao() -> str:
+    """
+    Impressão da configuração de revisão: trocar backend, modelo, prompt,
+    temperatura, triagem ou aborto antecipado invalida tudo o que foi revisado antes.
+    """
+    h = hashlib.sha256()
+    triagem = repr(float(TRIAGEM_LIMIAR)) if TRIAGEM_ATIVA else "sem triagem"
+    aborto = repr((ABORTO_LOOP_MAX_NGRAM, ABORTO_LOOP_REPETICOES, ABORTO_LOOP_MIN_TOKENS, float(ABORTO_RAZAO_TAMANHO),
+                   ABORTO_FOLGA_TAMANHO, list(ABORTO_MARCADORES))) if ABORTO_ATIVO else "sem aborto"
+    for parte in (BACKEND, MODEL_NAME, PROMPT_TEMPLATE, repr(float(TEMPERATURE)), repr(float(TEMPERATURA_RETENTATIVA)),
+                  triagem, aborto):
+        h.update(parte.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class ManifestoRevisao:
+    """
+    Manifesto gravado ao lado do .docx revisado (`<saida>.manifesto.json`).
+
+    Guarda, para cada capítulo da saída, a impressão do capítulo de entrada e a
+    faixa de parágrafos que ele ocupa no documento revisado. Na próxima revisão
+    do mesmo arquivo, capítulos com a mesma impressão são copiados da saída
+    anterior em vez de passar de novo pelo LLM.
+
+    Args:
+        caminho_saida (str): Caminho do .docx revisado.
+    """
+
+    def __init__(self, caminho_saida: str):
+        self.caminho_saida = caminho_saida
+        self.caminho = os.path.splitext(caminho_saida)[0] + ".manifesto.json"
+        self.capitulos: List[dict] = []
+        self._anterior: Optional[Tuple[Dict[str, List[dict]], List[str]]] = None
+
+    def _carregar_anterior(self) -> Tuple[Dict[str, List[dict]], List[str]]:
+        """
+        (entradas do manifesto anterior por impressão, textos dos parágrafos da saída anterior),
+        lidos na primeira consulta. Vazios se não houver saída reaproveitável.
+        """
+        if self._anterior is None:
+            self._anterior = ({}, [])
+            try:
+                with open(self.caminho, "r", encoding="utf-8") as f:
+                    anterior = json.load(f)
+                if anterior.get("configuracao") != impressao_configuracao():
+                    return self._anterior
+                # Leitura em streaming, só do texto: as faixas do manifesto contam todos os
+                # parágrafos do corpo (inclusive os vazios das quebras de página)
+                textos = [texto for _, texto in iterar_paragrafos(self.caminho_saida)]
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile, SyntaxError):
+                return self._anterior
+            por_impressao: Dict[str, List[dict]] = {}
+            for entrada in anterior.get("capitulos", []):
+                por_impressao.setdefault(entrada["impressao"], []).append(entrada)
+            self._anterior = (por_impressao, textos)
+        return self._anterior
+
+    def reaproveitar(self, impressao: str, titulo: str) -> Optional[dict]:
+        """
+        Procura o próximo capítulo da entrada atual no manifesto anterior.
+
+        Chamado uma vez por capítulo, na ordem da entrada (a revisão faz isso
+        conforme lê o arquivo). Capítulos são casados pela impressão, não pela
+        posição: inserir um capítulo novo no meio do volume não invalida os seguintes.
+
+        Args:
+            impressao (str): Impressão do capítulo (ver `impressao_capitulo`).
+            titulo (str): Título do capítulo.
+
+        Returns:
+            dict | None: `paragrafos` (textos da saída anterior) e `estatisticas`, ou None.
+        """
+        por_impressao, textos = self._carregar_anterior()
+        candidatos = por_impressao.get(impressao)
+        if not candidatos:
+            return None
+        entrada = candidatos.pop(0)
+        inicio, fim = entrada["paragrafos"]
+        # A saída pode ter sido editada à mão depois do manifesto: confere o título
+        if fim > len(textos) or inicio < 1 or textos[inicio - 1] != titulo:
+            return None
+        return {"paragrafos": textos[inicio:fim], "estatisticas": entrada.get("estatisticas", {})}
+
+    def reaproveitaveis(self, impressoes: List[str], titulos: List[str]) -> Dict[int, dict]:
+        """
+        Compara as impressões de todos os capítulos atuais com o manifesto anterior (ver `reaproveitar`).
+
+        Args:
+            impressoes (List[str]): Impressão de cada capítulo da entrada atual.
+            titulos (List[str]): Título de cada capítulo da entrada atual.
+
+        Returns:
+            Dict[int, dict]: índice do capítulo -> `paragrafos` (textos da saída anterior) e `estatisticas`.
+        """
+        reaproveitados = {}
+        for i, (impressao, titulo) in enumerate(zip(impressoes, titulos)):
+            anterior = self.reaproveitar(impressao, titulo)
+            if anterior is not None:
+                reaproveitados[i] = anterior
+        return reaproveitados
+
+    def registrar(self, titulo: str, impressao: str, paragrafos: Tuple[int, int], estatisticas: dict) -> None:
+        """
+        Registra um capítulo escrito na saída atual.
+
+        Args:
+            paragrafos (Tuple[int, int]): Faixa [início, fim) dos parágrafos do corpo do capítulo.
+        """
+        self.capitulos.append({
+            "titulo": titulo,
+            "impressao": impressao,
+            "paragrafos": list(paragrafos),
+            "estatisticas": estatisticas,
+        })
+
+    def salvar(self) -> None:
+        """
+        Grava o manifesto (depois do .docx, para nunca apontar para uma saída que não existe).
+        """
+        gravar_json_atomico(self.caminho, {"configuracao": impressao_configuracao(), "capitulos": self.capitulos})
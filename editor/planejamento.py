@@ -0,0 +1,230 @@
+"""
+Planejamento de revisões: estima quanto tempo cada volume vai levar, sem carregar o modelo.
+
+Lê o .docx, segmenta os capítulos como a revisão faria, conta os tokens de
+entrada (tokenizer rápido do modelo, se estiver no disco; senão a estimativa
+do segmentador) e converte em tempo pela vazão observada nas execuções
+anteriores (`HISTORICO_REVISOES`). Não importa torch nem transformers.
+
+Uso (na raiz do projeto):
+    python app.py --planejar                  # arquivos pendentes/novos de dados/entrada
+    python -m editor.planejamento volume.docx --detalhar
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from editor.leitor_entrada import iterar_capitulos
+from editor.manifesto import ManifestoRevisao, impressao_capitulo
+from processamento.segmentador import estimar_tokens, segmentar_capitulo
+from utils.config import BACKEND, HISTORICO_REVISOES, MODEL_NAME, PLANO_TOKENS_POR_SEGUNDO
+
+
+@dataclass
+class Ritmo:
+    """
+    Vazão usada na estimativa: segundos de relógio por token de entrada.
+
+    Attributes:
+        segundos_por_token (float): Inclui geração, retentativas, limpeza e escrita.
+        execucoes (int): Execuções do histórico que entraram na média (0: valor padrão).
+        fonte (str): De onde veio o ritmo, para o relatório.
+    """
+    segundos_por_token: float
+    execucoes: int = 0
+    fonte: str = "padrão"
+
+
+@dataclass
+class PlanoCapitulo:
+    titulo: str
+    blocos: int
+    tokens: int
+    segundos: float
+    reaproveitado: bool = False  # inalterado desde a última saída (manifesto): não passa pelo LLM
+
+
+@dataclass
+class PlanoArquivo:
+    nome: str
+    capitulos: List[PlanoCapitulo] = field(default_factory=list)
+    tempo_leitura: float = 0.0  # segundos gastos para planejar este arquivo
+
+    @property
+    def segundos(self) -> float:
+        return sum(c.segundos for c in self.capitulos)
+
+    @property
+    def tokens(self) -> int:
+        return sum(c.tokens for c in self.capitulos if not c.reaproveitado)
+
+    @property
+    def blocos(self) -> int:
+        return sum(c.blocos for c in self.capitulos if not c.reaproveitado)
+
+
+def carregar_historico(caminho: Optional[str] = HISTORICO_REVISOES) -> List[dict]:
+    """
+    Lê o histórico de execuções. Sem ele, recorre ao evento "fim" dos logs JSONL
+    de `dados/logs` (execuções anteriores ao histórico).
+    """
+    registros = []
+    if caminho and os.path.exists(caminho):
+        with open(caminho, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    registros.append(json.loads(linha))
+                except ValueError:
+                    continue  # linha cortada por uma execução interrompida
+    if registros:
+        return registros
+
+    for log in glob.glob(os.path.join("dados", "logs", "*_log_*.jsonl")):
+        try:
+            with open(log, "rb") as f:
+                # O "fim" é a última linha: lê só a cauda do arquivo
+                f.seek(max(0, os.path.getsize(log) - 8192))
+                evento = json.loads(f.read().decode("utf-8", "ignore").strip().splitlines()[-1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if evento.get("evento") == "fim":
+            registros.append(evento)
+    return registros
+
+
+def estimar_ritmo(historico: List[dict], backend: str = BACKEND, modelo: str = MODEL_NAME) -> Ritmo:
+    """
+    Segundos por token de entrada, ponderados pelos tokens de cada execução.
+
+    Prefere execuções com o mesmo backend e modelo; depois, o mesmo backend
+    (execuções do backend "fake" não dizem nada sobre o modelo real). Sem
+    histórico, usa `PLANO_TOKENS_POR_SEGUNDO`.
+    """
+    validos = [r for r in historico if r.get("tokens") and r.get("duracao_segundos")]
+    filtros = [
+        (lambda r: r.get("backend") == backend and r.get("modelo") == modelo, f"histórico de {modelo}"),
+        (lambda r: r.get("backend") == backend, f"histórico do backend {backend}"),
+    ]
+    for filtro, fonte in filtros:
+        escolhidos = [r for r in validos if filtro(r)]
+        if escolhidos:
+            segundos = sum(r["duracao_segundos"] for r in escolhidos)
+            tokens = sum(r["tokens"] for r in escolhidos)
+            return Ritmo(segundos / tokens, len(escolhidos), fonte)
+    return Ritmo(1 / PLANO_TOKENS_POR_SEGUNDO)
+
+
+def contador_tokens(modelo: str = MODEL_NAME) -> Tuple[Callable[[str], int], str]:
+    """
+    Contador de tokens sem transformers: o `tokenizer.json` do modelo pela
+    biblioteca `tokenizers` (pasta local ou cache do Hugging Face, sem baixar
+    nada). Se não houver, a estimativa por palavras do segmentador.
+
+    Returns:
+        Tuple[Callable, str]: (contador, descrição para o relatório).
+    """
+    try:
+        from tokenizers import Tokenizer
+        caminho = os.path.join(modelo, "tokenizer.json")
+        if not os.path.isfile(caminho):
+            from huggingface_hub import try_to_load_from_cache
+            caminho = try_to_load_from_cache(modelo, "tokenizer.json")
+        if isinstance(caminho, str) and os.path.isfile(caminho):
+            tokenizer = Tokenizer.from_file(caminho)
+            return (lambda texto: len(tokenizer.encode(texto, add_special_tokens=False).ids)), "tokenizer.json"
+    except Exception:
+        pass
+    return estimar_tokens, "estimativa por palavras"
+
+
+def planejar_arquivo(nome_arquivo: str, ritmo: Ritmo, contar: Callable[[str], int] = estimar_tokens,
+                     pasta_entrada: str = os.path.join("dados", "entrada")) -> PlanoArquivo:
+    """
+    Estima a revisão de um .docx de `pasta_entrada`, capítulo a capítulo.
+    """
+    inicio = time.perf_counter()
+    capitulos = list(iterar_capitulos(os.path.join(pasta_entrada, nome_arquivo)))
+    # Mesmo critério da revisão incremental: capítulos inalterados desde a última saída não passam pelo LLM
+    base = os.path.splitext(nome_arquivo)[0]
+    manifesto = ManifestoRevisao(os.path.join("dados", "saida", f"{base}_revisado.docx"))
+    inalterados = manifesto.reaproveitaveis([impressao_capitulo(t, p) for t, p in capitulos], [t for t, _ in capitulos])
+
+    plano = PlanoArquivo(nome_arquivo)
+    for i, (titulo, paragrafos) in enumerate(capitulos):
+        reaproveitado = i in inalterados
+        blocos = segmentar_capitulo("\n".join(paragrafos), contador=contar)
+        tokens = sum(contar(bloco) for bloco in blocos)
+        segundos = 0.0 if reaproveitado else tokens * ritmo.segundos_por_token
+        plano.capitulos.append(PlanoCapitulo(titulo, len(blocos), tokens, segundos, reaproveitado))
+    plano.tempo_leitura = time.perf_counter() - inicio
+    return plano
+
+
+def formatar_duracao(segundos: float) -> str:
+    """
+    Ex: "2h 05m", "7m 30s", "12s".
+    """
+    segundos = int(round(segundos))
+    if segundos >= 3600:
+        return f"{segundos // 3600}h {(segundos % 3600) // 60:02d}m"
+    if segundos >= 60:
+        return f"{segundos // 60}m {segundos % 60:02d}s"
+    return f"{segundos}s"
+
+
+def imprimir_planos(planos: List[PlanoArquivo], ritmo: Ritmo, contador: str, detalhar: bool = False) -> None:
+    """
+    Relatório do planejamento: um arquivo por linha (e os capítulos, com `detalhar`) e o total.
+    """
+    fonte = f"{ritmo.fonte}, {ritmo.execucoes} execuções" if ritmo.execucoes else ritmo.fonte
+    print(f"[🧭] Ritmo: {1 / ritmo.segundos_por_token:,.1f} tokens de entrada/s ({fonte}) | tokens: {contador}")
+    for plano in planos:
+        reaproveitados = sum(1 for c in plano.capitulos if c.reaproveitado)
+        extra = f", {reaproveitados} inalterados" if reaproveitados else ""
+        print(f"[📘] {plano.nome}: {len(plano.capitulos)} capítulos{extra} | {plano.blocos} blocos | "
+              f"{plano.tokens:,} tokens | ~{formatar_duracao(plano.segundos)}")
+        if detalhar:
+            for c in plano.capitulos:
+                estimativa = "inalterado" if c.reaproveitado else f"~{formatar_duracao(c.segundos)}"
+                print(f"     {c.titulo[:60]:<60} {c.blocos:>4} blocos {c.tokens:>7,} tokens  {estimativa}")
+    total = sum(p.segundos for p in planos)
+    print(f"[⏱️] Total estimado: ~{formatar_duracao(total)} para {len(planos)} arquivo(s)")
+
+
+def planejar(nomes_arquivos: List[str], detalhar: bool = False, como_json: bool = False,
+             pasta_entrada: str = os.path.join("dados", "entrada")) -> List[PlanoArquivo]:
+    """
+    Planeja vários arquivos e imprime o relatório (ou o JSON, para agendar a fila por fora).
+    """
+    ritmo = estimar_ritmo(carregar_historico())
+    contar, contador = contador_tokens()
+    planos = [planejar_arquivo(nome, ritmo, contar, pasta_entrada) for nome in nomes_arquivos]
+    if como_json:
+        print(json.dumps({
+            "ritmo": asdict(ritmo),
+            "arquivos": [{"nome": p.nome, "segundos": p.segundos, "tokens": p.tokens, "blocos": p.blocos,
+                          "capitulos": [asdict(c) for c in p.capitulos]} for p in planos],
+        }, ensure_ascii=False, indent=2))
+    else:
+        imprimir_planos(planos, ritmo, contador, detalhar)
+    return planos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("arquivos", nargs="*", help="arquivos de dados/entrada (padrão: todos os .docx)")
+    parser.add_argument("--detalhar", action="store_true", help="mostra a estimativa de cada capítulo")
+    parser.add_argument("--json", action="store_true", help="imprime o plano em JSON")
+    args = parser.parse_args()
+
+    pasta = os.path.join("dados", "entrada")
+    nomes = args.arquivos or sorted(n for n in os.listdir(pasta) if n.lower().endswith(".docx") and not n.startswith("~$"))
+    planejar(nomes, detalhar=args.detalhar, como_json=args.json, pasta_entrada=pasta)
+
+
+if __name__ == "__main__":
+    main()
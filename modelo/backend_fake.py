@@ -0,0 +1,152 @@
+import re
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Union
+
+from modelo.carregador import BackendInferencia, Geracao, MemoriaEsgotada
+from utils.config import ABORTO_ATIVO, ABORTO_LOOP_MIN_TOKENS, ABORTO_LOOP_REPETICOES, TEMPERATURA_RETENTATIVA
+
+# Extrai o bloco original de dentro do prompt montado com PROMPT_TEMPLATE
+_PADRAO_BLOCO = re.compile(r"<start>\n(.*?)\n<end>", re.DOTALL)
+_PADRAO_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+class BackendFake(BackendInferencia):
+    """
+    Backend determinístico para testes e benchmarks em CPU.
+
+    Não carrega modelo algum: a "revisão" apenas normaliza espaços e
+    capitaliza o início de cada linha do bloco, devolvendo só a resposta,
+    como o backend real.
+
+    Opcionalmente simula o custo de uma GPU por lote (via `time.sleep`):
+    `latencia_fixa` + `latencia_prefill` por token do lote com padding
+    + `latencia_decodificacao` por passo (o lote anda até a sequência mais longa).
+
+    `taxa_falha` faz uma fração fixa dos blocos (escolhida pelo hash do bloco)
+    voltar vazia abaixo de `TEMPERATURA_RETENTATIVA`, para exercitar as retentativas.
+    `taxa_degeneracao` faz outra fração entrar em loop depois da revisão,
+    repetindo a última linha: com `abortar`, a geração para como no
+    `AbortoDegenerado` (motivo "repeticao"); sem, segue até o orçamento.
+
+    `memoria_tokens` simula a memória do dispositivo: um lote cujas linhas x
+    (largura do prompt + maior orçamento) passem disso levanta
+    `MemoriaEsgotada`, como um OOM da GPU. `memoria_estimada` é o que
+    `orcamento_tokens_lote` informa (None: não sabe estimar), e pode ser
+    otimista de propósito para exercitar o recuo.
+    """
+
+    nome = "fake"
+
+    def __init__(self, batch_size: int = 4, vocab: int = 32000, latencia_fixa: float = 0.0,
+                 latencia_prefill: float = 0.0, latencia_decodificacao: float = 0.0, taxa_falha: float = 0.0,
+                 taxa_degeneracao: float = 0.0, abortar: bool = ABORTO_ATIVO, memoria_tokens: Optional[int] = None,
+                 memoria_estimada: Optional[int] = None):
+        self.batch_size = batch_size
+        self.vocab = vocab
+        self.latencia_fixa = latencia_fixa
+        self.latencia_prefill = latencia_prefill
+        self.latencia_decodificacao = latencia_decodificacao
+        self.taxa_falha = taxa_falha
+        self.taxa_degeneracao = taxa_degeneracao
+        self.abortar = abortar
+        self.memoria_tokens = memoria_tokens
+        self.memoria_estimada = memoria_estimada
+        self.falhas_memoria = 0
+        self.chamadas_gerar = 0
+        self.prompts_gerados = 0
+
+    def _revisar(self, bloco: str) -> str:
+        linhas = []
+        for linha in bloco.split("\n"):
+            linha = re.sub(r"\s+", " ", linha).strip()
+            if linha:
+                linha = linha[0].upper() + linha[1:]
+            linhas.append(linha)
+        return "\n".join(linhas)
+
+    def _falha(self, bloco: str, temperatura: float) -> bool:
+        if not self.taxa_falha or temperatura >= TEMPERATURA_RETENTATIVA:
+            return False
+        return zlib.crc32(bloco.encode("utf-8")) % 1000 < self.taxa_falha * 1000
+
+    def _degenera(self, bloco: str, temperatura: float) -> bool:
+        if not self.taxa_degeneracao or temperatura >= TEMPERATURA_RETENTATIVA:
+            return False
+        return zlib.crc32(("loop:" + bloco).encode("utf-8")) % 1000 < self.taxa_degeneracao * 1000
+
+    def _em_loop(self, resposta: str, orcamento: int) -> Geracao:
+        """
+        Revisão seguida da última linha repetida até o orçamento (ou até o aborto).
+        """
+        tokens = _PADRAO_TOKEN.findall(resposta)
+        ciclo = _PADRAO_TOKEN.findall(resposta.split("\n")[-1]) or tokens[-1:] or ["."]
+        limite = orcamento
+        if self.abortar:
+            limite = min(orcamento, len(tokens) + max(len(ciclo) * ABORTO_LOOP_REPETICOES, ABORTO_LOOP_MIN_TOKENS))
+        while len(tokens) < limite:
+            tokens += ciclo
+        tokens = tokens[:limite]
+        texto = " ".join(tokens)
+        return Geracao(texto=texto, ids=self._ids(texto), tokens_gerados=limite, orcamento=orcamento,
+                       motivo_parada="repeticao" if limite < orcamento else "orcamento")
+
+    def gerar(self, prompts: List[str], max_new_tokens: Union[int, List[int]], temperature: Union[float, List[float]],
+              ids_prompts: Optional[List[List[int]]] = None,
+              tamanhos_blocos: Optional[List[int]] = None) -> List[Geracao]:
+        orcamentos = list(max_new_tokens) if isinstance(max_new_tokens, (list, tuple)) else [max_new_tokens] * len(prompts)
+        if self.memoria_tokens is not None and len(prompts) > 1:
+            largura = max(len(ids) for ids in (ids_prompts or self.tokenizar(prompts)))
+            if len(prompts) * (largura + max(orcamentos)) > self.memoria_tokens:
+                self.falhas_memoria += 1
+                raise MemoriaEsgotada(f"Lote de {len(prompts)} prompts não coube em {self.memoria_tokens} tokens")
+        self.chamadas_gerar += 1
+        self.prompts_gerados += len(prompts)
+        temperaturas = list(temperature) if isinstance(temperature, (list, tuple)) else [temperature] * len(prompts)
+
+        resultados = []
+        for prompt, orcamento, temperatura in zip(prompts, orcamentos, temperaturas):
+            achado = _PADRAO_BLOCO.search(prompt)
+            bloco = achado.group(1) if achado else ""
+            if self._falha(bloco, temperatura):
+                resultados.append(Geracao(texto="", ids=[], tokens_gerados=1, orcamento=orcamento))
+                continue
+            resposta = self._revisar(bloco)
+            if self._degenera(bloco, temperatura):
+                resultados.append(self._em_loop(resposta, orcamento))
+                continue
+            # Respeita o orçamento como o modelo real faria (+1 passo para o <|im_end|>)
+            tokens = _PADRAO_TOKEN.findall(resposta)
+            if len(tokens) + 1 > orcamento:
+                resposta = " ".join(tokens[:orcamento])
+                resultados.append(Geracao(texto=resposta, ids=self._ids(resposta), tokens_gerados=orcamento,
+                                          orcamento=orcamento, motivo_parada="orcamento"))
+            else:
+                resultados.append(Geracao(texto=resposta, ids=self._ids(resposta), tokens_gerados=len(tokens) + 1,
+                                          orcamento=orcamento, motivo_parada="fim"))
+
+        if self.latencia_fixa or self.latencia_prefill or self.latencia_decodificacao:
+            largura = max((len(ids) for ids in (ids_prompts or self.tokenizar(prompts))), default=0)
+            passos = max((r.tokens_gerados for r in resultados), default=0)
+            time.sleep(self.latencia_fixa
+                       + self.latencia_prefill * largura * len(prompts)
+                       + self.latencia_decodificacao * passos)
+        return resultados
+
+    def _ids(self, texto: str) -> List[int]:
+        return [zlib.crc32(tok.encode("utf-8")) % self.vocab for tok in _PADRAO_TOKEN.findall(texto)]
+
+    def tokenizar(self, textos: List[str]) -> List[List[int]]:
+        return [self._ids(texto) for texto in textos]
+
+    def orcamento_tokens_lote(self) -> Optional[int]:
+        return self.memoria_estimada
+
+    def capacidades(self) -> Dict[str, Any]:
+        return {
+            "nome": self.nome,
+            "modelo": "fake",
+            "dispositivo": "cpu",
+            "batch_size": self.batch_size,
+            "max_contexto": None,
+        }
@@ -1,38 +1,585 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM
-from transformers.pipelines import pipeline
+import os
+import threading
+import warnings
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
 
-from utils.config import MODEL_NAME
-import torch
+from utils.config import (ABORTO_ATIVO, ABORTO_FOLGA_TAMANHO, ABORTO_LOOP_MAX_NGRAM, ABORTO_LOOP_MIN_TOKENS,
+                          ABORTO_LOOP_REPETICOES, ABORTO_MARCADORES, ABORTO_RAZAO_TAMANHO, ASSISTIDA_NGRAM_MAX,
+                          ASSISTIDA_TOKENS_RASCUNHO, BACKEND, CACHE_PREFIXO_KV, CPU_QUANTIZACAO, CPU_THREADS,
+                          DECODIFICACAO_ASSISTIDA, DISPOSITIVO, LOTE_FRACAO_MEMORIA, MODEL_NAME, PROMPT_TEMPLATE,
+                          TOKENIZER_RAPIDO)
 
+# Motivos de parada de uma geração abortada por degenerar (ver `AbortoDegenerado`)
+MOTIVOS_ABORTO = ("repeticao", "tamanho", "marcador")
+
+
+class MemoriaEsgotada(RuntimeError):
+    """
+    O lote não coube na memória do dispositivo. O backend já liberou o que
+    pôde; o mesmo lote pode ser tentado de novo, menor.
+    """
+
+
+@dataclass
+class Geracao:
+    """
+    Resultado da geração de um prompt.
+
+    Attributes:
+        texto (str): Apenas a resposta gerada (sem ecoar o prompt).
+        ids (List[int]): IDs dos tokens da resposta, sem o token de parada.
+        tokens_gerados (int): Passos de decodificação gastos nesta sequência.
+        orcamento (int): Limite de tokens que a sequência tinha.
+        motivo_parada (str): "fim" (token de parada emitido), "orcamento" (limite atingido)
+            ou um dos `MOTIVOS_ABORTO`, quando a geração foi abortada por degenerar.
+        rascunho_propostos (int): Tokens copiados do prompt e propostos ao modelo
+            (decodificação assistida; 0 na decodificação normal).
+        rascunho_aceitos (int): Quantos desses tokens o modelo confirmou.
+    """
+    texto: str
+    ids: List[int] = field(default_factory=list)
+    tokens_gerados: int = 0
+    orcamento: int = 0
+    motivo_parada: str = "fim"
+    rascunho_propostos: int = 0
+    rascunho_aceitos: int = 0
+
+
+# ============================
+# INTERFACE DO BACKEND
 # ============================
-# CONFIGURAÇÃO DO MODELO
+
+
+class BackendInferencia:
+    """
+    Interface comum para qualquer motor de inferência usado na revisão.
+
+    Todo backend precisa saber:
+    - gerar respostas para um lote de prompts,
+    - tokenizar textos (para contagem e orçamento de tokens),
+    - informar suas capacidades (dispositivo, tamanho de lote etc.).
+    """
+
+    nome = "base"
+
+    def gerar(self, prompts: List[str], max_new_tokens: Union[int, List[int]], temperature: Union[float, List[float]],
+              ids_prompts: Optional[List[List[int]]] = None,
+              tamanhos_blocos: Optional[List[int]] = None) -> List[Geracao]:
+        """
+        Gera uma resposta para cada prompt do lote.
+
+        A geração de cada sequência para no `<|im_end|>`, no token de fim de
+        sequência ou ao esgotar o próprio orçamento — o que vier primeiro.
+        Com `ABORTO_ATIVO`, também para (com o motivo em `motivo_parada`) a
+        sequência que entra em loop, passa do tamanho esperado ou emite um
+        marcador de chat.
+
+        Args:
+            prompts (List[str]): Prompts já formatados com o template.
+            max_new_tokens (int | List[int]): Limite de tokens gerados, único ou um por prompt.
+            temperature (float | List[float]): Temperatura de amostragem, única ou uma por prompt.
+            ids_prompts (List[List[int]], opcional): Prompts já tokenizados por `tokenizar`,
+                para não tokenizar de novo.
+            tamanhos_blocos (List[int], opcional): Tokens de cada bloco (sem o template),
+                base do limite de tamanho do aborto. Sem eles, só loops e marcadores abortam.
+
+        Returns:
+            List[Geracao]: Um resultado por prompt, na mesma ordem.
+        """
+        raise NotImplementedError
+
+    def tokenizar(self, textos: List[str]) -> List[List[int]]:
+        """
+        Tokeniza uma lista de textos de uma só vez.
+
+        Returns:
+            List[List[int]]: IDs de tokens de cada texto.
+        """
+        raise NotImplementedError
+
+    def capacidades(self) -> Dict[str, Any]:
+        """
+        Descreve o backend (nome, modelo, dispositivo, tamanho de lote...).
+        """
+        raise NotImplementedError
+
+    def liberar_memoria(self) -> None:
+        """
+        Libera caches do dispositivo entre arquivos. Padrão: nada a fazer.
+        """
+        return None
+
+    def orcamento_tokens_lote(self) -> Optional[int]:
+        """
+        Quantos tokens (prompt + geração, somando as linhas) cabem num lote com a
+        memória livre agora. None se o backend não sabe estimar.
+        """
+        return None
+
+
 # ============================
+# BACKEND HUGGING FACE
+# ============================
+
+
+class BackendHF(BackendInferencia):
+    """
+    Backend real baseado em `transformers`.
+
+    Torch e transformers só são importados na criação da instância, para que
+    segmentar arquivos ou contar blocos não pague o carregamento do modelo.
+
+    Na GPU o modelo roda em float16. Na CPU (máquinas sem CUDA), os pesos ficam
+    em float32 ou bfloat16 e, no modo "int8", as camadas lineares são
+    quantizadas dinamicamente (pesos int8, ativações quantizadas a cada chamada).
+
+    Com `assistida`, a geração usa a decodificação assistida por busca no
+    prompt (`modelo.decodificacao_assistida`) em vez do `generate`.
+    """
+
+    nome = "hf"
+
+    def __init__(self, model_id: str = MODEL_NAME, batch_size: int = 4,
+                 usar_cache_prefixo: bool = CACHE_PREFIXO_KV, dispositivo: str = DISPOSITIVO,
+                 quantizacao: str = CPU_QUANTIZACAO, threads: Optional[int] = CPU_THREADS,
+                 abortar: bool = ABORTO_ATIVO, assistida: bool = DECODIFICACAO_ASSISTIDA):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+
+        self._torch = torch
+        self.model_id = model_id
+        self.batch_size = batch_size
+
+        if dispositivo == "auto":
+            dispositivo = "cuda" if torch.cuda.is_available() else "cpu"
+        if dispositivo not in ("cuda", "cpu"):
+            raise ValueError(f"Dispositivo desconhecido: {dispositivo!r}")
+        if quantizacao not in ("int8", "bf16", "fp32"):
+            raise ValueError(f"Quantização desconhecida: {quantizacao!r}")
+        self.dispositivo = dispositivo
+        self.quantizacao = quantizacao if dispositivo == "cpu" else "fp16"
+        if dispositivo == "cpu":
+            _configurar_threads_cpu(torch, threads)
+
+        # KV-cache do prefixo fixo do prompt (mensagem de sistema): (texto, ids, past_key_values)
+        self.usar_cache_prefixo = usar_cache_prefixo
+        self._prefixo_kv = None
+        self.assistida = assistida
+        self.tamanho_rascunho = ASSISTIDA_TOKENS_RASCUNHO
+        self._tamanho_prefixo = None  # (texto do prefixo, tokens): onde o bloco começa no prompt
+
+        # Carrega o tokenizer correspondente ao modelo
+        # Prefere o tokenizer rápido (Rust, lotes); se o modelo não suportar, cai no lento
+        self.tokenizer = None
+        if TOKENIZER_RAPIDO:
+            try:
+                self.tokenizer = AutoTokenizer.from_pretrained(model_id, trust_remote_code=True, use_fast=True)
+            except Exception as erro:
+                print(f"[⚠️] Tokenizer rápido indisponível ({erro}). Usando o lento.")
+        if self.tokenizer is None:
+            self.tokenizer = AutoTokenizer.from_pretrained(model_id, trust_remote_code=True, use_fast=False)
+        self.tokenizer.padding_side = "left"  # Importante para modelos que usam entrada à esquerda (ex: LLaMA/Mistral)
+
+        # Carrega o modelo propriamente dito
+        # Na GPU usa float16 e deixa o accelerate distribuir as camadas;
+        # na CPU, float16 é lento ou nem suportado: usa bfloat16/float32 (+ int8)
+        if dispositivo == "cuda":
+            self.model = AutoModelForCausalLM.from_pretrained(
+                model_id,
+                device_map="auto",
+                torch_dtype=torch.float16,
+                trust_remote_code=True
+            )
+        else:
+            self.model = AutoModelForCausalLM.from_pretrained(
+                model_id,
+                torch_dtype=torch.bfloat16 if quantizacao == "bf16" else torch.float32,
+                trust_remote_code=True,
+                low_cpu_mem_usage=True,
+            )
+            if quantizacao == "int8":
+                self.model = _quantizar_int8(torch, self.model)
+        self.model.eval()
+
+        # Garante que o pad_token_id esteja definido para evitar warnings ou erros na geração
+        if self.tokenizer.pad_token_id is None:
+            self.tokenizer.pad_token_id = self.tokenizer.eos_token_id or self.model.config.eos_token_id
+
+        # Tokens que encerram a resposta: fim de sequência e o fechamento do turno do chat
+        self.ids_parada = [i for i in (self.tokenizer.eos_token_id, self._id_token("<|im_end|>")) if i is not None]
+
+        # Marcadores de chat/papel que abortam a sequência (tokenizados uma vez)
+        self.abortar = abortar
+        self.ids_marcadores = [self.tokenizer(m, add_special_tokens=False).input_ids for m in ABORTO_MARCADORES]
+
+        # Mostra em qual dispositivo (CPU/GPU) o modelo está rodando
+        print("[🖥️] Dispositivo:", next(self.model.parameters()).device)
+
+    def _id_token(self, token: str) -> Optional[int]:
+        id_token = self.tokenizer.convert_tokens_to_ids(token)
+        if id_token is None or id_token == self.tokenizer.unk_token_id:
+            return None
+        return id_token
+
+    def _kv_prefixo(self, prefixo: str):
+        """
+        Calcula (uma vez por template) os past key/values do prefixo fixo do prompt.
+        Se o template mudar, o prefixo muda e o cache é recalculado.
+        """
+        if self._prefixo_kv is None or self._prefixo_kv[0] != prefixo:
+            ids = self.tokenizer(prefixo, return_tensors="pt").input_ids.to(self.model.device)
+            with self._torch.inference_mode():
+                saida = self.model(input_ids=ids, use_cache=True)
+            self._prefixo_kv = (prefixo, ids[0].tolist(), saida.past_key_values)
+        return self._prefixo_kv
+
+    def _entrada_padrao(self, completos: List[List[int]]) -> Dict[str, Any]:
+        """
+        Monta a entrada com padding à esquerda a partir de prompts já tokenizados.
+        """
+        torch = self._torch
+        pad = self.tokenizer.pad_token_id
+        maior = max(len(ids) for ids in completos)
+        return {
+            "input_ids": torch.tensor([[pad] * (maior - len(ids)) + ids for ids in completos], device=self.model.device),
+            "attention_mask": torch.tensor([[0] * (maior - len(ids)) + [1] * len(ids) for ids in completos],
+                                           device=self.model.device),
+        }
+
+    def _entrada_com_prefixo(self, completos: List[List[int]], prefixo: str) -> Optional[Dict[str, Any]]:
+        """
+        Monta a entrada reaproveitando o KV-cache do prefixo: só o sufixo de cada
+        bloco passa pelo prefill.
+
+        Cada linha fica `prefixo + padding + sufixo`; a máscara zera o padding do
+        meio e as posições continuam corretas (o generate as deriva da máscara).
+        Devolve None quando não dá para usar o cache com segurança.
+        """
+        import copy
+
+        if not prefixo:
+            return None
+
+        _, ids_prefixo, kv = self._kv_prefixo(prefixo)
+        n = len(ids_prefixo)
+
+        # Confere que o começo de cada prompt tokenizado bate com o prefixo:
+        # assim a fronteira prefixo/sufixo fica exatamente como sem cache.
+        if any(ids[:n] != ids_prefixo for ids in completos):
+            return None
+        sufixos = [ids[n:] for ids in completos]
+        maior = max(len(s) for s in sufixos)
+        if maior == 0:
+            return None
+
+        pad = self.tokenizer.pad_token_id
+        input_ids = [ids_prefixo + [pad] * (maior - len(s)) + s for s in sufixos]
+        mascara = [[1] * n + [0] * (maior - len(s)) + [1] * len(s) for s in sufixos]
+
+        if not hasattr(kv, "batch_repeat_interleave"):
+            # transformers antigo (past_key_values em tuplas): desliga o cache de vez e avisa uma vez só
+            print("[⚠️] Esta versão do transformers não tem DynamicCache.batch_repeat_interleave; "
+                  "cache do prefixo desligado (atualize para transformers>=4.42).")
+            self.usar_cache_prefixo = False
+            return None
+        kv_lote = copy.deepcopy(kv)
+        kv_lote.batch_repeat_interleave(len(completos))
+
+        torch = self._torch
+        return {
+            "input_ids": torch.tensor(input_ids, device=self.model.device),
+            "attention_mask": torch.tensor(mascara, device=self.model.device),
+            "past_key_values": kv_lote,
+        }
+
+    def gerar(self, prompts: List[str], max_new_tokens: Union[int, List[int]], temperature: Union[float, List[float]],
+              ids_prompts: Optional[List[List[int]]] = None,
+              tamanhos_blocos: Optional[List[int]] = None) -> List[Geracao]:
+        from transformers import LogitsProcessorList, StoppingCriteriaList
+        from modelo.criterios_parada import AbortoDegenerado, OrcamentoPorSequencia, TemperaturaPorSequencia
+
+        torch = self._torch
+        orcamentos = list(max_new_tokens) if isinstance(max_new_tokens, (list, tuple)) else [max_new_tokens] * len(prompts)
+        temperaturas = list(temperature) if isinstance(temperature, (list, tuple)) else [temperature] * len(prompts)
+
+        # Lote misto (1º try + retentativas): cada linha amostra com a própria temperatura
+        processadores = LogitsProcessorList()
+        temperatura = temperaturas[0]
+        if len(set(temperaturas)) > 1:
+            processadores.append(TemperaturaPorSequencia(temperaturas))
+            temperatura = 1.0
+
+        completos = [list(ids) for ids in ids_prompts] if ids_prompts is not None else self.tokenizar(prompts)
+
+        # O prefixo de sistema é igual em todos os prompts: reaproveita seu KV-cache
+        entrada = None
+        if self.usar_cache_prefixo:
+            entrada = self._entrada_com_prefixo(completos, PROMPT_TEMPLATE.split("{bloco}")[0])
+        if entrada is None:
+            entrada = self._entrada_padrao(completos)
+        largura = entrada["input_ids"].shape[1]
+
+        limites = None
+        if tamanhos_blocos is not None:
+            limites = [int(n * ABORTO_RAZAO_TAMANHO) + ABORTO_FOLGA_TAMANHO for n in tamanhos_blocos]
+        if self.assistida:
+            return self._gerar_assistido(entrada, completos, orcamentos, temperaturas, limites, largura)
+
+        criterios = StoppingCriteriaList([OrcamentoPorSequencia(orcamentos, largura)])
+        aborto = None
+        if self.abortar:
+            aborto = AbortoDegenerado(largura, limites, self.ids_marcadores, ABORTO_LOOP_MAX_NGRAM,
+                                      ABORTO_LOOP_REPETICOES, ABORTO_LOOP_MIN_TOKENS)
+            criterios.append(aborto)
+
+        # `do_sample=True` permite temperatura funcionar; cada linha para no próprio orçamento
+        esgotou = False
+        try:
+            with torch.inference_mode():
+                saida = self.model.generate(
+                    **entrada,
+                    max_new_tokens=max(orcamentos),
+                    do_sample=True,
+                    temperature=temperatura,
+                    logits_processor=processadores,
+                    eos_token_id=self.ids_parada,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    stopping_criteria=criterios,
+                )
+        except RuntimeError as erro:  # torch.cuda.OutOfMemoryError é um RuntimeError
+            if not _erro_memoria(erro):
+                raise
+            esgotou = True
+        if esgotou:
+            # Fora do `except`: o traceback segura os tensores do lote que não coube
+            entrada = criterios = aborto = None
+            self.liberar_memoria()
+            raise MemoriaEsgotada(f"Lote de {len(prompts)} prompts ({largura} tokens de largura) não coube na memória")
+
+        abortos = aborto.motivos() if aborto is not None else []
+        resultados = []
+        # Só a parte gerada é decodificada (equivale a `return_full_text=False`)
+        for linha, (sequencia, orcamento) in enumerate(zip(saida[:, largura:].tolist(), orcamentos)):
+            sequencia = sequencia[:orcamento]
+            fim = next((k for k, t in enumerate(sequencia) if t in self.ids_parada), None)
+            if fim is not None:
+                ids, passos, motivo = sequencia[:fim], fim + 1, "fim"
+            else:
+                ids, passos, motivo = sequencia, len(sequencia), "orcamento"
+            # Aborto só vale se veio antes do fim da sequência (depois dele a linha recebe padding)
+            motivo_aborto, passo = abortos[linha] if abortos else ("", 0)
+            if motivo_aborto and passo <= len(ids):
+                ids, passos, motivo = sequencia[:passo], passo, motivo_aborto
+            resposta = self.tokenizer.decode(ids, skip_special_tokens=True)
+            resultados.append(Geracao(texto=resposta, ids=ids, tokens_gerados=passos,
+                                      orcamento=orcamento, motivo_parada=motivo))
+        return resultados
+
+    def _gerar_assistido(self, entrada: Dict[str, Any], completos: List[List[int]], orcamentos: List[int],
+                         temperaturas: List[float], limites: Optional[List[int]], largura: int) -> List[Geracao]:
+        """
+        Gera o lote com a decodificação assistida por busca no prompt: trechos
+        do bloco original são propostos como rascunho e verificados de uma vez.
+        Mesmas regras de parada, aborto e falta de memória do `generate`.
+        """
+        from modelo.criterios_parada import AbortoDegenerado
+        from modelo.decodificacao_assistida import gerar_com_rascunho
+
+        torch = self._torch
+        abortos = None
+        if self.abortar:
+            # Cada linha avança num ritmo: um critério por linha, avaliado token a token
+            abortos = [AbortoDegenerado(0, [limites[i]] if limites else None, self.ids_marcadores,
+                                        ABORTO_LOOP_MAX_NGRAM, ABORTO_LOOP_REPETICOES, ABORTO_LOOP_MIN_TOKENS)
+                       for i in range(len(completos))]
+
+        # O rascunho é procurado a partir do bloco, não da mensagem de sistema
+        prefixo = PROMPT_TEMPLATE.split("{bloco}")[0]
+        if self._tamanho_prefixo is None or self._tamanho_prefixo[0] != prefixo:
+            self._tamanho_prefixo = (prefixo, len(self.tokenizar([prefixo])[0]))
+        inicio_bloco = self._tamanho_prefixo[1]
+
+        # Mesmos filtros de amostragem que o `generate` aplicaria (padrões do transformers)
+        configuracao = self.model.generation_config
+        top_k = configuracao.top_k if configuracao.top_k is not None else 50
+        top_p = configuracao.top_p if configuracao.top_p is not None else 1.0
+
+        esgotou = False
+        try:
+            with torch.inference_mode():
+                saidas = gerar_com_rascunho(
+                    self.model, entrada, completos, orcamentos, temperaturas, self.ids_parada,
+                    self.tokenizer.pad_token_id, abortos, [min(inicio_bloco, len(c)) for c in completos],
+                    self.tamanho_rascunho, ASSISTIDA_NGRAM_MAX, top_k=top_k, top_p=top_p,
+                )
+        except RuntimeError as erro:
+            if not _erro_memoria(erro):
+                raise
+            esgotou = True
+        if esgotou:
+            entrada = abortos = None
+            self.liberar_memoria()
+            raise MemoriaEsgotada(f"Lote de {len(completos)} prompts ({largura} tokens de largura) não coube na memória")
+
+        return [Geracao(texto=self.tokenizer.decode(ids, skip_special_tokens=True), ids=ids, tokens_gerados=passos,
+                        orcamento=orcamento, motivo_parada=motivo, rascunho_propostos=propostos,
+                        rascunho_aceitos=aceitos)
+                for (ids, passos, motivo, propostos, aceitos), orcamento in zip(saidas, orcamentos)]
+
+    def tokenizar(self, textos: List[str]) -> List[List[int]]:
+        if not textos:
+            return []
+        return self.tokenizer(list(textos)).input_ids
+
+    def capacidades(self) -> Dict[str, Any]:
+        return {
+            "nome": self.nome,
+            "modelo": self.model_id,
+            "dispositivo": str(next(self.model.parameters()).device),
+            "batch_size": self.batch_size,
+            "max_contexto": getattr(self.model.config, "max_position_embeddings", None),
+            "quantizacao": self.quantizacao,
+            "assistida": self.assistida,
+        }
+
+    def liberar_memoria(self) -> None:
+        if self._torch.cuda.is_available():
+            self._torch.cuda.empty_cache()
+
+    def orcamento_tokens_lote(self) -> Optional[int]:
+        """
+        Memória livre (GPU ou RAM) vezes `LOTE_FRACAO_MEMORIA`, dividida pelo
+        KV-cache de um token (2 x camadas x cabeças KV x dimensão da cabeça x
+        bytes do tipo). O resto da fração cobre ativações e logits; o que a
+        estimativa errar, o recuo em caso de falta de memória corrige.
+        """
+        config = self.model.config
+        camadas = getattr(config, "num_hidden_layers", None)
+        cabecas = getattr(config, "num_attention_heads", None)
+        if not camadas or not cabecas or not getattr(config, "hidden_size", None):
+            return None
+        cabecas_kv = getattr(config, "num_key_value_heads", None) or cabecas
+        dimensao = getattr(config, "head_dim", None) or config.hidden_size // cabecas
+        bytes_elemento = 4 if self.quantizacao in ("fp32", "int8") else 2  # int8 quantiza pesos; o KV fica em fp32
+        por_token = 2 * camadas * cabecas_kv * dimensao * bytes_elemento
+
+        if self.dispositivo == "cuda":
+            livre, _ = self._torch.cuda.mem_get_info(next(self.model.parameters()).device)
+        else:
+            try:
+                livre = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+            except (AttributeError, ValueError, OSError):  # sysconf não existe no Windows
+                return None
+        return int(livre * LOTE_FRACAO_MEMORIA // por_token)
+
+
+def _erro_memoria(erro: BaseException) -> bool:
+    """
+    True se o erro do torch é falta de memória (CUDA OOM ou alocação na CPU).
+    """
+    mensagem = str(erro).lower()
+    return "out of memory" in mensagem or "can't allocate memory" in mensagem
+
+
+def _configurar_threads_cpu(torch, threads: Optional[int]) -> None:
+    """
+    Fixa as threads de computação do torch na CPU.
+
+    Sem valor configurado, usa um thread por núcleo disponível para o processo
+    (respeita `taskset`/cgroups, ao contrário de `os.cpu_count()`).
+    """
+    if not threads:
+        try:
+            threads = len(os.sched_getaffinity(0))
+        except AttributeError:  # sched_getaffinity não existe no Windows/macOS
+            threads = os.cpu_count() or 1
+    torch.set_num_threads(threads)
+    try:
+        # Um lote por vez: paralelismo entre operadores só disputaria os mesmos núcleos
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # só pode ser definido antes do primeiro trabalho paralelo do processo
+    print(f"[🧵] Threads de CPU: {threads}")
+
+
+def _quantizar_int8(torch, model):
+    """
+    Quantização dinâmica int8 das camadas lineares (atenção, MLP e cabeça de saída).
+
+    Os pesos passam a ocupar 1/4 da memória em float32 e as multiplicações usam
+    kernels int8 (fbgemm/onednn); embeddings e normalizações ficam em float32.
+    """
+    with warnings.catch_warnings():
+        # torch.ao.quantization está marcado como obsoleto, mas segue sendo o caminho sem dependências extras
+        warnings.simplefilter("ignore")
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+# ============================
+# SINGLETON DO PROCESSO
+# ============================
+
+_backend: Optional[BackendInferencia] = None
+_lock_backend = threading.Lock()
+
+
+def criar_backend(tipo: str = BACKEND, **opcoes) -> BackendInferencia:
+    """
+    Instancia um backend pelo nome configurado ("hf" ou "fake").
+
+    Args:
+        **opcoes: Repassadas ao construtor (ex: `dispositivo`/`threads` do BackendHF,
+            latências do BackendFake).
+    """
+    if tipo == "hf":
+        return BackendHF(**opcoes)
+    if tipo == "fake":
+        from modelo.backend_fake import BackendFake
+        return BackendFake(**opcoes)
+    raise ValueError(f"Backend desconhecido: {tipo!r}")
+
+
+def obter_backend() -> BackendInferencia:
+    """
+    Retorna o backend do processo, criando-o na primeira chamada.
 
-# Define o modelo que será carregado com base na variável de configuração
-model_id = MODEL_NAME
+    O modelo só é carregado aqui — nunca como efeito colateral de import.
+    """
+    global _backend
+    if _backend is None:
+        with _lock_backend:
+            if _backend is None:
+                _backend = criar_backend()
+    return _backend
 
-# Carrega o tokenizer correspondente ao modelo
-# `use_fast=False` evita erros com tokenizers acelerados que não suportam todos os modelos
-tokenizer = AutoTokenizer.from_pretrained(model_id, trust_remote_code=True, use_fast=False)
-tokenizer.padding_side = "left"  # Importante para modelos que usam entrada à esquerda (ex: LLaMA/Mistral)
 
-# Carrega o modelo propriamente dito, mapeando automaticamente para CPU ou GPU
-# Usa float16 para otimização de memória em CUDA
-model = AutoModelForCausalLM.from_pretrained(
-    model_id,
-    device_map="auto",
-    torch_dtype=torch.float16,
-    trust_remote_code=True
-)
+def definir_backend(backend: Optional[BackendInferencia]) -> None:
+    """
+    Substitui o backend do processo (ex: backend fake em testes e benchmarks).
+    Passar `None` faz o próximo `obter_backend()` recriar o padrão.
+    """
+    global _backend
+    with _lock_backend:
+        _backend = backend
 
-# Garante que o pad_token_id esteja definido para evitar warnings ou erros na geração
-if tokenizer.pad_token_id is None:
-    tokenizer.pad_token_id = tokenizer.eos_token_id or model.config.eos_token_id
 
-# Cria o pipeline do Hugging Face para geração de texto
-# `batch_size=4` para envio em lote e `do_sample=True` permite temperatura funcionar
-llm = pipeline("text-generation", model=model, tokenizer=tokenizer, batch_size=4, do_sample=True)
+def liberar_memoria() -> None:
+    """
+    Libera memória do backend ativo, se algum já foi carregado.
+    """
+    if _backend is not None:
+        _backend.liberar_memoria()
 
-# Mostra em qual dispositivo (CPU/GPU) o modelo está rodando
-print("[🖥️] Dispositivo:", next(model.parameters()).device)
 
+def __getattr__(nome: str):
+    # Compatibilidade: `from modelo.carregador import tokenizer, model`
+    # continua funcionando, mas só carrega o modelo quando o nome é acessado.
+    if nome in ("tokenizer", "model"):
+        backend = obter_backend()
+        if not isinstance(backend, BackendHF):
+            raise AttributeError(f"'{nome}' só existe no backend Hugging Face")
+        return getattr(backend, nome)
+    if nome == "model_id":
+        return MODEL_NAME
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
@@ -0,0 +1,114 @@
+"""
+Critérios de parada e processadores de logits avaliados durante a decodificação.
+
+Importado apenas pelo BackendHF (depende de torch/transformers).
+"""
+from typing import List, Optional, Tuple
+
+import torch
+from transformers import LogitsProcessor, StoppingCriteria
+
+
+class OrcamentoPorSequencia(StoppingCriteria):
+    """
+    Encerra cada sequência do lote quando ela atinge o próprio orçamento de tokens.
+
+    O `generate` recebe o maior orçamento do lote como `max_new_tokens`; este
+    critério corta antes as sequências de blocos curtos.
+    """
+
+    def __init__(self, orcamentos: List[int], largura_prompt: int):
+        self.orcamentos = torch.tensor(orcamentos, dtype=torch.long)
+        self.largura_prompt = largura_prompt
+
+    def __call__(self, input_ids: torch.LongTensor, scores, **kwargs) -> torch.BoolTensor:
+        gerados = input_ids.shape[1] - self.largura_prompt
+        return (gerados >= self.orcamentos).to(input_ids.device)
+
+
+class TemperaturaPorSequencia(LogitsProcessor):
+    """
+    Aplica uma temperatura própria a cada sequência do lote.
+
+    Usado quando o lote mistura blocos do 1º try com retentativas: o `generate`
+    roda com temperatura 1.0 e este processador divide os logits de cada linha
+    pela sua temperatura (processadores informados rodam antes de top-k/top-p).
+    """
+
+    def __init__(self, temperaturas: List[float]):
+        self.temperaturas = torch.tensor(temperaturas, dtype=torch.float32)
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        temperaturas = self.temperaturas.to(device=scores.device, dtype=scores.dtype)
+        return scores / temperaturas.unsqueeze(1)
+
+
+# Códigos internos de `AbortoDegenerado.codigos` (0 = não abortou)
+_CODIGOS_ABORTO = {1: "repeticao", 2: "tamanho", 3: "marcador"}
+
+
+class AbortoDegenerado(StoppingCriteria):
+    """
+    Aborta, ainda na decodificação, as sequências que degeneraram — só elas; o
+    resto do lote segue gerando.
+
+    - "repeticao": a cauda é um trecho de até `max_ngram` tokens repetido
+      `repeticoes` vezes seguidas (cobrindo ao menos `min_tokens`);
+    - "tamanho": a sequência passou do limite derivado do tamanho do bloco;
+    - "marcador": a sequência terminou num marcador de chat/papel (`<|im_start|>`, "user:"...).
+
+    Tudo é calculado em tensores no dispositivo, sem sincronizar com a CPU a
+    cada passo. Os loops são procurados a cada `intervalo` passos (um loop não
+    se desfaz, só é notado alguns tokens depois). O motivo e o passo de cada
+    linha ficam em `motivos()`; linhas que já terminaram seguem recebendo
+    padding e podem ser marcadas depois — quem lê descarta abortos posteriores
+    ao fim da sequência.
+    """
+
+    def __init__(self, largura_prompt: int, limites: Optional[List[int]], marcadores: List[List[int]],
+                 max_ngram: int, repeticoes: int, min_tokens: int, intervalo: int = 4):
+        self.largura_prompt = largura_prompt
+        self.limites = torch.tensor(limites, dtype=torch.long) if limites else None
+        self.marcadores = [torch.tensor(m, dtype=torch.long) for m in marcadores if m]
+        # (período, tokens que o loop precisa cobrir)
+        self.periodos = [(p, max(p * repeticoes, min_tokens)) for p in range(1, max_ngram + 1)]
+        self.intervalo = max(1, intervalo)
+        self.codigos = None
+        self.passos = None
+
+    def _marcar(self, condicao: torch.BoolTensor, codigo: int, gerados: int) -> None:
+        primeira = condicao & (self.codigos == 0)
+        self.codigos = torch.where(primeira, torch.full_like(self.codigos, codigo), self.codigos)
+        self.passos = torch.where(primeira, torch.full_like(self.passos, gerados), self.passos)
+
+    def __call__(self, input_ids: torch.LongTensor, scores, **kwargs) -> torch.BoolTensor:
+        gerados = input_ids.shape[1] - self.largura_prompt
+        if self.codigos is None:
+            self.codigos = torch.zeros(input_ids.shape[0], dtype=torch.long, device=input_ids.device)
+            self.passos = torch.zeros_like(self.codigos)
+
+        if gerados % self.intervalo == 0:
+            for periodo, cobertura in self.periodos:
+                if cobertura > gerados:
+                    continue
+                cauda = input_ids[:, -cobertura:]
+                self._marcar((cauda[:, periodo:] == cauda[:, :-periodo]).all(dim=1), 1, gerados)
+
+        if self.limites is not None:
+            self.limites = self.limites.to(input_ids.device)
+            self._marcar(gerados > self.limites, 2, gerados)
+
+        for k, marcador in enumerate(self.marcadores):
+            if len(marcador) <= gerados:
+                marcador = self.marcadores[k] = marcador.to(input_ids.device)
+                self._marcar((input_ids[:, -len(marcador):] == marcador).all(dim=1), 3, gerados)
+
+        return self.codigos > 0
+
+    def motivos(self) -> List[Tuple[str, int]]:
+        """
+        (motivo, passo do aborto) de cada linha; ("", 0) se a linha não foi abortada.
+        """
+        if self.codigos is None:
+            return []
+        return [(_CODIGOS_ABORTO.get(c, ""), p) for c, p in zip(self.codigos.tolist(), self.passos.tolist())]
@@ -0,0 +1,233 @@
+"""
+Decodificação assistida por busca no prompt ("prompt lookup decoding").
+
+Na revisão, a resposta é quase uma cópia do bloco de entrada com correções
+pontuais. A cada passo, cada sequência procura no próprio prompt os últimos
+tokens que gerou e propõe, como rascunho, os tokens que vinham depois deles
+no original. Um único forward verifica o rascunho inteiro: onde o modelo
+concorda, vários tokens saem de uma vez; onde ele corrige, a cópia para ali.
+Não há modelo auxiliar.
+
+A aceitação é a da amostragem especulativa com rascunho determinístico: o
+token `t` do rascunho é aceito com probabilidade p(t); na primeira recusa,
+o token é sorteado de p sem `t` (renormalizada). A saída tem a mesma
+distribuição da decodificação normal — muda só quantos forwards ela custa.
+
+O lote segue junto: cada linha aceita quantos tokens puder, e as posições
+recusadas ficam no KV-cache como buracos mascarados (a máscara de atenção as
+zera e as posições de cada linha seguem contadas à parte). Linhas que
+terminam saem do lote.
+
+Importado apenas pelo BackendHF (depende de torch). Usa `logits_to_keep` e os
+métodos `crop`/`batch_select_indices` do `DynamicCache`: requer transformers>=4.49.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import torch
+
+from modelo.criterios_parada import AbortoDegenerado
+
+
+def _buscar(fonte: Sequence[int], alvo: List[int], de: int, ate: int) -> int:
+    """Primeira posição em [de, ate) onde `alvo` começa em `fonte`, ou -1."""
+    i = de
+    while i < ate:
+        try:
+            i = fonte.index(alvo[0], i, ate)
+        except ValueError:
+            return -1
+        if fonte[i:i + len(alvo)] == alvo:
+            return i
+        i += 1
+    return -1
+
+
+def propor_rascunho(fonte: List[int], gerados: List[int], cursor: int, ngram_max: int,
+                    tamanho: int) -> Tuple[List[int], int]:
+    """
+    Rascunho para a próxima verificação: os tokens que seguem, no prompt, a
+    ocorrência dos últimos n tokens gerados (n de `ngram_max` até 1).
+
+    A busca começa no `cursor` (fim da última cópia) e só depois volta ao
+    início: o texto revisado segue a ordem do original.
+
+    Returns:
+        Tuple[List[int], int]: (rascunho, novo cursor). Rascunho vazio se nada casou.
+    """
+    if tamanho <= 0:
+        return [], cursor
+    for n in range(min(ngram_max, len(gerados)), 0, -1):
+        alvo = gerados[-n:]
+        ultimo_inicio = len(fonte) - n  # precisa sobrar ao menos um token depois do trecho
+        inicio = _buscar(fonte, alvo, cursor, ultimo_inicio)
+        if inicio < 0:
+            inicio = _buscar(fonte, alvo, 0, min(cursor, ultimo_inicio))
+        if inicio >= 0:
+            fim = inicio + n
+            return list(fonte[fim:fim + tamanho]), fim
+    return [], cursor
+
+
+def _filtrar(logits: torch.Tensor, top_k: Optional[int], top_p: Optional[float]) -> torch.Tensor:
+    """Top-k e top-p como os warpers do `generate` (na mesma ordem)."""
+    if top_k and top_k < logits.shape[-1]:
+        corte = torch.topk(logits, top_k, dim=-1).values[..., -1:]
+        logits = logits.masked_fill(logits < corte, float("-inf"))
+    if top_p is not None and top_p < 1.0:
+        ordenados, indices = torch.sort(logits, descending=False, dim=-1)
+        remover = ordenados.softmax(dim=-1).cumsum(dim=-1) <= (1 - top_p)
+        remover[..., -1:] = False
+        logits = logits.masked_fill(remover.scatter(-1, indices, remover), float("-inf"))
+    return logits
+
+
+def gerar_com_rascunho(model, entrada: dict, fontes: List[List[int]], orcamentos: List[int],
+                       temperaturas: List[float], ids_parada: List[int], pad_token_id: int,
+                       abortos: Optional[List[AbortoDegenerado]], cursores: List[int], tamanho_rascunho: int,
+                       ngram_max: int, top_k: Optional[int] = None,
+                       top_p: Optional[float] = None) -> List[Tuple[List[int], int, str, int, int]]:
+    """
+    Gera o lote com decodificação assistida.
+
+    Args:
+        model: Modelo causal do transformers.
+        entrada (dict): `input_ids`, `attention_mask` e, opcionalmente, `past_key_values`
+            (KV-cache do prefixo já replicado no lote), como vão para o `generate`.
+        fontes (List[List[int]]): Prompt tokenizado de cada linha (onde o rascunho é buscado).
+        orcamentos (List[int]): Limite de tokens gerados de cada linha.
+        temperaturas (List[float]): Temperatura de amostragem de cada linha.
+        ids_parada (List[int]): Tokens que encerram a resposta.
+        pad_token_id (int): Token usado para completar rascunhos curtos.
+        abortos (List[AbortoDegenerado], opcional): Um critério por linha (largura de prompt 0).
+        cursores (List[int]): Onde começar a buscar em cada fonte (início do bloco no prompt).
+        tamanho_rascunho (int): Máximo de tokens propostos por passo.
+        ngram_max (int): Maior trecho gerado procurado no prompt.
+        top_k, top_p: Filtros de amostragem da configuração de geração do modelo.
+
+    Returns:
+        List[Tuple]: Por linha, (ids sem o token de parada, passos, motivo de parada,
+            tokens propostos, tokens aceitos).
+    """
+    dispositivo = entrada["input_ids"].device
+    paradas = set(ids_parada)
+    total = len(fontes)
+    gerados: List[List[int]] = [[] for _ in range(total)]
+    resultados: List[Optional[Tuple[List[int], int, str, int, int]]] = [None] * total
+    propostos = [0] * total
+    aceitos = [0] * total
+    cursores = list(cursores)
+
+    def encerrar(b: int, ids: List[int], passos: int, motivo: str) -> None:
+        resultados[b] = (ids, passos, motivo, propostos[b], aceitos[b])
+
+    def emitir(b: int, tokens: List[int]) -> bool:
+        # Mesmas regras da leitura do `generate`: parada, depois aborto, depois orçamento
+        for token in tokens:
+            if token in paradas:
+                encerrar(b, gerados[b], len(gerados[b]) + 1, "fim")
+                return False
+            gerados[b].append(token)
+            if abortos is not None:
+                abortos[b](torch.tensor([gerados[b]]), None)
+                motivo, passo = abortos[b].motivos()[0]
+                if motivo:
+                    encerrar(b, gerados[b][:passo], passo, motivo)
+                    return False
+            if len(gerados[b]) >= orcamentos[b]:
+                encerrar(b, gerados[b], len(gerados[b]), "orcamento")
+                return False
+        return True
+
+    temps = torch.tensor(temperaturas, dtype=torch.float32, device=dispositivo).clamp(min=1e-5)
+
+    def distribuicao(logits: torch.Tensor) -> torch.Tensor:
+        logits = logits.float() / temps[:, None, None]
+        return _filtrar(logits, top_k, top_p).softmax(dim=-1)
+
+    # Prefill: o que não está no KV-cache do prefixo passa pelo modelo de uma vez
+    mascara = entrada["attention_mask"]
+    kv = entrada.get("past_key_values")
+    no_cache = kv.get_seq_length() if kv is not None else 0
+    posicoes = (mascara.long().cumsum(dim=-1) - 1).clamp(min=0)
+    saida = model(input_ids=entrada["input_ids"][:, no_cache:], attention_mask=mascara,
+                  position_ids=posicoes[:, no_cache:], past_key_values=kv, use_cache=True, logits_to_keep=1)
+    kv = saida.past_key_values
+    primeiros = torch.multinomial(distribuicao(saida.logits[:, -1:])[:, 0], 1)[:, 0].tolist()
+    saida = None
+
+    linhas = list(range(total))  # linha do lote atual -> índice original
+    vivos = [b for b in linhas if emitir(b, [primeiros[b]])]
+
+    while vivos:
+        if len(vivos) < len(linhas):
+            # Linhas encerradas saem do lote (e do KV-cache)
+            manter = torch.tensor([linhas.index(b) for b in vivos], device=dispositivo)
+            kv.batch_select_indices(manter)
+            mascara, temps = mascara[manter], temps[manter]
+            linhas = vivos
+
+        rascunhos = []
+        for b in linhas:
+            # O último token gerado ainda não está no cache: entra na frente do rascunho
+            espaco = orcamentos[b] - len(gerados[b]) - 1
+            rascunho, cursores[b] = propor_rascunho(fontes[b], gerados[b], cursores[b], ngram_max,
+                                                    min(tamanho_rascunho, espaco))
+            rascunhos.append(rascunho)
+        largura = 1 + max(len(r) for r in rascunhos)
+
+        bloco = torch.full((len(linhas), largura), pad_token_id, dtype=torch.long)
+        comprimentos = torch.tensor([len(r) for r in rascunhos])
+        for r, (b, rascunho) in enumerate(zip(linhas, rascunhos)):
+            bloco[r, :1 + len(rascunho)] = torch.tensor([gerados[b][-1]] + rascunho)
+        bloco = bloco.to(dispositivo)
+        comprimentos = comprimentos.to(dispositivo)
+        colunas = torch.arange(largura, device=dispositivo)
+        validos = (colunas[None, :] <= comprimentos[:, None]).to(mascara.dtype)
+
+        anterior = mascara.shape[1]
+        posicoes = mascara.long().sum(dim=1, keepdim=True) + colunas[None, :]
+        mascara = torch.cat([mascara, validos], dim=1)
+        saida = model(input_ids=bloco, attention_mask=mascara, position_ids=posicoes,
+                      past_key_values=kv, use_cache=True)
+        kv = saida.past_key_values
+        probs = distribuicao(saida.logits)  # [linhas, largura, vocabulário]
+        saida = None
+
+        # Aceita o rascunho até a primeira recusa; o token seguinte vem da distribuição daquela posição
+        k = largura - 1
+        if k:
+            rascunho_t = bloco[:, 1:]
+            p_rascunho = probs[:, :k].gather(-1, rascunho_t.unsqueeze(-1)).squeeze(-1)
+            aceito = (torch.rand_like(p_rascunho) < p_rascunho) & (colunas[None, :k] < comprimentos[:, None])
+            n_aceitos = aceito.long().cumprod(dim=1).sum(dim=1)
+        else:
+            n_aceitos = torch.zeros(len(linhas), dtype=torch.long, device=dispositivo)
+        indices = torch.arange(len(linhas), device=dispositivo)
+        dist = probs[indices, n_aceitos]
+        if k:
+            # Na recusa, o token recusado sai da distribuição (resíduo da amostragem especulativa)
+            recusado = n_aceitos < comprimentos
+            token_recusado = rascunho_t[indices, n_aceitos.clamp(max=k - 1)]
+            residuo = dist.scatter(1, token_recusado[:, None], 0.0)
+            usar = recusado[:, None] & (residuo.sum(dim=-1, keepdim=True) > 0)
+            dist = torch.where(usar, residuo, dist)
+        novos = torch.multinomial(dist, 1)[:, 0].tolist()
+        probs = dist = None
+
+        # Posições recusadas viram buracos na máscara; as que nenhuma linha usou saem do cache
+        n_aceitos_lista = n_aceitos.tolist()
+        mascara[:, anterior:] = (colunas[None, :] <= n_aceitos[:, None]).to(mascara.dtype) * validos
+        usadas = 1 + max(n_aceitos_lista)
+        if usadas < largura:
+            kv.crop(usadas - largura)  # negativo: remove do fim
+            mascara = mascara[:, :anterior + usadas]
+
+        proximos = []
+        for b, rascunho, n, novo in zip(linhas, rascunhos, n_aceitos_lista, novos):
+            propostos[b] += len(rascunho)
+            aceitos[b] += n
+            if emitir(b, rascunho[:n] + [novo]):
+                proximos.append(b)
+        vivos = proximos
+
+    return resultados
@@ -0,0 +1,675 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from modelo.carregador import MOTIVOS_ABORTO, BackendInferencia, Geracao, MemoriaEsgotada, obter_backend
+from processamento.cache_revisao import CacheRevisao, chave_revisao, obter_cache
+from processamento.lote_adaptativo import ControleLote
+from processamento.revisor_llm import aceitar_revisao, calcular_orcamento, limpar_resposta, montar_prompt
+from processamento.triagem import dispensa_revisao, sorteado_auditoria
+from utils.config import (CACHE_REVISAO_ATIVO, CAPITULOS_POR_JANELA, DEDUP_ATIVO, DEDUP_MAX_ENTRADAS, LOTE_ADAPTATIVO,
+                          LOTE_MAXIMO, LOTE_ORCAMENTO_TOKENS, PROMPT_TEMPLATE, TEMPERATURA_RETENTATIVA, TEMPERATURE,
+                          TRIAGEM_ATIVA, TRIAGEM_AUDITORIA, TRIAGEM_LIMIAR)
+
+
+def normalizar_bloco(texto: str) -> str:
+    """
+    Chave de deduplicação: o bloco com espaços de cada linha colapsados e sem linhas em branco nas pontas.
+    """
+    return "\n".join(" ".join(linha.split()) for linha in texto.strip().split("\n"))
+
+
+@dataclass
+class TarefaCapitulo:
+    """
+    Capítulo já segmentado, pronto para entrar na fila global de blocos.
+
+    `chave` identifica o capítulo para quem consome os resultados
+    (ex: índice do capítulo, ou `(arquivo, índice)` quando há vários arquivos).
+    """
+    chave: Any
+    titulo: str
+    blocos: List[str]
+    nome_base: str = ""
+    logger: Any = None
+
+
+@dataclass
+class ResultadoCapitulo:
+    """
+    Blocos revisados de um capítulo, na ordem original, com as estatísticas do log.
+    """
+    chave: Any
+    titulo: str
+    blocos: List[str]
+    revisados: List[str]
+    estatisticas: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class _Item:
+    capitulo: int       # posição do capítulo na janela
+    indice: int         # posição do bloco dentro do capítulo
+    texto: str
+    n_tokens: int
+    ids_prompt: List[int] = field(default_factory=list)
+    chave_cache: str = ""
+    janela: Any = None  # JanelaBlocos de origem (lotes podem misturar janelas)
+    tentativa: int = 1
+    auditoria: bool = False  # dispensado pela triagem, mas sorteado para ir ao LLM
+    chave_dedup: str = ""    # preenchida quando o bloco é o representante de suas cópias
+    seguidores: List["_Item"] = field(default_factory=list)  # cópias que esperam este bloco
+
+    @property
+    def estado(self) -> "_EstadoCapitulo":
+        return self.janela.estados[self.capitulo]
+
+    @property
+    def temperatura(self) -> float:
+        return TEMPERATURE if self.tentativa == 1 else TEMPERATURA_RETENTATIVA
+
+
+class _EstadoCapitulo:
+    """Acumuladores de um capítulo enquanto seus blocos estão na fila."""
+
+    def __init__(self, tarefa: TarefaCapitulo):
+        self.tarefa = tarefa
+        self.revisados = [""] * len(tarefa.blocos)
+        self.tokens_saida = [0] * len(tarefa.blocos)   # tokens de cada bloco final
+        self.rev1 = 0
+        self.rev2 = 0
+        self.orig = 0
+        self.cache_hits = 0
+        self.tokens_entrada = 0
+        self.tokens_padding = 0
+        self.tokens_lote = 0
+        self.tokens_gerados = 0
+        self.tokens_orcamento = 0
+        self.tempo_geracao = 0.0
+        self.tempo_tokenizacao = 0.0
+        self.tempo_limpeza = 0.0
+        self.lotes = 0             # lotes com blocos deste capítulo
+        self.blocos_nos_lotes = 0  # soma do tamanho desses lotes
+        self.retentativas = 0      # blocos que foram para o 2º try
+        self.triagem_dispensados = 0       # blocos que pularam o LLM
+        self.triagem_tokens_poupados = 0   # prompt + saída estimada desses blocos
+        self.triagem_auditados = 0         # dispensáveis enviados ao LLM mesmo assim
+        self.triagem_alterados = 0         # auditados que o LLM alterou
+        self.duplicados = 0                # blocos copiados de outra ocorrência na execução
+        self.recuos_memoria = 0            # lotes com blocos deste capítulo refeitos por falta de memória
+        self.maior_lote = 0
+        self.abortos: Dict[str, int] = {}  # gerações abortadas durante a decodificação, por motivo
+        self.rascunho_propostos = 0        # decodificação assistida: tokens copiados do prompt e propostos
+        self.rascunho_aceitos = 0          # ... e confirmados pelo modelo
+
+
+class JanelaBlocos:
+    """
+    Estado de uma janela de capítulos em processamento.
+
+    `pendentes` são os blocos que precisam de geração; `aceitos` os revisados
+    de fato (vão para o cache). `nao_resolvidos` conta os blocos ainda sem
+    texto final — inclusive os que estão na fila de retentativas; a janela só
+    pode ser finalizada quando chega a zero.
+    """
+
+    def __init__(self, tarefas: List[TarefaCapitulo]):
+        self.inicio = time.time()
+        self.estados = [_EstadoCapitulo(t) for t in tarefas]
+        self.pendentes: List[_Item] = []
+        self.aceitos: List[_Item] = []
+        self.nao_resolvidos = 0
+
+    @property
+    def resolvida(self) -> bool:
+        return self.nao_resolvidos == 0
+
+
+class AgendadorBlocos:
+    """
+    Agendador global de blocos: junta os blocos de vários capítulos (e arquivos)
+    numa única fila e monta lotes agrupados por tamanho em tokens.
+
+    Blocos de tamanhos parecidos no mesmo lote desperdiçam menos padding e, como
+    o orçamento de geração de cada bloco deriva do seu tamanho, também têm
+    orçamentos parecidos. Os capítulos são processados em janelas de
+    `janela_capitulos` e devolvidos na ordem de entrada.
+
+    Blocos rejeitados no 1º try vão para uma fila global de retentativas e
+    entram nos lotes da janela seguinte, com `TEMPERATURA_RETENTATIVA`, em vez
+    de gerarem lotes pequenos só de retentativas. Por isso uma janela só é
+    finalizada depois que a seguinte gerou (ou no fim da execução).
+
+    Com `adaptativo`, o tamanho dos lotes segue o `ControleLote`: até
+    `LOTE_MAXIMO` blocos dentro de um orçamento de tokens estimado pela memória
+    livre. Em qualquer modo, um lote que esgota a memória é refeito em metades
+    em vez de derrubar a execução.
+    """
+
+    def __init__(self, backend: Optional[BackendInferencia] = None, cache: Optional[CacheRevisao] = None,
+                 usar_cache: bool = CACHE_REVISAO_ATIVO, tamanho_lote: Optional[int] = None,
+                 janela_capitulos: int = CAPITULOS_POR_JANELA, triagem: bool = TRIAGEM_ATIVA,
+                 limiar_triagem: float = TRIAGEM_LIMIAR, auditoria_triagem: float = TRIAGEM_AUDITORIA,
+                 dedup: bool = DEDUP_ATIVO, adaptativo: bool = LOTE_ADAPTATIVO):
+        self.backend = backend or obter_backend()
+        self.cache = cache if cache is not None else (obter_cache() if usar_cache else None)
+        self.tamanho_lote = tamanho_lote or (LOTE_MAXIMO if adaptativo else None) \
+            or self.backend.capacidades().get("batch_size") or 4
+        orcamento_tokens = (LOTE_ORCAMENTO_TOKENS or self.backend.orcamento_tokens_lote()) if adaptativo else None
+        self.controle_lote = ControleLote(self.tamanho_lote, orcamento_tokens)
+        self.janela_capitulos = max(1, janela_capitulos)
+        self.triagem = triagem
+        self.limiar_triagem = limiar_triagem
+        self.auditoria_triagem = auditoria_triagem
+        self.dedup = dedup
+
+        self._model_id = self.backend.capacidades().get("modelo", "")
+        self._tokens_template = len(self.backend.tokenizar([PROMPT_TEMPLATE.format(bloco="")])[0])
+
+        # Fila global de retentativas (a limpeza enfileira, a geração consome)
+        self._retentativas: List[_Item] = []
+        self._trava_retentativas = threading.Lock()
+
+        # Índice de deduplicação (texto normalizado): blocos já resolvidos nesta
+        # execução e representantes ainda em geração, que levam as cópias junto.
+        # A trava também protege `nao_resolvidos` da janela em preparação.
+        self._dedup_resolvidos: Dict[str, Tuple[str, int, str]] = {}  # (texto, tokens, "rev1"/"rev2"/"orig")
+        self._dedup_em_voo: Dict[str, _Item] = {}
+        self._trava_dedup = threading.Lock()
+
+        # Métricas acumuladas de todas as janelas
+        self.metricas = {
+            "lotes": 0,
+            "blocos_gerados": 0,
+            "tokens_lote": 0,
+            "tokens_padding": 0,
+            "tokens_gerados": 0,
+            "tokens_orcamento": 0,
+            "tempo_geracao": 0.0,
+            "blocos_retentativa": 0,       # blocos gerados de novo com TEMPERATURA_RETENTATIVA
+            "lotes_so_retentativas": 0,    # lotes sem nenhum bloco do 1º try
+            "duplicados": 0,               # blocos copiados de outra ocorrência, sem gerar
+            "blocos_abortados": 0,         # gerações abortadas por degenerar (loop, tamanho, marcador)
+            "recuos_memoria": 0,           # lotes refeitos em metades por falta de memória
+            "ampliacoes_lote": 0,          # subidas do limite do lote depois de uma sequência de sucessos
+            "rascunho_propostos": 0,       # decodificação assistida: tokens propostos a partir do prompt
+            "rascunho_aceitos": 0,         # ... e aceitos na verificação
+        }
+
+    # ----------------------------
+    # API pública
+    # ----------------------------
+
+    def executar(self, tarefas: Iterable[TarefaCapitulo]) -> Iterator[ResultadoCapitulo]:
+        """
+        Consome as tarefas em janelas e devolve um `ResultadoCapitulo` por tarefa, na mesma ordem.
+        """
+        abertas: Deque[JanelaBlocos] = deque()
+        janela: List[TarefaCapitulo] = []
+        try:
+            for tarefa in tarefas:
+                janela.append(tarefa)
+                if len(janela) >= self.janela_capitulos:
+                    yield from self._processar_janela(janela, abertas)
+                    janela = []
+            if janela:
+                yield from self._processar_janela(janela, abertas)
+
+            # Sobras da fila de retentativas (falhas da última janela)
+            while True:
+                itens = self.retirar_retentativas()
+                if not itens:
+                    break
+                self.revisar_itens(itens)
+            yield from self.finalizar_prontas(abertas)
+        except BaseException:
+            # Execução interrompida (erro na geração ou na escrita): as retentativas
+            # pendentes são desta execução e não podem vazar para o próximo arquivo
+            self.descartar_retentativas()
+            raise
+
+    def desperdicio_padding(self) -> float:
+        """Fração dos tokens dos lotes gastos com padding (acumulado)."""
+        return self.metricas["tokens_padding"] / self.metricas["tokens_lote"] if self.metricas["tokens_lote"] else 0.0
+
+    def tokens_por_segundo(self) -> float:
+        """Tokens gerados por segundo de geração (acumulado)."""
+        return self.metricas["tokens_gerados"] / self.metricas["tempo_geracao"] if self.metricas["tempo_geracao"] else 0.0
+
+    def perfil(self) -> Dict[str, Any]:
+        """Backend, modelo e dispositivo da execução (para o histórico usado no planejamento)."""
+        capacidades = self.backend.capacidades()
+        return {"backend": capacidades.get("nome"), "modelo": capacidades.get("modelo"),
+                "dispositivo": capacidades.get("dispositivo"), "trabalhadores": 1}
+
+    # ----------------------------
+    # Etapas (usadas em sequência aqui e em paralelo por processamento.pipeline)
+    # ----------------------------
+
+    def _processar_janela(self, tarefas: List[TarefaCapitulo],
+                          abertas: Deque["JanelaBlocos"]) -> Iterator[ResultadoCapitulo]:
+        janela = self.preparar_janela(tarefas)
+        abertas.append(janela)
+
+        # 1º try da janela nos mesmos lotes que as retentativas das janelas anteriores
+        self.revisar_itens(janela.pendentes + self.retirar_retentativas())
+        yield from self.finalizar_prontas(abertas)
+
+    def revisar_itens(self, itens: List[_Item]) -> None:
+        """
+        Gera e limpa `itens` em lotes, cada bloco na temperatura da sua tentativa.
+
+        Se a geração falhar, os blocos deixam de representar suas cópias no
+        índice de deduplicação (`descartar_itens`) e a fila de retentativas é
+        esvaziada antes de o erro subir.
+        """
+        try:
+            for lote in self.montar_lotes(itens):
+                respostas, duracao = self.gerar_lote(lote)
+                self.limpar_lote(lote, respostas, duracao)
+        except Exception:
+            self.descartar_itens(itens)
+            self.descartar_retentativas()
+            raise
+
+    def retirar_retentativas(self) -> List[_Item]:
+        """
+        Esvazia a fila global de retentativas e devolve os blocos que estavam nela.
+        """
+        with self._trava_retentativas:
+            itens, self._retentativas = self._retentativas, []
+        return itens
+
+    def descartar_retentativas(self) -> None:
+        """
+        Esvazia a fila de retentativas sem gerar nada: a execução que as enfileirou
+        foi interrompida e o agendador pode seguir para outro arquivo.
+        """
+        self.descartar_itens(self.retirar_retentativas())
+
+    def preparar_janela(self, tarefas: List[TarefaCapitulo]) -> "JanelaBlocos":
+        """
+        Etapa de lote: tokeniza os blocos da janela e separa os que já estão no
+        cache ou que a triagem considera limpos.
+        """
+        janela = JanelaBlocos(tarefas)
+        estados = janela.estados
+
+        # Tokeniza o prompt de cada bloco da janela uma única vez, numa chamada só.
+        # Os ids seguem até a geração; o tamanho do bloco é o prompt menos o template.
+        itens = [
+            _Item(capitulo=c, indice=b, texto=texto, n_tokens=0, janela=janela)
+            for c, tarefa in enumerate(tarefas)
+            for b, texto in enumerate(tarefa.blocos)
+        ]
+        inicio = time.perf_counter()
+        todos_ids = self.backend.tokenizar([montar_prompt(item.texto) for item in itens])
+        por_bloco = (time.perf_counter() - inicio) / max(1, len(itens))
+        for item, ids in zip(itens, todos_ids):
+            estados[item.capitulo].tempo_tokenizacao += por_bloco
+            item.ids_prompt = ids
+            item.n_tokens = max(0, len(ids) - self._tokens_template)
+            if item.texto.strip():
+                estados[item.capitulo].tokens_entrada += item.n_tokens
+
+        # Cache: blocos já revisados não entram na fila
+        janela.pendentes = itens
+        if self.cache is not None:
+            for item in itens:
+                item.chave_cache = chave_revisao(self._model_id, PROMPT_TEMPLATE, TEMPERATURE, item.texto)
+            encontrados = self.cache.buscar_muitos(item.chave_cache for item in itens)
+            janela.pendentes = []
+            for item in itens:
+                if item.chave_cache in encontrados:
+                    texto, n_tokens = encontrados[item.chave_cache]
+                    estados[item.capitulo].revisados[item.indice] = texto
+                    estados[item.capitulo].tokens_saida[item.indice] = n_tokens
+                    estados[item.capitulo].cache_hits += 1
+                else:
+                    janela.pendentes.append(item)
+
+        # Triagem: blocos que já parecem limpos ficam como estão, sem passar pela GPU.
+        # Uma fração sorteada vai ao LLM mesmo assim, para medir o que se perde.
+        if self.triagem:
+            pendentes = []
+            for item in janela.pendentes:
+                if not dispensa_revisao(item.texto, self.limiar_triagem):
+                    pendentes.append(item)
+                    continue
+                estado = estados[item.capitulo]
+                if sorteado_auditoria(item.texto, self.auditoria_triagem):
+                    item.auditoria = True
+                    estado.triagem_auditados += 1
+                    pendentes.append(item)
+                    continue
+                estado.revisados[item.indice] = item.texto.strip()
+                estado.tokens_saida[item.indice] = item.n_tokens
+                estado.triagem_dispensados += 1
+                estado.triagem_tokens_poupados += len(item.ids_prompt) + item.n_tokens
+            janela.pendentes = pendentes
+
+        self._deduplicar(janela)
+        return janela
+
+    def _deduplicar(self, janela: "JanelaBlocos") -> None:
+        """
+        Deixa em `janela.pendentes` só a primeira ocorrência de cada bloco na execução.
+
+        Cópias de um bloco já resolvido recebem o resultado na hora; cópias de um
+        bloco ainda em geração (nesta janela ou numa anterior) esperam por ele e
+        mantêm a janela aberta até lá.
+        """
+        with self._trava_dedup:
+            if not self.dedup:
+                janela.nao_resolvidos += len(janela.pendentes)
+                return
+            pendentes = []
+            for item in janela.pendentes:
+                chave = normalizar_bloco(item.texto)
+                resolvido = self._dedup_resolvidos.get(chave)
+                if resolvido is not None:
+                    self._copiar_resultado(item, *resolvido)
+                    continue
+                representante = self._dedup_em_voo.get(chave)
+                if representante is not None:
+                    representante.seguidores.append(item)
+                    janela.nao_resolvidos += 1
+                    continue
+                item.chave_dedup = chave
+                self._dedup_em_voo[chave] = item
+                pendentes.append(item)
+            janela.pendentes = pendentes
+            janela.nao_resolvidos += len(pendentes)
+
+    def descartar_itens(self, itens: List[_Item]) -> None:
+        """
+        Tira do índice de deduplicação os representantes de `itens` que não vão
+        mais ser resolvidos (a geração levantou uma exceção).
+
+        Sem isso, toda ocorrência futura do mesmo texto esperaria por eles para
+        sempre e sairia sem revisão; assim, a próxima vira representante e é
+        gerada. Cópias que já esperavam ficam com o original.
+        """
+        with self._trava_dedup:
+            for item in itens:
+                if not item.chave_dedup:
+                    continue
+                if self._dedup_em_voo.get(item.chave_dedup) is item:
+                    del self._dedup_em_voo[item.chave_dedup]
+                for copia in item.seguidores:
+                    self._copiar_resultado(copia, copia.texto.strip(), copia.n_tokens, "orig")
+                    copia.janela.nao_resolvidos -= 1
+                item.chave_dedup = ""
+                item.seguidores = []
+
+    def _copiar_resultado(self, item: _Item, texto: str, n_tokens: int, resultado: str) -> None:
+        """
+        Dá a uma cópia o texto do representante e a conta no mesmo resultado dele
+        (rev1, rev2 ou orig): as estatísticas do capítulo refletem as falhas copiadas.
+        """
+        estado = item.estado
+        if resultado == "orig":
+            estado.revisados[item.indice] = item.texto.strip()
+            estado.tokens_saida[item.indice] = item.n_tokens
+            estado.orig += 1
+        else:
+            estado.revisados[item.indice] = texto
+            estado.tokens_saida[item.indice] = n_tokens
+            if resultado == "rev1":
+                estado.rev1 += 1
+            else:
+                estado.rev2 += 1
+        estado.duplicados += 1
+        self.metricas["duplicados"] += 1
+
+    def _resolver_copias(self, item: _Item, texto: str, n_tokens: int, resultado: str) -> None:
+        """
+        Registra o resultado final de um representante e o repassa às cópias que esperavam.
+        """
+        if not item.chave_dedup:
+            return
+        with self._trava_dedup:
+            self._dedup_em_voo.pop(item.chave_dedup, None)
+            if len(self._dedup_resolvidos) < DEDUP_MAX_ENTRADAS:
+                self._dedup_resolvidos[item.chave_dedup] = (texto, n_tokens, resultado)
+            for copia in item.seguidores:
+                self._copiar_resultado(copia, texto, n_tokens, resultado)
+                copia.janela.nao_resolvidos -= 1
+            item.seguidores = []
+
+    def montar_lotes(self, itens: List[_Item]) -> List[List[_Item]]:
+        """
+        Ordena os blocos por tamanho e fatia em lotes: vizinhos têm tamanho
+        (e portanto orçamento de geração) parecido. O `controle_lote` decide
+        onde cortar (limite de blocos e orçamento de tokens).
+        """
+        ordenados = sorted(itens, key=lambda item: item.n_tokens)
+        return self.controle_lote.fatiar(
+            ordenados, lambda item: (self._tokens_template + item.n_tokens, calcular_orcamento(item.n_tokens)))
+
+    def gerar_lote(self, lote: List[_Item]) -> Tuple[List[Geracao], float]:
+        """
+        Etapa de geração: envia um lote ao backend. Devolve (respostas, duração em segundos).
+
+        Cada bloco usa a temperatura da sua tentativa; um lote só de 1º try
+        (o caso comum) vai ao backend com uma temperatura única.
+        """
+        inicio = time.time()
+        respostas = self._gerar_com_recuo(lote)
+        duracao = time.time() - inicio
+
+        if not isinstance(respostas, list) or len(respostas) != len(lote):
+            raise ValueError("Modelo não retornou uma lista de respostas.")
+        return respostas, duracao
+
+    def _gerar_com_recuo(self, lote: List[_Item]) -> List[Geracao]:
+        """
+        Gera o lote; se faltar memória, corta o limite pela metade e gera os mesmos blocos em pedaços.
+        """
+        maximo = self.controle_lote.maximo
+        if len(lote) > maximo:
+            # Lote montado antes de um recuo (o pipeline monta lotes adiantado)
+            return [r for i in range(0, len(lote), maximo) for r in self._gerar_com_recuo(lote[i:i + maximo])]
+
+        temperaturas = [item.temperatura for item in lote]
+        try:
+            respostas = self.backend.gerar([montar_prompt(item.texto) for item in lote],
+                                           max_new_tokens=[calcular_orcamento(item.n_tokens) for item in lote],
+                                           temperature=temperaturas if len(set(temperaturas)) > 1 else temperaturas[0],
+                                           ids_prompts=[item.ids_prompt for item in lote],
+                                           tamanhos_blocos=[item.n_tokens for item in lote])
+        except MemoriaEsgotada:
+            if len(lote) == 1:
+                raise
+            novo = self.controle_lote.registrar_falta_memoria(len(lote))
+            self._registrar_ajuste_lote(lote, "recuo", len(lote), novo)
+            return self._gerar_com_recuo(lote)
+
+        for estado in {id(item.estado): item.estado for item in lote}.values():
+            estado.maior_lote = max(estado.maior_lote, len(lote))
+        ampliado = self.controle_lote.registrar_sucesso(len(lote))
+        if ampliado:
+            self._registrar_ajuste_lote(lote, "ampliacao", len(lote), ampliado)
+        return respostas
+
+    def _registrar_ajuste_lote(self, lote: List[_Item], evento: str, de: int, para: int) -> None:
+        if evento == "recuo":
+            print(f"[📉] Memória esgotada num lote de {de} blocos: tentando de novo com até {para}")
+            self.metricas["recuos_memoria"] += 1
+        else:
+            print(f"[📈] Limite do lote ampliado de {de} para {para} blocos")
+            self.metricas["ampliacoes_lote"] += 1
+        estados = {id(item.estado): item.estado for item in lote}.values()
+        for logger in {id(e.tarefa.logger): e.tarefa.logger for e in estados if e.tarefa.logger}.values():
+            logger.log_ajuste_lote(evento, de, para)
+        if evento == "recuo":
+            for estado in estados:
+                estado.recuos_memoria += 1
+
+    def limpar_lote(self, lote: List[_Item], respostas: List[Geracao], duracao: float) -> None:
+        """
+        Etapa de limpeza/validação: limpa cada resposta e classifica o bloco.
+
+        No 1º try, blocos rejeitados vão para a fila global de retentativas;
+        no 2º, ficam com o original. Gerações abortadas durante a decodificação
+        (`MOTIVOS_ABORTO`) são rejeitadas sem passar pela limpeza. O lote pode
+        misturar janelas: cada bloco atualiza o capítulo de onde veio.
+        """
+        inicio = time.perf_counter()
+        retentativas_no_lote = sum(1 for item in lote if item.tentativa > 1)
+        falhas = []
+        for item, saida in zip(lote, respostas):
+            estado = item.estado
+            if saida.motivo_parada in MOTIVOS_ABORTO:
+                texto = ""
+                estado.abortos[saida.motivo_parada] = estado.abortos.get(saida.motivo_parada, 0) + 1
+                self.metricas["blocos_abortados"] += 1
+            else:
+                try:
+                    texto = limpar_resposta(saida.texto, nome_base=estado.tarefa.nome_base, indice_bloco=item.indice,
+                                            logger=estado.tarefa.logger, texto_completo=False).strip()
+                except Exception:
+                    texto = ""
+
+            if aceitar_revisao(texto, item.texto):
+                estado.revisados[item.indice] = texto
+                estado.tokens_saida[item.indice] = len(saida.ids)
+                resultado = "rev1" if item.tentativa == 1 else "rev2"
+                if item.tentativa == 1:
+                    estado.rev1 += 1
+                else:
+                    estado.rev2 += 1
+                item.janela.aceitos.append(item)
+                item.janela.nao_resolvidos -= 1
+                self._resolver_copias(item, texto, len(saida.ids), resultado)
+                if item.auditoria and texto != item.texto.strip():
+                    estado.triagem_alterados += 1
+                    if estado.tarefa.logger:
+                        estado.tarefa.logger.log_auditoria_triagem(item.indice, item.texto, texto)
+            elif item.tentativa == 1:
+                item.tentativa = 2
+                falhas.append(item)
+                estado.retentativas += 1
+            else:
+                estado.revisados[item.indice] = item.texto.strip()
+                estado.tokens_saida[item.indice] = item.n_tokens
+                estado.orig += 1
+                item.janela.nao_resolvidos -= 1
+                self._resolver_copias(item, item.texto.strip(), item.n_tokens, "orig")
+
+        if falhas:
+            with self._trava_retentativas:
+                self._retentativas.extend(falhas)
+
+        tempo_limpeza = (time.perf_counter() - inicio) / len(lote)
+
+        # Métricas do lote: padding (prompt mais longo - prompt de cada bloco),
+        # passos de decodificação gastos vs orçamento e vazão
+        maior = max(item.n_tokens for item in lote)
+        largura = self._tokens_template + maior
+        for item, saida in zip(lote, respostas):
+            estado = item.estado
+            estado.tokens_padding += maior - item.n_tokens
+            estado.tokens_lote += largura
+            estado.tokens_gerados += saida.tokens_gerados
+            estado.tokens_orcamento += saida.orcamento
+            estado.rascunho_propostos += saida.rascunho_propostos
+            estado.rascunho_aceitos += saida.rascunho_aceitos
+            estado.tempo_geracao += duracao / len(lote)
+            estado.tempo_limpeza += tempo_limpeza
+        for estado in {id(item.estado): item.estado for item in lote}.values():
+            estado.lotes += 1
+            estado.blocos_nos_lotes += len(lote)
+
+        self.metricas["lotes"] += 1
+        self.metricas["blocos_gerados"] += len(lote)
+        self.metricas["tokens_lote"] += largura * len(lote)
+        self.metricas["tokens_padding"] += sum(maior - item.n_tokens for item in lote)
+        self.metricas["tokens_gerados"] += sum(saida.tokens_gerados for saida in respostas)
+        self.metricas["tokens_orcamento"] += sum(saida.orcamento for saida in respostas)
+        self.metricas["rascunho_propostos"] += sum(saida.rascunho_propostos for saida in respostas)
+        self.metricas["rascunho_aceitos"] += sum(saida.rascunho_aceitos for saida in respostas)
+        self.metricas["tempo_geracao"] += duracao
+        self.metricas["blocos_retentativa"] += retentativas_no_lote
+        if retentativas_no_lote == len(lote):
+            self.metricas["lotes_so_retentativas"] += 1
+
+    def finalizar_prontas(self, abertas: Deque["JanelaBlocos"]) -> List[ResultadoCapitulo]:
+        """
+        Finaliza, em ordem, as janelas do começo de `abertas` que não têm mais blocos pendentes.
+        """
+        resultados = []
+        while abertas and abertas[0].resolvida:
+            resultados.extend(self.finalizar_janela(abertas.popleft()))
+        return resultados
+
+    def finalizar_janela(self, janela: "JanelaBlocos") -> List[ResultadoCapitulo]:
+        """
+        Grava os aceitos no cache, garante que nenhum bloco ficou vazio e monta os resultados.
+        """
+        estados = janela.estados
+        if self.cache is not None:
+            self.cache.gravar_muitos({
+                item.chave_cache: (estados[item.capitulo].revisados[item.indice],
+                                   estados[item.capitulo].tokens_saida[item.indice])
+                for item in janela.aceitos
+            })
+
+        duracao_janela = time.time() - janela.inicio
+        total_blocos = sum(len(e.tarefa.blocos) for e in estados) or 1
+
+        resultados = []
+        for estado in estados:
+            tarefa = estado.tarefa
+
+            # Verificação de integridade: garante que nenhum bloco ficou em branco
+            recuperados = []
+            for idx, r in enumerate(estado.revisados):
+                if not r.strip():
+                    estado.revisados[idx] = tarefa.blocos[idx]
+                    recuperados.append(idx)
+            tokens_saida = sum(n for n, r in zip(estado.tokens_saida, estado.revisados) if r.strip())
+
+            resultados.append(ResultadoCapitulo(
+                chave=tarefa.chave,
+                titulo=tarefa.titulo,
+                blocos=tarefa.blocos,
+                revisados=estado.revisados,
+                estatisticas={
+                    "blocos": len(tarefa.blocos),
+                    "tokens": estado.tokens_entrada,
+                    "erros": estado.orig,
+                    "duracao_segundos": duracao_janela * len(tarefa.blocos) / total_blocos,
+                    "tokens_saida": tokens_saida,
+                    "rev1": estado.rev1,
+                    "rev2": estado.rev2,
+                    "orig": estado.orig,
+                    "recuperados": recuperados,
+                    "cache_hits": estado.cache_hits,
+                    "cache_misses": len(tarefa.blocos) - estado.cache_hits,
+                    "desperdicio_padding": estado.tokens_padding / estado.tokens_lote if estado.tokens_lote else 0.0,
+                    "tokens_por_segundo": estado.tokens_gerados / estado.tempo_geracao if estado.tempo_geracao else 0.0,
+                    "tokens_gerados": estado.tokens_gerados,
+                    "tokens_orcamento": estado.tokens_orcamento,
+                    "retentativas": estado.retentativas,
+                    "tamanho_medio_lote": estado.blocos_nos_lotes / estado.lotes if estado.lotes else 0.0,
+                    "triagem_dispensados": estado.triagem_dispensados,
+                    "triagem_tokens_poupados": estado.triagem_tokens_poupados,
+                    "triagem_auditados": estado.triagem_auditados,
+                    "triagem_alterados": estado.triagem_alterados,
+                    "duplicados": estado.duplicados,
+                    "abortos": dict(estado.abortos),
+                    "recuos_memoria": estado.recuos_memoria,
+                    "maior_lote": estado.maior_lote,
+                    "rascunho_propostos": estado.rascunho_propostos,
+                    "rascunho_aceitos": estado.rascunho_aceitos,
+                    "tempos_etapas": {
+                        "tokenizacao": estado.tempo_tokenizacao,
+                        "geracao": estado.tempo_geracao,
+                        "limpeza": estado.tempo_limpeza,
+                    },
+                },
+            ))
+        return resultados
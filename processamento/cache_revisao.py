@@ -0,0 +1,138 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from utils.config import CACHE_REVISAO_CAMINHO, CACHE_REVISAO_MAX_ENTRADAS
+
+
+def chave_revisao(model_id: str, template: str, temperatura: float, bloco: str) -> str:
+    """
+    Gera a chave de conteúdo de um bloco revisado.
+
+    Qualquer mudança no modelo, no prompt, na temperatura ou no texto do bloco
+    produz uma chave diferente — ou seja, invalida a entrada antiga.
+    """
+    h = hashlib.sha256()
+    for parte in (model_id, template, repr(float(temperatura)), bloco):
+        h.update(parte.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class CacheRevisao:
+    """
+    Cache persistente (SQLite) de blocos já revisados, endereçado por conteúdo.
+
+    Guarda a saída final de `limpar_resposta` de cada bloco aceito (com a
+    quantidade de tokens gerados, para não retokenizar) e descarta as entradas
+    usadas há mais tempo quando passa de `max_entradas` (LRU).
+    """
+
+    def __init__(self, caminho: str = CACHE_REVISAO_CAMINHO, max_entradas: int = CACHE_REVISAO_MAX_ENTRADAS):
+        if os.path.dirname(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        self.caminho = caminho
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS revisoes ("
+            " chave TEXT PRIMARY KEY,"
+            " texto TEXT NOT NULL,"
+            " ultimo_acesso REAL NOT NULL,"
+            " n_tokens INTEGER NOT NULL DEFAULT 0)"
+        )
+        colunas = {linha[1] for linha in self._conn.execute("PRAGMA table_info(revisoes)")}
+        if "n_tokens" not in colunas:
+            # Banco criado por uma versão anterior
+            self._conn.execute("ALTER TABLE revisoes ADD COLUMN n_tokens INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_acesso ON revisoes (ultimo_acesso)")
+        self._conn.commit()
+
+    def buscar_muitos(self, chaves: Iterable[str]) -> Dict[str, Tuple[str, int]]:
+        """
+        Busca várias chaves de uma vez e atualiza o acesso das encontradas.
+
+        Returns:
+            Dict[str, Tuple[str, int]]: chave -> (texto revisado, tokens gerados), apenas para os acertos.
+        """
+        chaves = list(dict.fromkeys(chaves))
+        encontrados: Dict[str, Tuple[str, int]] = {}
+        with self._lock:
+            # SQLite limita a quantidade de parâmetros por consulta
+            for i in range(0, len(chaves), 500):
+                parte = chaves[i:i + 500]
+                marcadores = ",".join("?" * len(parte))
+                for chave, texto, n_tokens in self._conn.execute(
+                    f"SELECT chave, texto, n_tokens FROM revisoes WHERE chave IN ({marcadores})", parte
+                ):
+                    encontrados[chave] = (texto, n_tokens)
+            if encontrados:
+                agora = time.time()
+                self._conn.executemany(
+                    "UPDATE revisoes SET ultimo_acesso = ? WHERE chave = ?",
+                    [(agora, chave) for chave in encontrados],
+                )
+                self._conn.commit()
+            self.hits += len(encontrados)
+            self.misses += len(chaves) - len(encontrados)
+        return encontrados
+
+    def gravar_muitos(self, itens: Dict[str, Tuple[str, int]]) -> None:
+        """
+        Grava (ou sobrescreve) várias revisões e aplica o limite de tamanho.
+
+        Args:
+            itens (dict): chave -> (texto revisado, tokens gerados).
+        """
+        if not itens:
+            return
+        agora = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO revisoes (chave, texto, ultimo_acesso, n_tokens) VALUES (?, ?, ?, ?)",
+                [(chave, texto, agora, n_tokens) for chave, (texto, n_tokens) in itens.items()],
+            )
+            self._evictar()
+            self._conn.commit()
+
+    def _evictar(self) -> None:
+        (total,) = self._conn.execute("SELECT COUNT(*) FROM revisoes").fetchone()
+        excesso = total - self.max_entradas
+        if excesso > 0:
+            self._conn.execute(
+                "DELETE FROM revisoes WHERE chave IN ("
+                " SELECT chave FROM revisoes ORDER BY ultimo_acesso ASC LIMIT ?)",
+                (excesso,),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM revisoes").fetchone()[0]
+
+    def fechar(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[CacheRevisao] = None
+_lock_cache = threading.Lock()
+
+
+def obter_cache() -> CacheRevisao:
+    """
+    Retorna o cache de revisões do processo, abrindo o banco na primeira chamada.
+    """
+    global _cache
+    if _cache is None:
+        with _lock_cache:
+            if _cache is None:
+                _cache = CacheRevisao()
+    return _cache
@@ -0,0 +1,95 @@
+import threading
+from collections import Counter
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from utils.config import LOTE_RAMPA_SUCESSOS
+
+T = TypeVar("T")
+
+
+class ControleLote:
+    """
+    Tamanho de lote adaptativo.
+
+    Um lote é fechado quando atinge o limite atual de blocos (`maximo`) ou
+    quando mais uma linha passaria do orçamento de tokens — linhas x (largura
+    do prompt mais longo + maior orçamento de geração), que é o que ocupa o
+    KV-cache. Lotes de blocos curtos ficam grandes; de blocos longos, pequenos.
+
+    Se o dispositivo ficar sem memória, `registrar_falta_memoria` corta o
+    limite pela metade (o lote é refeito em pedaços); a cada `rampa` lotes
+    bem-sucedidos seguidos, `registrar_sucesso` sobe o limite em 25%, até o `teto`.
+
+    Args:
+        teto (int): Limite máximo de blocos por lote.
+        orcamento_tokens (int, opcional): Tokens por lote. None: só o limite de blocos vale.
+        rampa (int): Lotes bem-sucedidos seguidos antes de subir o limite.
+    """
+
+    def __init__(self, teto: int, orcamento_tokens: Optional[int] = None, rampa: int = LOTE_RAMPA_SUCESSOS):
+        self.teto = max(1, teto)
+        self.maximo = self.teto
+        self.orcamento_tokens = orcamento_tokens
+        self.rampa = max(1, rampa)
+        self.recuos = 0
+        self.ampliacoes = 0
+        self.tamanhos: Counter = Counter()  # tamanho de lote gerado -> quantidade
+        self._sucessos = 0
+        self._trava = threading.Lock()  # a montagem (pipeline) e a geração rodam em threads diferentes
+
+    def cabe(self, linhas: int, largura: int, geracao: int) -> bool:
+        """
+        True se um lote de `linhas` sequências, com prompt de até `largura`
+        tokens e geração de até `geracao`, respeita o limite e o orçamento.
+        """
+        if linhas > self.maximo:
+            return False
+        return linhas == 1 or self.orcamento_tokens is None or linhas * (largura + geracao) <= self.orcamento_tokens
+
+    def fatiar(self, itens: List[T], medir: Callable[[T], Tuple[int, int]]) -> List[List[T]]:
+        """
+        Fatia itens já ordenados por tamanho em lotes consecutivos que cabem.
+
+        Args:
+            medir (Callable): Devolve (largura do prompt, orçamento de geração) de um item.
+        """
+        lotes: List[List[T]] = []
+        atual: List[T] = []
+        largura = geracao = 0
+        for item in itens:
+            l, g = medir(item)
+            if atual and not self.cabe(len(atual) + 1, max(largura, l), max(geracao, g)):
+                lotes.append(atual)
+                atual, largura, geracao = [], 0, 0
+            atual.append(item)
+            largura, geracao = max(largura, l), max(geracao, g)
+        if atual:
+            lotes.append(atual)
+        return lotes
+
+    def registrar_sucesso(self, linhas: int) -> Optional[int]:
+        """
+        Conta um lote gerado. Devolve o novo limite quando ele subiu.
+        """
+        with self._trava:
+            self.tamanhos[linhas] += 1
+            # Só conta para a rampa o lote que usou o limite: lotes pequenos por falta de blocos não provam nada
+            if linhas < self.maximo or self.maximo >= self.teto:
+                return None
+            self._sucessos += 1
+            if self._sucessos < self.rampa:
+                return None
+            self._sucessos = 0
+            self.maximo = min(self.teto, self.maximo + max(1, self.maximo // 4))
+            self.ampliacoes += 1
+            return self.maximo
+
+    def registrar_falta_memoria(self, linhas: int) -> int:
+        """
+        Um lote de `linhas` blocos não coube: o limite cai para a metade dele. Devolve o novo limite.
+        """
+        with self._trava:
+            self.maximo = max(1, min(self.maximo, linhas // 2))
+            self._sucessos = 0
+            self.recuos += 1
+            return self.maximo
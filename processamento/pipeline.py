@@ -0,0 +1,298 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from processamento.agendador import AgendadorBlocos, JanelaBlocos, ResultadoCapitulo, TarefaCapitulo
+from utils.config import PIPELINE_TAMANHO_FILA
+
+# Marca o fim do fluxo em cada fila
+_FIM = object()
+
+
+class Cancelado(Exception):
+    """Outra etapa falhou; esta etapa deve parar."""
+
+
+class MedidorEtapa:
+    """
+    Mede o tempo de uma etapa do pipeline:
+    - ocupado: processando um item,
+    - ocioso: esperando item da etapa anterior,
+    - bloqueado: esperando espaço na fila da próxima etapa (backpressure).
+    """
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.ocupado = 0.0
+        self.ocioso = 0.0
+        self.bloqueado = 0.0
+        self.itens = 0
+
+    def como_dict(self) -> Dict[str, float]:
+        return {"ocupado": self.ocupado, "ocioso": self.ocioso, "bloqueado": self.bloqueado, "itens": self.itens}
+
+
+class Canal:
+    """
+    Fila limitada entre duas etapas. `put` bloqueia quando cheia (backpressure)
+    e ambas as operações desistem se o pipeline for cancelado.
+    """
+
+    def __init__(self, tamanho: int, cancelar: threading.Event):
+        self._fila = queue.Queue(maxsize=max(1, tamanho))
+        self._cancelar = cancelar
+
+    def put(self, item: Any, medidor: MedidorEtapa) -> None:
+        inicio = time.perf_counter()
+        try:
+            while True:
+                if self._cancelar.is_set():
+                    raise Cancelado()
+                try:
+                    self._fila.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+        finally:
+            medidor.bloqueado += time.perf_counter() - inicio
+
+    def get(self, medidor: MedidorEtapa) -> Any:
+        inicio = time.perf_counter()
+        try:
+            while True:
+                if self._cancelar.is_set():
+                    raise Cancelado()
+                try:
+                    return self._fila.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+        finally:
+            medidor.ocioso += time.perf_counter() - inicio
+
+
+class PipelineRevisao:
+    """
+    Pipeline produtor/consumidor da revisão, com uma thread por etapa:
+
+        leitura → segmentação → lotes → geração → limpeza/validação → escrita
+
+    As etapas de CPU rodam em paralelo com a geração, de modo que o backend
+    sempre tenha a próxima janela de blocos pronta. As filas entre etapas são
+    limitadas (`tamanho_fila`), o que segura a memória quando a geração é o
+    gargalo. Ao final, `relatorio()` mostra o tempo ocupado/ocioso de cada etapa.
+
+    Args:
+        agendador (AgendadorBlocos): Fornece as etapas de lote, geração, limpeza e finalização.
+        segmentar (Callable): (chave, título, parágrafos) -> TarefaCapitulo.
+        escrever (Callable): Recebe cada ResultadoCapitulo, na ordem dos capítulos.
+    """
+
+    ETAPAS = ("leitura", "segmentacao", "lotes", "geracao", "limpeza", "escrita")
+
+    def __init__(self, agendador: AgendadorBlocos,
+                 segmentar: Callable[[Any, str, List[str]], TarefaCapitulo],
+                 escrever: Callable[[ResultadoCapitulo], None],
+                 tamanho_fila: int = PIPELINE_TAMANHO_FILA):
+        self.agendador = agendador
+        self.segmentar = segmentar
+        self.escrever = escrever
+        self.tamanho_fila = tamanho_fila
+        self.medidores = {nome: MedidorEtapa(nome) for nome in self.ETAPAS}
+        self._cancelar = threading.Event()
+        self._erro: Optional[BaseException] = None
+
+    def executar(self, capitulos: Iterable[Tuple[Any, str, List[str]]]) -> Dict[str, Dict[str, float]]:
+        """
+        Roda o pipeline até o último capítulo ser escrito.
+
+        Args:
+            capitulos (Iterable): (chave, título, parágrafos) dos capítulos a revisar.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Relatório de tempo por etapa.
+        """
+        c = lambda: Canal(self.tamanho_fila, self._cancelar)  # noqa: E731
+        lidos, tarefas, janelas, limpeza, escrita = c(), c(), c(), c(), c()
+
+        threads = [
+            threading.Thread(target=self._rodar, args=(self._leitura, capitulos, lidos), name="leitura"),
+            threading.Thread(target=self._rodar, args=(self._segmentacao, lidos, tarefas), name="segmentacao"),
+            threading.Thread(target=self._rodar, args=(self._lotes, tarefas, janelas), name="lotes"),
+            threading.Thread(target=self._rodar, args=(self._geracao, janelas, limpeza), name="geracao"),
+            threading.Thread(target=self._rodar, args=(self._limpeza, limpeza, escrita), name="limpeza"),
+            threading.Thread(target=self._rodar, args=(self._escrita, escrita, None), name="escrita"),
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        if self._erro is not None:
+            # Com as threads paradas, nada mais enfileira retentativas: as que sobraram
+            # são deste arquivo e não podem entrar nos lotes do próximo
+            self.agendador.descartar_retentativas()
+            raise self._erro
+        return self.relatorio()
+
+    def relatorio(self) -> Dict[str, Dict[str, float]]:
+        return {nome: m.como_dict() for nome, m in self.medidores.items()}
+
+    # ----------------------------
+    # Etapas
+    # ----------------------------
+
+    def _rodar(self, etapa: Callable, entrada: Any, saida: Optional[Canal]) -> None:
+        try:
+            etapa(entrada, saida)
+        except Cancelado:
+            pass
+        except BaseException as erro:
+            if self._erro is None:
+                self._erro = erro
+            self._cancelar.set()
+
+    def _leitura(self, capitulos: Iterable, saida: Canal) -> None:
+        m = self.medidores["leitura"]
+        iterador = iter(capitulos)
+        while True:
+            inicio = time.perf_counter()
+            capitulo = next(iterador, _FIM)
+            m.ocupado += time.perf_counter() - inicio
+            saida.put(capitulo, m)
+            if capitulo is _FIM:
+                return
+            m.itens += 1
+
+    def _segmentacao(self, entrada: Canal, saida: Canal) -> None:
+        m = self.medidores["segmentacao"]
+        while True:
+            capitulo = entrada.get(m)
+            if capitulo is _FIM:
+                saida.put(_FIM, m)
+                return
+            inicio = time.perf_counter()
+            tarefa = self.segmentar(*capitulo)
+            m.ocupado += time.perf_counter() - inicio
+            m.itens += 1
+            saida.put(tarefa, m)
+
+    def _lotes(self, entrada: Canal, saida: Canal) -> None:
+        m = self.medidores["lotes"]
+        acumuladas: List[TarefaCapitulo] = []
+        while True:
+            tarefa = entrada.get(m)
+            if tarefa is not _FIM:
+                acumuladas.append(tarefa)
+                if len(acumuladas) < self.agendador.janela_capitulos:
+                    continue
+            if acumuladas:
+                inicio = time.perf_counter()
+                janela = self.agendador.preparar_janela(acumuladas)
+                m.ocupado += time.perf_counter() - inicio
+                m.itens += 1
+                saida.put(janela, m)
+                acumuladas = []
+            if tarefa is _FIM:
+                saida.put(_FIM, m)
+                return
+
+    def _geracao(self, entrada: Canal, saida: Canal) -> None:
+        m = self.medidores["geracao"]
+        while True:
+            janela = entrada.get(m)
+            if janela is _FIM:
+                break
+
+            # A limpeza finaliza as janelas na ordem em que são anunciadas aqui
+            saida.put(("janela", janela), m)
+
+            # 1º try da janela junto com as retentativas já validadas pela limpeza;
+            # cada lote gerado segue para a limpeza enquanto o próximo é gerado
+            itens = janela.pendentes + self.agendador.retirar_retentativas()
+            self._gerar_lotes(itens, saida, m)
+
+        # Sobras da fila de retentativas: espera a limpeza validar todos os lotes já
+        # gerados (são eles que enfileiram as retentativas) e gera o que restou
+        while True:
+            validado = threading.Event()
+            saida.put(("marco", validado), m)
+            self._aguardar(validado, m)
+            itens = self.agendador.retirar_retentativas()
+            if not itens:
+                break
+            self._gerar_lotes(itens, saida, m)
+        saida.put(_FIM, m)
+
+    def _gerar_lotes(self, itens, saida: Canal, m: MedidorEtapa) -> None:
+        for lote in self.agendador.montar_lotes(itens):
+            inicio = time.perf_counter()
+            try:
+                respostas, duracao = self.agendador.gerar_lote(lote)
+            except Exception:
+                # O agendador pode seguir para o próximo arquivo: não deixa cópias à espera destes blocos
+                self.agendador.descartar_itens(itens)
+                raise
+            m.ocupado += time.perf_counter() - inicio
+            m.itens += 1
+            saida.put(("lote", lote, respostas, duracao), m)
+
+    def _aguardar(self, evento: threading.Event, m: MedidorEtapa) -> None:
+        inicio = time.perf_counter()
+        try:
+            while not evento.wait(0.1):
+                if self._cancelar.is_set():
+                    raise Cancelado()
+        finally:
+            m.ocioso += time.perf_counter() - inicio
+
+    def _limpeza(self, entrada: Canal, saida: Canal) -> None:
+        m = self.medidores["limpeza"]
+        abertas: Deque[JanelaBlocos] = deque()
+        while True:
+            mensagem = entrada.get(m)
+            if mensagem is _FIM:
+                saida.put(_FIM, m)
+                return
+
+            inicio = time.perf_counter()
+            if mensagem[0] == "janela":
+                abertas.append(mensagem[1])
+            elif mensagem[0] == "marco":
+                mensagem[1].set()
+            else:
+                _, lote, respostas, duracao = mensagem
+                self.agendador.limpar_lote(lote, respostas, duracao)
+                m.itens += 1
+            # Janelas do começo da fila sem blocos pendentes (nem retentativas) já podem ser escritas
+            resultados = self.agendador.finalizar_prontas(abertas)
+            m.ocupado += time.perf_counter() - inicio
+
+            for resultado in resultados:
+                saida.put(resultado, m)
+
+    def _escrita(self, entrada: Canal, _saida: None) -> None:
+        m = self.medidores["escrita"]
+        while True:
+            resultado = entrada.get(m)
+            if resultado is _FIM:
+                return
+            inicio = time.perf_counter()
+            self.escrever(resultado)
+            m.ocupado += time.perf_counter() - inicio
+            m.itens += 1
+
+
+def formatar_relatorio(relatorio: Dict[str, Dict[str, float]]) -> List[str]:
+    """
+    Uma linha por etapa, ex: "geracao: ocupada 95% (120.0s) | ociosa 4% | bloqueada 1% | 40 itens".
+    """
+    linhas = []
+    for nome, r in relatorio.items():
+        total = (r["ocupado"] + r["ocioso"] + r["bloqueado"]) or 1.0
+        linhas.append(
+            f"{nome}: ocupada {r['ocupado'] / total:.0%} ({r['ocupado']:.1f}s) | "
+            f"ociosa {r['ocioso'] / total:.0%} | bloqueada {r['bloqueado'] / total:.0%} | {int(r['itens'])} itens"
+        )
+    return linhas
@@ -1,23 +1,69 @@
 import re
-from typing import List, Tuple, Union, Any
-from utils.config import TEMPERATURE, PROMPT_TEMPLATE
-from modelo.carregador import llm, tokenizer
+from typing import Dict, List, Optional, Tuple, Union, Any
+from utils.config import (PROMPT_TEMPLATE, ORCAMENTO_FATOR, ORCAMENTO_MARGEM,
+                          ORCAMENTO_MAXIMO, ORCAMENTO_MINIMO)
+from modelo.carregador import BackendInferencia
+from processamento.cache_revisao import CacheRevisao
 
 
-def revisar_blocos_em_lote(blocos: List[str], nome_base: str = "", logger=None) -> Tuple[List[str], int, int, int, int, int, List[int]]:
+def montar_prompt(bloco: str) -> str:
+    """
+    Monta o prompt de revisão de um bloco a partir do `PROMPT_TEMPLATE`.
+    """
+    return PROMPT_TEMPLATE.format(bloco=bloco)
+
+
+def aceitar_revisao(texto_limpo: str, original: str) -> bool:
+    """
+    Decide se a resposta limpa é uma revisão válida do bloco original.
+
+    Rejeita respostas vazias ou que perderam mais da metade das palavras.
+    """
+    return bool(texto_limpo) and len(texto_limpo.split()) >= len(original.strip().split()) * 0.5
+
+
+def calcular_orcamento(tokens_entrada: int) -> int:
+    """
+    Limite de tokens gerados para um bloco, derivado do tamanho do próprio bloco.
+
+    A revisão tem quase o mesmo tamanho da entrada, então o orçamento é a
+    entrada vezes `ORCAMENTO_FATOR` mais uma margem fixa, limitado a `ORCAMENTO_MAXIMO`.
+    """
+    return max(ORCAMENTO_MINIMO, min(ORCAMENTO_MAXIMO, int(tokens_entrada * ORCAMENTO_FATOR) + ORCAMENTO_MARGEM))
+
+
+def revisar_blocos_em_lote(blocos: List[str], nome_base: str = "", logger=None,
+                           backend: Optional[BackendInferencia] = None,
+                           cache: Optional[CacheRevisao] = None,
+                           estatisticas: Optional[Dict[str, Any]] = None) -> Tuple[List[str], int, int, int, int, int, List[int]]:
     """
     Envia blocos para revisão por LLM com fallback apenas em caso de erro real.
 
+    Antes de gerar, consulta o cache de revisões: blocos já revisados com o
+    mesmo modelo, prompt e temperatura são reaproveitados sem ir para a GPU.
+
     O processo ocorre em duas etapas:
-    1. Primeira tentativa (1º try): todos os blocos são enviados normalmente.
+    1. Primeira tentativa (1º try): todos os blocos fora do cache são enviados normalmente.
     2. Segunda tentativa (2º try): apenas os blocos com erro real (resposta vazia ou exceção)
-       são reenviados com temperatura mais alta.
+       são reenviados com `TEMPERATURA_RETENTATIVA`. No agendador, eles entram numa fila
+       global e são misturados aos lotes dos próximos capítulos.
 
     A função classifica os blocos revisados por origem:
+    - Reaproveitado do cache.
     - Revisado com sucesso no 1º try.
     - Revisado com sucesso no 2º try.
     - Mantido como original (casos com falha nos dois tries).
 
+    É um atalho para o `AgendadorBlocos` com um único capítulo: os blocos são
+    agrupados em lotes por tamanho em tokens antes de gerar.
+
+    Args:
+        backend (BackendInferencia, opcional): Backend de geração. Se omitido, usa o do processo.
+        cache (CacheRevisao, opcional): Cache de revisões. Se omitido, usa o do processo
+            (quando `CACHE_REVISAO_ATIVO` estiver ligado).
+        estatisticas (dict, opcional): Se informado, recebe as estatísticas completas do capítulo
+            (`cache_hits`, `cache_misses`, `desperdicio_padding`, `tokens_por_segundo`...).
+
     Returns:
         Tuple contendo:
         - List[str]: blocos revisados finais na ordem original
@@ -30,98 +76,35 @@ def revisar_blocos_em_lote(blocos: List[str], nome_base: str = "", logger=None)
     if not blocos:
         return [], 0, 0, 0, 0, 0, []
 
-    revisados = [""] * len(blocos)
-    fallback_indices = []
-
-    revisados_1try = 0
-    revisados_2try = 0
-    mantidos_originais = 0
-
-    max_entrada = max((len(tokenizer(b).input_ids) for b in blocos if b.strip()), default=0)
-    fator = 1.2 if max_entrada > 200 else 1.0
-    max_tokens = max(min(768, int(max_entrada * fator)), 128)
-
-    prompts = [PROMPT_TEMPLATE.format(bloco=b) for b in blocos]
-    respostas = llm(prompts, max_new_tokens=max_tokens, temperature=TEMPERATURE)
+    # Import local: o agendador depende das funções auxiliares deste módulo
+    from processamento.agendador import AgendadorBlocos, TarefaCapitulo
 
-    if not isinstance(respostas, list):
-        raise ValueError("Modelo não retornou uma lista de respostas.")
+    agendador = AgendadorBlocos(backend=backend, cache=cache)
+    tarefa = TarefaCapitulo(chave=0, titulo="", blocos=list(blocos), nome_base=nome_base, logger=logger)
+    resultado = next(agendador.executar([tarefa]))
 
-    for i, (saida, original) in enumerate(zip(respostas, blocos)):
-        try:
-            if isinstance(saida, list) and saida:
-                saida = saida[0]
+    est = resultado.estatisticas
+    if estatisticas is not None:
+        estatisticas.update(est)
 
-            texto = saida.get("generated_text", "") if isinstance(saida, dict) else str(saida or "")
-            texto = limpar_resposta(texto, nome_base=nome_base, indice_bloco=i, logger=logger)
+    return resultado.revisados, est["erros"], est["tokens_saida"], est["rev1"], est["rev2"], est["orig"], est["recuperados"]
 
-            texto_limpo = texto.strip()
-
-            if texto_limpo and len(texto_limpo.split()) >= len(original.strip().split()) * 0.5:
-                revisados[i] = texto_limpo
-                revisados_1try += 1
-            else:
-                fallback_indices.append(i)
-
-
-        except Exception:
-            fallback_indices.append(i)
-
-    if fallback_indices:
-        blocos_erro = [blocos[i] for i in fallback_indices]
-        prompts_2 = [PROMPT_TEMPLATE.format(bloco=b) for b in blocos_erro]
-
-        respostas_2 = llm(prompts_2, max_new_tokens=max_tokens, temperature=0.5)
-
-        if not isinstance(respostas_2, list):
-            raise ValueError("2º try: modelo retornou tipo inesperado.")
-
-        for local_idx, saida in enumerate(respostas_2):
-            global_idx = fallback_indices[local_idx]
-            try:
-                if isinstance(saida, list) and saida:
-                    saida = saida[0]
-
-                texto = saida.get("generated_text", "") if isinstance(saida, dict) else str(saida or "")
-                texto = limpar_resposta(texto, nome_base=nome_base, indice_bloco=global_idx, logger=logger)
-                
-                texto_limpo = texto.strip()
-                original = blocos[global_idx]
-
-                if texto_limpo and len(texto_limpo.split()) >= len(original.strip().split()) * 0.5:
-                    revisados[global_idx] = texto_limpo
-                    revisados_2try += 1
-                else:
-                    revisados[global_idx] = original.strip()
-                    mantidos_originais += 1
-
-
-            except Exception:
-                revisados[global_idx] = blocos[global_idx]
-                mantidos_originais += 1
-
-    tokens_saida = sum(len(tokenizer(t).input_ids) for t in revisados if t.strip())
-    erros_fallback = mantidos_originais
-
-    # Verificação de integridade: garante que nenhum bloco ficou em branco
-    blocos_recuperados_finalmente = []
-    for idx, r in enumerate(revisados):
-        if not r.strip():
-            revisados[idx] = blocos[idx]
-            blocos_recuperados_finalmente.append(idx)
-
-
-
-    return revisados, erros_fallback, tokens_saida, revisados_1try, revisados_2try, mantidos_originais, blocos_recuperados_finalmente
-
-def limpar_resposta(texto: str, nome_base: str = "", indice_bloco: int = -1, logger=None) -> str:
+def limpar_resposta(texto: str, nome_base: str = "", indice_bloco: int = -1, logger=None,
+                    texto_completo: bool = True) -> str:
     """
     Limpa e sanitiza a resposta gerada pela LLM, mantendo apenas conteúdo válido.
     Remove artefatos técnicos, tags e mensagens automáticas finais.
     Garante espaçamento simples, sem linhas em branco extras.
+
+    Args:
+        texto_completo (bool): True se `texto` ecoa o prompt (exige o marcador do assistente);
+            False se já é só a resposta gerada.
     """
-    # 1. Garante presença do marcador
-    if "<|im_start|>assistant" not in texto:
+    # 1. Garante presença do marcador (só faz sentido quando o prompt vem junto)
+    if texto_completo and "<|im_start|>assistant" not in texto:
+        return ""  # força fallback
+    # Só a continuação: vazia é o mesmo caso do marcador ausente (não é limpeza perigosa)
+    if not texto_completo and not texto.strip():
         return ""  # força fallback
 
     texto = texto.rsplit("<|im_start|>assistant", 1)[-1]
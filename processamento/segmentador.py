@@ -1,4 +1,22 @@
 import re
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence
+
+from utils.config import SEGMENTACAO_ALVO_TOKENS, SEGMENTACAO_MAX_TOKENS, SEGMENTACAO_MODO
+
+# Fim de frase, inclusive dentro de fala: "...", "Hmph!", “What?”, 'Go.')
+_FIM_FRASE = re.compile(r"[.!?…][\"'”’)\]]*$")
+_PALAVRA_OU_PONTUACAO = re.compile(r"\w+|[^\w\s]")
+# Tokenizadores BPE quebram palavras longas/raras: ~1.3 token por palavra em inglês
+_TOKENS_POR_PALAVRA = 1.3
+
+
+def estimar_tokens(texto: str) -> int:
+    """
+    Estimativa barata de tokens (sem tokenizador): palavras e pontuação com um fator de ajuste.
+    """
+    return max(1, round(len(_PALAVRA_OU_PONTUACAO.findall(texto)) * _TOKENS_POR_PALAVRA))
+
 
 def segmentar_em_blocos(texto: str, max_linhas: int = 7) -> list:
     """
@@ -45,3 +63,105 @@ def segmentar_em_blocos(texto: str, max_linhas: int = 7) -> list:
         blocos.append("\n".join(buffer))
 
     return blocos
+
+
+def segmentar_por_orcamento(texto: str, alvo: int = SEGMENTACAO_ALVO_TOKENS, maximo: int = SEGMENTACAO_MAX_TOKENS,
+                            contador: Optional[Callable[[str], int]] = None) -> List[str]:
+    """
+    Divide o texto em blocos de tamanho parecido em tokens, em vez de em número de linhas.
+
+    As linhas são acumuladas até o bloco chegar a `alvo` tokens, e o bloco só é
+    fechado numa linha que termina frase ou fala. Se a próxima linha passaria de
+    `maximo`, o bloco é cortado antes, no último fim de frase que houver nele.
+    Uma linha sozinha maior que `maximo` vira um bloco próprio (linhas nunca são partidas).
+    Linhas em branco fecham o bloco se ele já tem pelo menos metade do alvo.
+
+    Args:
+        texto (str): Texto completo a ser segmentado.
+        alvo (int): Tamanho desejado de cada bloco, em tokens.
+        maximo (int): Limite rígido do bloco, em tokens.
+        contador (Callable, opcional): Conta os tokens de uma linha (ex: tokenizador
+            rápido do backend). Padrão: `estimar_tokens`.
+
+    Returns:
+        List[str]: Blocos de texto prontos para revisão.
+    """
+    contar = contador or estimar_tokens
+    blocos: List[str] = []
+    buffer: List[str] = []
+    tamanhos: List[int] = []
+    fim_frase = -1  # índice da última linha do buffer que termina frase
+
+    def fechar(ate: int) -> None:
+        nonlocal buffer, tamanhos, fim_frase
+        blocos.append("\n".join(buffer[:ate]))
+        buffer, tamanhos = buffer[ate:], tamanhos[ate:]
+        fim_frase = max((i for i, linha in enumerate(buffer) if _FIM_FRASE.search(linha)), default=-1)
+
+    for linha in texto.strip().splitlines():
+        linha = linha.strip()
+        if not linha:
+            if buffer and sum(tamanhos) >= alvo // 2:
+                fechar(len(buffer))
+            continue
+
+        n = contar(linha)
+        if buffer and sum(tamanhos) + n > maximo:
+            # Corta no último fim de frase; sem nenhum, corta onde está
+            fechar(fim_frase + 1 if fim_frase >= 0 else len(buffer))
+            if buffer and sum(tamanhos) + n > maximo:
+                fechar(len(buffer))
+
+        buffer.append(linha)
+        tamanhos.append(n)
+        if _FIM_FRASE.search(linha):
+            fim_frase = len(buffer) - 1
+            if sum(tamanhos) >= alvo:
+                fechar(len(buffer))
+
+    if buffer:
+        fechar(len(buffer))
+    return blocos
+
+
+def segmentar_capitulo(texto: str, modo: str = SEGMENTACAO_MODO,
+                       contador: Optional[Callable[[str], int]] = None) -> List[str]:
+    """
+    Segmenta um capítulo conforme o modo configurado (`SEGMENTACAO_MODO`):
+    "linhas" (até 7 linhas por bloco) ou "orcamento" (blocos de ~`SEGMENTACAO_ALVO_TOKENS` tokens).
+    """
+    if modo == "orcamento":
+        return segmentar_por_orcamento(texto, contador=contador)
+    if modo == "linhas":
+        return segmentar_em_blocos(texto, max_linhas=7)
+    raise ValueError(f"Modo de segmentação desconhecido: {modo!r} (use 'linhas' ou 'orcamento')")
+
+
+FAIXAS_HISTOGRAMA = (32, 64, 128, 192, 256, 384, 512)
+
+
+def histograma_blocos(tamanhos: Sequence[int], faixas: Sequence[int] = FAIXAS_HISTOGRAMA) -> Dict[str, int]:
+    """
+    Conta os blocos por faixa de tamanho em tokens, ex: {"≤32": 10, "33-64": 41, ..., ">512": 0}.
+    """
+    contagem = Counter()
+    for n in tamanhos:
+        anterior = 0
+        for limite in faixas:
+            if n <= limite:
+                contagem[f"≤{limite}" if anterior == 0 else f"{anterior + 1}-{limite}"] += 1
+                break
+            anterior = limite
+        else:
+            contagem[f">{faixas[-1]}"] += 1
+
+    rotulos = [f"≤{faixas[0]}"] + [f"{a + 1}-{b}" for a, b in zip(faixas, faixas[1:])] + [f">{faixas[-1]}"]
+    return {rotulo: contagem[rotulo] for rotulo in rotulos}
+
+
+def formatar_histograma(histograma: Dict[str, int], largura: int = 40) -> List[str]:
+    """
+    Uma linha por faixa, com barra proporcional: "33-64    |████████        | 41".
+    """
+    maior = max(histograma.values(), default=0) or 1
+    return [f"{rotulo:>8} |{'█' * round(largura * n / maior):<{largura}}| {n}" for rotulo, n in histograma.items()]
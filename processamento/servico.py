@@ -0,0 +1,320 @@
+import argparse
+import asyncio
+import json
+import math
+import socket
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from processamento.agendador import AgendadorBlocos, TarefaCapitulo
+from processamento.segmentador import segmentar_capitulo
+from utils.config import SERVICO_ESPERA_MAXIMA, SERVICO_HOST, SERVICO_PORTA
+
+
+def percentil(valores: Sequence[float], p: float) -> float:
+    """
+    Percentil por posição mais próxima (p entre 0 e 100). Lista vazia devolve 0.
+    """
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = max(0, min(len(ordenados), math.ceil(p / 100 * len(ordenados))) - 1)
+    return ordenados[posicao]
+
+
+@dataclass
+class _Pedido:
+    id: Any
+    total: int
+    saida: asyncio.Queue = field(default_factory=asyncio.Queue)
+
+
+@dataclass
+class _BlocoPendente:
+    pedido: _Pedido
+    indice: int
+    texto: str
+    chegada: float
+
+
+class ServicoRevisao:
+    """
+    Serviço local de revisão: um único modelo carregado atende vários clientes.
+
+    Blocos de requisições concorrentes entram numa fila comum; o laço de lotes
+    espera no máximo `espera_maxima` segundos após o primeiro bloco para juntar
+    até `tamanho_lote` blocos, e gera tudo junto (1º/2º try, cache e limpeza do
+    `AgendadorBlocos`). Enquanto um lote gera numa thread, novas requisições
+    continuam chegando e formam o lote seguinte. Cada bloco é devolvido assim
+    que o seu lote termina.
+
+    Args:
+        agendador (AgendadorBlocos, opcional): Agendador (e backend) usado. Se omitido, cria um novo.
+        espera_maxima (float): Segundos que um lote espera por mais blocos depois do primeiro.
+        tamanho_lote (int, opcional): Máximo de blocos por lote. Padrão: o do agendador.
+    """
+
+    def __init__(self, agendador: Optional[AgendadorBlocos] = None,
+                 espera_maxima: float = SERVICO_ESPERA_MAXIMA, tamanho_lote: Optional[int] = None):
+        self.agendador = agendador or AgendadorBlocos()
+        self.espera_maxima = espera_maxima
+        self.tamanho_lote = tamanho_lote or self.agendador.tamanho_lote
+
+        self._fila: Optional[asyncio.Queue] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="geracao")
+        self._tarefa_lotes: Optional[asyncio.Task] = None
+        self._latencias = deque(maxlen=1000)  # segundos, por bloco (chegada → resposta)
+        self._em_geracao = 0
+        self.requisicoes = 0
+        self.blocos_atendidos = 0
+
+    # ----------------------------
+    # API
+    # ----------------------------
+
+    async def iniciar(self) -> None:
+        """Inicia o laço de lotes no event loop atual."""
+        if self._tarefa_lotes is None:
+            self._fila = asyncio.Queue()
+            self._tarefa_lotes = asyncio.create_task(self._laco_lotes())
+
+    async def parar(self) -> None:
+        if self._tarefa_lotes is not None:
+            self._tarefa_lotes.cancel()
+            try:
+                await self._tarefa_lotes
+            except asyncio.CancelledError:
+                pass
+            self._tarefa_lotes = None
+        self._executor.shutdown(wait=True)
+
+    async def revisar(self, blocos: List[str], id_pedido: Any = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Enfileira os blocos e devolve um evento por bloco revisado (na ordem em que ficam prontos).
+
+        Cada evento: `{"id", "indice", "texto", "origem"}`, com origem
+        "cache", "triagem", "duplicado", "rev1", "rev2" ou "original".
+        """
+        await self.iniciar()
+        self.requisicoes += 1
+        pedido = _Pedido(id=id_pedido, total=len(blocos))
+        agora = time.perf_counter()
+        for indice, texto in enumerate(blocos):
+            self._fila.put_nowait(_BlocoPendente(pedido, indice, texto, agora))
+
+        for _ in range(pedido.total):
+            evento = await pedido.saida.get()
+            if "erro" in evento:
+                raise RuntimeError(evento["erro"])
+            yield evento
+
+    def estado(self) -> Dict[str, Any]:
+        """
+        Profundidade da fila, blocos em geração e percentis de latência (ms) por bloco.
+        """
+        latencias = list(self._latencias)
+        return {
+            "fila": self._fila.qsize() if self._fila is not None else 0,
+            "em_geracao": self._em_geracao,
+            "requisicoes": self.requisicoes,
+            "blocos_atendidos": self.blocos_atendidos,
+            "lotes": self.agendador.metricas["lotes"],
+            "latencia_ms": {f"p{p}": round(percentil(latencias, p) * 1000, 1) for p in (50, 90, 99)},
+        }
+
+    # ----------------------------
+    # Lotes
+    # ----------------------------
+
+    async def _coletar_lote(self) -> List[_BlocoPendente]:
+        lote = [await self._fila.get()]
+        limite = time.perf_counter() + self.espera_maxima
+        while len(lote) < self.tamanho_lote:
+            try:
+                lote.append(self._fila.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(self._fila.get(), restante))
+            except asyncio.TimeoutError:
+                break
+        return lote
+
+    async def _laco_lotes(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = await self._coletar_lote()
+            self._em_geracao = len(lote)
+            try:
+                revisados = await loop.run_in_executor(self._executor, self._processar, [b.texto for b in lote])
+            except Exception as erro:
+                for bloco in lote:
+                    bloco.pedido.saida.put_nowait({"id": bloco.pedido.id, "indice": bloco.indice, "erro": repr(erro)})
+                continue
+            finally:
+                self._em_geracao = 0
+
+            agora = time.perf_counter()
+            for bloco, (texto, origem) in zip(lote, revisados):
+                self._latencias.append(agora - bloco.chegada)
+                self.blocos_atendidos += 1
+                bloco.pedido.saida.put_nowait({"id": bloco.pedido.id, "indice": bloco.indice,
+                                               "texto": texto, "origem": origem})
+
+    def _processar(self, textos: List[str]) -> List[Tuple[str, str]]:
+        # Roda na thread de geração: cada bloco vira um "capítulo" de uma janela só
+        ag = self.agendador
+        # As retentativas saem neste mesmo pedido: o cliente espera o bloco agora
+        janela = ag.preparar_janela([TarefaCapitulo(chave=i, titulo="", blocos=[t]) for i, t in enumerate(textos)])
+        try:
+            ag.revisar_itens(janela.pendentes)
+            ag.revisar_itens(ag.retirar_retentativas())
+        except Exception:
+            # O lote volta como erro: nada dele pode ficar à espera no agendador, nem
+            # retentativas nem representantes de cópias de pedidos futuros
+            ag.descartar_itens(janela.pendentes + ag.retirar_retentativas())
+            raise
+
+        revisados = []
+        for resultado in ag.finalizar_janela(janela):
+            e = resultado.estatisticas
+            origem = ("cache" if e["cache_hits"] else "triagem" if e["triagem_dispensados"] else
+                      "duplicado" if e["duplicados"] else
+                      "rev1" if e["rev1"] else "rev2" if e["rev2"] else "original")
+            revisados.append((resultado.revisados[0], origem))
+        return revisados
+
+    # ----------------------------
+    # Protocolo (JSON por linha sobre TCP)
+    # ----------------------------
+
+    async def atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Atende uma conexão. Cada linha é um pedido JSON:
+
+        - `{"id": 1, "blocos": ["...", "..."]}`: revisa blocos já segmentados;
+        - `{"id": 2, "capitulo": "texto"}`: segmenta o capítulo e revisa os blocos;
+        - `{"status": true}`: devolve `estado()`.
+
+        Para cada bloco sai uma linha `{"id", "indice", "texto", "origem"}` e, ao final
+        do pedido, `{"id", "fim": true, "blocos": n}`. Pedidos da mesma conexão correm em paralelo.
+        """
+        tarefas = set()
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+                try:
+                    pedido = json.loads(linha)
+                except json.JSONDecodeError as erro:
+                    self._responder(writer, {"erro": f"JSON inválido: {erro}"})
+                    continue
+                if pedido.get("status"):
+                    self._responder(writer, self.estado())
+                    continue
+                tarefa = asyncio.create_task(self._atender_pedido(pedido, writer))
+                tarefas.add(tarefa)
+                tarefa.add_done_callback(tarefas.discard)
+            if tarefas:
+                await asyncio.gather(*tarefas)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _atender_pedido(self, pedido: dict, writer: asyncio.StreamWriter) -> None:
+        id_pedido = pedido.get("id")
+        if "capitulo" in pedido:
+            blocos = segmentar_capitulo(pedido["capitulo"])
+        else:
+            blocos = pedido.get("blocos")
+        if not isinstance(blocos, list) or not all(isinstance(b, str) for b in blocos):
+            self._responder(writer, {"id": id_pedido, "erro": "informe 'blocos' (lista de textos) ou 'capitulo'"})
+            return
+        try:
+            async for evento in self.revisar(blocos, id_pedido):
+                self._responder(writer, evento)
+                await writer.drain()
+        except Exception as erro:
+            self._responder(writer, {"id": id_pedido, "erro": repr(erro)})
+            return
+        self._responder(writer, {"id": id_pedido, "fim": True, "blocos": len(blocos)})
+
+    @staticmethod
+    def _responder(writer: asyncio.StreamWriter, mensagem: dict) -> None:
+        writer.write((json.dumps(mensagem, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+async def servir(host: str = SERVICO_HOST, porta: int = SERVICO_PORTA,
+                 servico: Optional[ServicoRevisao] = None) -> None:
+    """
+    Sobe o serviço em `host:porta` e atende até ser interrompido.
+    """
+    servico = servico or ServicoRevisao()
+    await servico.iniciar()
+    servidor = await asyncio.start_server(servico.atender, host, porta)
+    print(f"[🛰️] Serviço de revisão em {host}:{porta} (lote {servico.tamanho_lote}, espera {servico.espera_maxima * 1000:.0f} ms)")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        await servico.parar()
+
+
+# ----------------------------
+# Cliente (síncrono, para as outras ferramentas)
+# ----------------------------
+
+
+def _conversar(pedido: dict, host: str, porta: int, fim) -> List[dict]:
+    respostas = []
+    with socket.create_connection((host, porta)) as conexao:
+        conexao.sendall((json.dumps(pedido, ensure_ascii=False) + "\n").encode("utf-8"))
+        with conexao.makefile("r", encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                resposta = json.loads(linha)
+                if "erro" in resposta:
+                    raise RuntimeError(resposta["erro"])
+                respostas.append(resposta)
+                if fim(resposta):
+                    break
+    return respostas
+
+
+def revisar_remoto(blocos: List[str], host: str = SERVICO_HOST, porta: int = SERVICO_PORTA) -> List[str]:
+    """
+    Revisa blocos pelo serviço local e devolve os textos na ordem original.
+    """
+    respostas = _conversar({"id": 0, "blocos": blocos}, host, porta, fim=lambda r: r.get("fim"))
+    revisados = [""] * len(blocos)
+    for resposta in respostas:
+        if "indice" in resposta:
+            revisados[resposta["indice"]] = resposta["texto"]
+    return revisados
+
+
+def status_remoto(host: str = SERVICO_HOST, porta: int = SERVICO_PORTA) -> Dict[str, Any]:
+    """
+    Consulta fila, blocos em geração e latências do serviço local.
+    """
+    return _conversar({"status": True}, host, porta, fim=lambda r: True)[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço local de revisão (JSON por linha sobre TCP).")
+    parser.add_argument("--host", default=SERVICO_HOST)
+    parser.add_argument("--porta", type=int, default=SERVICO_PORTA)
+    parser.add_argument("--espera-ms", type=float, default=SERVICO_ESPERA_MAXIMA * 1000,
+                        help="quanto um lote espera por mais blocos depois do primeiro")
+    args = parser.parse_args()
+    try:
+        asyncio.run(servir(args.host, args.porta, ServicoRevisao(espera_maxima=args.espera_ms / 1000)))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,387 @@
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from processamento.agendador import ResultadoCapitulo, TarefaCapitulo
+from utils.config import BACKEND, CAPITULOS_POR_JANELA, MODEL_NAME, TRABALHADORES, TRABALHADORES_DISPOSITIVOS
+
+# Quantas vezes um capítulo pode estar num trabalhador que caiu antes de a revisão desistir
+MAX_QUEDAS_CAPITULO = 2
+
+
+def planejar_dispositivos(trabalhadores: int, dispositivos: Optional[List[str]] = None,
+                          tipo_backend: str = BACKEND) -> List[Tuple[str, Optional[List[int]]]]:
+    """
+    Escolhe (dispositivo, núcleos da CPU) de cada trabalhador.
+
+    Com `dispositivos`, distribui em rodízio. Sem, usa uma GPU por trabalhador
+    quando há CUDA (backend "hf"); caso contrário, divide os núcleos
+    disponíveis em grupos contíguos, um por trabalhador.
+    """
+    if not dispositivos and tipo_backend == "hf":
+        import torch
+        dispositivos = [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+    if dispositivos:
+        return [(dispositivos[k % len(dispositivos)], None) for k in range(trabalhadores)]
+
+    try:
+        nucleos = sorted(os.sched_getaffinity(0))
+    except AttributeError:  # sched_getaffinity não existe no Windows/macOS
+        nucleos = list(range(os.cpu_count() or 1))
+    por_trabalhador = max(1, len(nucleos) // trabalhadores)
+    planos = []
+    for k in range(trabalhadores):
+        grupo = nucleos[k * por_trabalhador:(k + 1) * por_trabalhador] or nucleos
+        planos.append(("cpu", grupo))
+    return planos
+
+
+class _LoggerRemoto:
+    """
+    Substitui o LoggerProcesso dentro do trabalhador: guarda as chamadas para o
+    processo principal repetir no log de verdade.
+    """
+
+    def __init__(self):
+        self.eventos: List[Tuple[str, tuple]] = []
+
+    def log_limpeza_perigosa(self, *args) -> None:
+        self.eventos.append(("log_limpeza_perigosa", args))
+
+    def log_auditoria_triagem(self, *args) -> None:
+        self.eventos.append(("log_auditoria_triagem", args))
+
+    def log_ajuste_lote(self, *args) -> None:
+        self.eventos.append(("log_ajuste_lote", args))
+
+
+def _trabalhador(id_trabalhador: int, tipo_backend: str, opcoes_backend: Dict[str, Any],
+                 opcoes_agendador: Dict[str, Any], dispositivo: str, nucleos: Optional[List[int]],
+                 entrada, saida) -> None:
+    """
+    Processo trabalhador: carrega o próprio backend e revisa as janelas de capítulos que chegam em `entrada`.
+    """
+    try:
+        opcoes = dict(opcoes_backend)
+        if dispositivo.startswith("cuda"):
+            # Cada processo enxerga só a sua GPU (antes de o torch inicializar o CUDA)
+            os.environ["CUDA_VISIBLE_DEVICES"] = dispositivo.partition(":")[2] or "0"
+        if nucleos:
+            try:
+                os.sched_setaffinity(0, nucleos)
+            except (AttributeError, OSError):
+                pass
+        if tipo_backend == "hf":
+            opcoes.setdefault("dispositivo", "cuda" if dispositivo.startswith("cuda") else "cpu")
+            if nucleos:
+                opcoes.setdefault("threads", len(nucleos))
+
+        from modelo.carregador import criar_backend
+        from processamento.agendador import AgendadorBlocos
+
+        agendador = AgendadorBlocos(backend=criar_backend(tipo_backend, **opcoes), **opcoes_agendador)
+        janela_capitulos = agendador.janela_capitulos
+
+        fim = False
+        while not fim:
+            capitulo = entrada.get()
+            if capitulo is None:
+                break
+            # Junta o que já estiver na fila numa janela: blocos de vários capítulos dividem os lotes
+            capitulos = [capitulo]
+            while len(capitulos) < janela_capitulos:
+                try:
+                    capitulo = entrada.get_nowait()
+                except queue.Empty:
+                    break
+                if capitulo is None:
+                    fim = True
+                    break
+                capitulos.append(capitulo)
+
+            # A chave leva a execução do pool: a janela pode juntar capítulos de uma execução interrompida
+            tarefas = [TarefaCapitulo(chave=(execucao, posicao), titulo=titulo, blocos=blocos, nome_base=nome_base,
+                                      logger=_LoggerRemoto())
+                       for execucao, posicao, titulo, blocos, nome_base in capitulos]
+            loggers = {tarefa.chave: tarefa.logger for tarefa in tarefas}
+            for resultado in agendador.executar(tarefas):
+                # As métricas (acumuladas) vão junto de cada resultado: chegam antes do fim da execução
+                execucao, posicao = resultado.chave
+                saida.put(("resultado", id_trabalhador, execucao, posicao, resultado.revisados,
+                           resultado.estatisticas, loggers[resultado.chave].eventos, dict(agendador.metricas)))
+    except BaseException:
+        saida.put(("erro", id_trabalhador, traceback.format_exc()))
+        raise
+
+
+@dataclass
+class _Trabalhador:
+    id: int
+    dispositivo: str
+    nucleos: Optional[List[int]]
+    processo: Any
+    entrada: Any
+    pendentes: Set[int] = field(default_factory=set)
+
+
+class PoolTrabalhadores:
+    """
+    Revisão com vários processos: os capítulos são distribuídos entre
+    `trabalhadores` processos, cada um com o próprio backend fixado num
+    dispositivo (GPU) ou num grupo de núcleos da CPU, e com o próprio
+    `AgendadorBlocos`.
+
+    Tem a mesma interface de `AgendadorBlocos.executar`: recebe tarefas e
+    devolve os resultados na ordem de entrada, então o resto da revisão
+    (escrita, checkpoint, log) não muda. Cada trabalhador recebe alguns
+    capítulos por vez e ganha mais conforme devolve — quem anda mais rápido
+    revisa mais. Se um trabalhador cai, seus capítulos voltam para a fila e
+    um substituto é iniciado no mesmo dispositivo.
+
+    Os processos são iniciados na primeira execução e reaproveitados nas
+    seguintes (o modelo é carregado uma vez por trabalhador); chame `fechar()` no fim.
+
+    Args:
+        trabalhadores (int): Quantidade de processos.
+        dispositivos (List[str], opcional): Ver `planejar_dispositivos`.
+        tipo_backend (str): "hf" ou "fake".
+        opcoes_backend (dict, opcional): Repassadas a `criar_backend` em cada trabalhador.
+        janela_capitulos (int): Capítulos por janela do agendador de cada trabalhador.
+        opcoes_agendador (dict, opcional): Repassadas ao `AgendadorBlocos` de cada
+            trabalhador (ex.: `usar_cache=False`).
+    """
+
+    def __init__(self, trabalhadores: int = TRABALHADORES, dispositivos: Optional[List[str]] = TRABALHADORES_DISPOSITIVOS,
+                 tipo_backend: str = BACKEND, opcoes_backend: Optional[Dict[str, Any]] = None,
+                 janela_capitulos: int = CAPITULOS_POR_JANELA, opcoes_agendador: Optional[Dict[str, Any]] = None):
+        self.tipo_backend = tipo_backend
+        self.opcoes_backend = opcoes_backend or {}
+        self.janela_capitulos = max(1, janela_capitulos)
+        self.opcoes_agendador = dict(opcoes_agendador or {}, janela_capitulos=self.janela_capitulos)
+        self.planos = planejar_dispositivos(max(1, trabalhadores), dispositivos, tipo_backend)
+
+        self._contexto = multiprocessing.get_context("spawn")  # seguro com CUDA e threads
+        self._saida = None
+        self._trabalhadores: Dict[int, _Trabalhador] = {}
+        self._proximo_id = 0
+        self._execucao = 0  # identifica os capítulos (e resultados) de cada chamada de `executar`
+        self._metricas: Dict[int, Dict[str, float]] = {}
+        self._tempo_execucao = 0.0
+        self.quedas = 0
+
+    # ----------------------------
+    # Processos
+    # ----------------------------
+
+    def _iniciar(self, dispositivo: str, nucleos: Optional[List[int]]) -> _Trabalhador:
+        id_trabalhador = self._proximo_id
+        self._proximo_id += 1
+        entrada = self._contexto.Queue()
+        processo = self._contexto.Process(
+            target=_trabalhador, name=f"revisor-{id_trabalhador}", daemon=True,
+            args=(id_trabalhador, self.tipo_backend, self.opcoes_backend, self.opcoes_agendador,
+                  dispositivo, nucleos, entrada, self._saida),
+        )
+        processo.start()
+        trabalhador = _Trabalhador(id_trabalhador, dispositivo, nucleos, processo, entrada)
+        self._trabalhadores[id_trabalhador] = trabalhador
+        return trabalhador
+
+    def _garantir_iniciados(self) -> None:
+        if self._saida is None:
+            self._saida = self._contexto.Queue()
+        if not self._trabalhadores:
+            for dispositivo, nucleos in self.planos:
+                self._iniciar(dispositivo, nucleos)
+            print(f"[🧩] {len(self.planos)} trabalhadores: " + ", ".join(
+                d if n is None else f"{d} ({len(n)} núcleos)" for d, n in self.planos))
+
+    def fechar(self) -> None:
+        """
+        Encerra os processos trabalhadores.
+        """
+        for trabalhador in self._trabalhadores.values():
+            try:
+                trabalhador.entrada.put(None)
+            except (OSError, ValueError):
+                pass
+        for trabalhador in self._trabalhadores.values():
+            trabalhador.processo.join(timeout=10)
+            if trabalhador.processo.is_alive():
+                trabalhador.processo.terminate()
+        self._trabalhadores = {}
+
+    def __enter__(self) -> "PoolTrabalhadores":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+    # ----------------------------
+    # Métricas (mesma interface do AgendadorBlocos)
+    # ----------------------------
+
+    @property
+    def metricas(self) -> Dict[str, float]:
+        """Soma das métricas dos agendadores de todos os trabalhadores (inclusive os que caíram)."""
+        total: Counter = Counter()
+        for metricas in self._metricas.values():
+            total.update(metricas)
+        return dict(total)
+
+    def desperdicio_padding(self) -> float:
+        """Fração dos tokens dos lotes gastos com padding, somando todos os trabalhadores."""
+        m = self.metricas
+        return m.get("tokens_padding", 0) / m["tokens_lote"] if m.get("tokens_lote") else 0.0
+
+    def tokens_por_segundo(self) -> float:
+        """Vazão agregada: tokens gerados por todos os trabalhadores por segundo de relógio."""
+        return self.metricas.get("tokens_gerados", 0) / self._tempo_execucao if self._tempo_execucao else 0.0
+
+    def perfil(self) -> Dict[str, Any]:
+        """Backend, modelo e dispositivos da execução (para o histórico usado no planejamento)."""
+        modelo = self.opcoes_backend.get("model_id", MODEL_NAME) if self.tipo_backend == "hf" else self.tipo_backend
+        return {"backend": self.tipo_backend, "modelo": modelo,
+                "dispositivo": ",".join(sorted({d for d, _ in self.planos})), "trabalhadores": len(self.planos)}
+
+    # ----------------------------
+    # Execução
+    # ----------------------------
+
+    def executar(self, tarefas: Iterable[TarefaCapitulo]) -> Iterator[ResultadoCapitulo]:
+        """
+        Distribui as tarefas entre os trabalhadores e devolve um `ResultadoCapitulo` por tarefa, na mesma ordem.
+        """
+        self._garantir_iniciados()
+        inicio = time.perf_counter()
+        # As posições recomeçam do 0 a cada execução: o id separa os resultados
+        # atrasados de uma execução interrompida dos capítulos desta
+        self._execucao += 1
+        execucao = self._execucao
+        concluida = False
+
+        iterador = iter(tarefas)
+        esgotado = False
+        por_posicao: Dict[int, TarefaCapitulo] = {}   # tarefas ainda não devolvidas
+        prontos: Dict[int, ResultadoCapitulo] = {}
+        reatribuir: Deque[int] = deque()
+        quedas = Counter()
+        proxima = 0   # próxima posição a devolver
+        total = 0     # posições já lidas de `tarefas`
+        verificado = time.perf_counter()
+
+        # Cada trabalhador fica com até duas janelas: revisa uma enquanto a outra espera.
+        # `adiantados` limita quantos capítulos prontos esperam um capítulo lento.
+        em_voo = 2 * self.janela_capitulos
+        adiantados = em_voo * len(self._trabalhadores) * 2
+
+        try:
+            while True:
+                # 1. Distribui: primeiro capítulos de trabalhadores que caíram, depois novos
+                for trabalhador in list(self._trabalhadores.values()):
+                    while len(trabalhador.pendentes) < em_voo:
+                        if reatribuir:
+                            posicao = reatribuir.popleft()
+                        elif not esgotado and total - proxima < adiantados:
+                            tarefa = next(iterador, None)
+                            if tarefa is None:
+                                esgotado = True
+                                break
+                            posicao = total
+                            por_posicao[posicao] = tarefa
+                            total += 1
+                        else:
+                            break
+                        tarefa = por_posicao[posicao]
+                        trabalhador.pendentes.add(posicao)
+                        trabalhador.entrada.put((execucao, posicao, tarefa.titulo, tarefa.blocos, tarefa.nome_base))
+
+                # 2. Devolve em ordem
+                while proxima in prontos:
+                    por_posicao.pop(proxima, None)
+                    yield prontos.pop(proxima)
+                    proxima += 1
+                if esgotado and proxima == total:
+                    concluida = True
+                    return
+
+                # 3. Recebe (e, a cada meio segundo, procura trabalhadores que caíram)
+                if time.perf_counter() - verificado > 0.5:
+                    self._verificar_quedas(por_posicao, reatribuir, quedas)
+                    verificado = time.perf_counter()
+                try:
+                    mensagem = self._saida.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+
+                tipo, id_trabalhador = mensagem[0], mensagem[1]
+                trabalhador = self._trabalhadores.get(id_trabalhador)
+                if tipo == "resultado":
+                    _, _, execucao_resultado, posicao, revisados, estatisticas, eventos, metricas = mensagem
+                    self._metricas[id_trabalhador] = metricas
+                    if execucao_resultado != execucao:
+                        continue  # sobra de uma execução interrompida
+                    if trabalhador is not None:
+                        trabalhador.pendentes.discard(posicao)
+                    # Um capítulo reatribuído pode voltar duas vezes: vale o primeiro
+                    if posicao < proxima or posicao in prontos or posicao not in por_posicao:
+                        continue
+                    if posicao in reatribuir:
+                        reatribuir.remove(posicao)
+                    tarefa = por_posicao[posicao]
+                    if tarefa.logger is not None:
+                        for metodo, args in eventos:
+                            getattr(tarefa.logger, metodo)(*args)
+                    prontos[posicao] = ResultadoCapitulo(chave=tarefa.chave, titulo=tarefa.titulo,
+                                                         blocos=tarefa.blocos, revisados=revisados,
+                                                         estatisticas=estatisticas)
+                elif tipo == "erro":
+                    print(f"[⚠️] Trabalhador {id_trabalhador} falhou:\n{mensagem[2]}")
+        finally:
+            self._tempo_execucao += time.perf_counter() - inicio
+            if not concluida:
+                self._abandonar_pendentes()
+
+    def _abandonar_pendentes(self) -> None:
+        """
+        Execução interrompida (queda repetida, erro ou quem consome parou de ler):
+        esvazia as filas de entrada e zera os capítulos em voo de cada trabalhador.
+
+        O que um trabalhador já tirou da fila continua sendo revisado; esses
+        resultados chegam com o id da execução antiga e são descartados.
+        """
+        for trabalhador in self._trabalhadores.values():
+            trabalhador.pendentes.clear()
+            while True:
+                try:
+                    trabalhador.entrada.get_nowait()
+                except (queue.Empty, OSError, ValueError):
+                    break
+
+    def _verificar_quedas(self, por_posicao: Dict[int, TarefaCapitulo], reatribuir: Deque[int],
+                          quedas: Counter) -> None:
+        """
+        Substitui trabalhadores que morreram e devolve seus capítulos à fila (na ordem).
+        """
+        for trabalhador in list(self._trabalhadores.values()):
+            if trabalhador.processo.is_alive():
+                continue
+            del self._trabalhadores[trabalhador.id]
+            self.quedas += 1
+            perdidos = sorted(p for p in trabalhador.pendentes if p in por_posicao and p not in reatribuir)
+            print(f"[💥] Trabalhador {trabalhador.id} ({trabalhador.dispositivo}) caiu "
+                  f"(código {trabalhador.processo.exitcode}); {len(perdidos)} capítulos reatribuídos")
+            for posicao in perdidos:
+                quedas[posicao] += 1
+                if quedas[posicao] >= MAX_QUEDAS_CAPITULO:
+                    raise RuntimeError(f"O capítulo {por_posicao[posicao].titulo!r} derrubou "
+                                       f"{quedas[posicao]} trabalhadores; revisão interrompida")
+            fila = sorted(set(reatribuir) | set(perdidos))
+            reatribuir.clear()
+            reatribuir.extend(fila)
+            self._iniciar(trabalhador.dispositivo, trabalhador.nucleos)
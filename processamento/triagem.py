@@ -0,0 +1,77 @@
+import re
+import zlib
+from typing import Callable, Optional
+
+from utils.config import TRIAGEM_AUDITORIA, TRIAGEM_LIMIAR, TRIAGEM_MAX_PALAVRAS
+
+# Linha só de símbolos: separadores como "***", "---", "~~~"
+_PADRAO_SEPARADOR = re.compile(r"^[^\w\s]+$")
+_PADRAO_ESPACO_DUPLO = re.compile(r"\S {2,}\S|\t")
+_PADRAO_ESPACO_PONTUACAO = re.compile(r"\s[,.!?;:](?!\w)")
+_PADRAO_I_MINUSCULO = re.compile(r"(?<![\w'])i(?![\w'])")
+_PONTUACAO_FINAL = (".", "!", "?", "…", '"', "'", "”", "’", "—", ")", "~")
+
+
+def pontuar_linha(linha: str) -> float:
+    """
+    Nota de 0 a 1 para o quanto uma linha já parece revisada (1 = nenhum problema encontrado).
+
+    Heurísticas baratas, pensadas para as falas curtas de MTL: início em
+    maiúscula (depois de aspas), pontuação final, espaços repetidos ou antes da
+    pontuação, aspas desbalanceadas e "i" minúsculo. Linhas longas perdem um
+    pouco de nota: nelas os erros de gramática que as heurísticas não veem são
+    mais prováveis.
+    """
+    linha = linha.strip()
+    if not linha or _PADRAO_SEPARADOR.match(linha):
+        return 1.0
+
+    nota = 1.0
+    inicio = linha.lstrip("\"'“‘(「*-— ")
+    if inicio and inicio[0].isalpha() and not inicio[0].isupper():
+        nota -= 0.5
+    if not linha.endswith(_PONTUACAO_FINAL):
+        nota -= 0.4
+    if _PADRAO_ESPACO_DUPLO.search(linha):
+        nota -= 0.3
+    if _PADRAO_ESPACO_PONTUACAO.search(linha):
+        nota -= 0.3
+    if linha.count('"') % 2:
+        nota -= 0.4
+    if _PADRAO_I_MINUSCULO.search(linha):
+        nota -= 0.3
+    if len(linha.split()) > TRIAGEM_MAX_PALAVRAS:
+        nota -= 0.2
+    return max(0.0, nota)
+
+
+def pontuar_bloco(bloco: str) -> float:
+    """
+    Nota do bloco: a da pior linha (um bloco é tão sujo quanto sua linha mais suja).
+    """
+    return min((pontuar_linha(linha) for linha in bloco.split("\n")), default=1.0)
+
+
+def dispensa_revisao(bloco: str, limiar: float = TRIAGEM_LIMIAR,
+                     pontuar: Optional[Callable[[str], float]] = None) -> bool:
+    """
+    True se o bloco já parece limpo o bastante para pular a geração.
+
+    Args:
+        limiar (float): Nota mínima para dispensar o bloco (padrão: `TRIAGEM_LIMIAR`).
+        pontuar (Callable, opcional): Função de nota alternativa (padrão: `pontuar_bloco`).
+    """
+    if not bloco.strip():
+        return False
+    return (pontuar or pontuar_bloco)(bloco) >= limiar
+
+
+def sorteado_auditoria(bloco: str, fracao: float = TRIAGEM_AUDITORIA) -> bool:
+    """
+    Decide se um bloco dispensado vai para o LLM mesmo assim, para auditar a triagem.
+
+    O sorteio usa o hash do bloco: a mesma entrada audita sempre os mesmos blocos.
+    """
+    if fracao <= 0:
+        return False
+    return zlib.crc32(bloco.encode("utf-8")) % 10_000 < fracao * 10_000
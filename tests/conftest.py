@@ -0,0 +1,76 @@
+import os
+import sys
+from typing import Iterable, List, Optional, Union
+
+import pytest
+
+# Os módulos são importados a partir da raiz do projeto, como em `python app.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modelo.backend_fake import BackendFake  # noqa: E402
+from modelo.carregador import Geracao  # noqa: E402
+from processamento.agendador import AgendadorBlocos, TarefaCapitulo  # noqa: E402
+from processamento.cache_revisao import CacheRevisao  # noqa: E402
+from utils.config import TEMPERATURA_RETENTATIVA  # noqa: E402
+
+
+class BackendFalhas(BackendFake):
+    """
+    BackendFake que devolve resposta vazia para blocos escolhidos pelo texto.
+
+    Args:
+        no_primeiro (Iterable[str]): Trechos que falham só no 1º try (abaixo de `TEMPERATURA_RETENTATIVA`).
+        sempre (Iterable[str]): Trechos que falham em todas as tentativas.
+    """
+
+    def __init__(self, no_primeiro: Iterable[str] = (), sempre: Iterable[str] = (), **opcoes):
+        super().__init__(**opcoes)
+        self.no_primeiro = tuple(no_primeiro)
+        self.sempre = tuple(sempre)
+
+    def gerar(self, prompts: List[str], max_new_tokens: Union[int, List[int]], temperature: Union[float, List[float]],
+              ids_prompts: Optional[List[List[int]]] = None,
+              tamanhos_blocos: Optional[List[int]] = None) -> List[Geracao]:
+        resultados = super().gerar(prompts, max_new_tokens, temperature, ids_prompts, tamanhos_blocos)
+        temperaturas = list(temperature) if isinstance(temperature, (list, tuple)) else [temperature] * len(prompts)
+        for i, (prompt, temperatura) in enumerate(zip(prompts, temperaturas)):
+            falhas = self.sempre + (self.no_primeiro if temperatura < TEMPERATURA_RETENTATIVA else ())
+            if any(trecho in prompt for trecho in falhas):
+                resultados[i] = Geracao(texto="", ids=[], tokens_gerados=1, orcamento=resultados[i].orcamento)
+        return resultados
+
+
+class BackendInstavel(BackendFake):
+    """Levanta um erro (ex: CUDA transitório) nas primeiras `falhas` chamadas de `gerar`."""
+
+    def __init__(self, falhas: int = 1, **opcoes):
+        super().__init__(**opcoes)
+        self.falhas = falhas
+
+    def gerar(self, *args, **kwargs) -> List[Geracao]:
+        if self.falhas:
+            self.falhas -= 1
+            raise RuntimeError("CUDA error: unspecified launch failure")
+        return super().gerar(*args, **kwargs)
+
+
+def novo_agendador(backend: BackendFake, **opcoes) -> AgendadorBlocos:
+    """
+    Agendador isolado para testes: sem cache, triagem nem deduplicação, salvo pedido em contrário.
+    """
+    padrao = {"usar_cache": False, "triagem": False, "dedup": False, "adaptativo": False}
+    padrao.update(opcoes)
+    return AgendadorBlocos(backend=backend, **padrao)
+
+
+def tarefas(*capitulos: List[str]) -> List[TarefaCapitulo]:
+    """Uma `TarefaCapitulo` por lista de blocos, com a posição como chave."""
+    return [TarefaCapitulo(chave=i, titulo=f"Capítulo {i + 1}", blocos=list(blocos))
+            for i, blocos in enumerate(capitulos)]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = CacheRevisao(str(tmp_path / "revisoes.sqlite"))
+    yield cache
+    cache.fechar()
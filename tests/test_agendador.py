@@ -0,0 +1,182 @@
+import time
+
+import pytest
+from conftest import BackendFalhas, BackendInstavel, novo_agendador, tarefas
+
+from modelo.backend_fake import BackendFake
+from processamento.agendador import TarefaCapitulo
+from processamento.pipeline import PipelineRevisao
+
+
+def test_capitulos_saem_na_ordem_de_entrada():
+    capitulos = [
+        [f"capítulo {c} bloco {b} " + "palavra " * (3 * b + c) for b in range(4)]
+        for c in range(5)
+    ]
+    backend = BackendFake()
+    agendador = novo_agendador(backend, tamanho_lote=3, janela_capitulos=2)
+
+    resultados = list(agendador.executar(tarefas(*capitulos)))
+
+    assert [r.chave for r in resultados] == list(range(5))
+    for resultado, blocos in zip(resultados, capitulos):
+        # Lotes são montados por tamanho, misturando capítulos; a saída volta à ordem dos blocos
+        assert resultado.blocos == blocos
+        assert resultado.revisados == [backend._revisar(b) for b in blocos]
+        assert resultado.estatisticas["rev1"] == len(blocos)
+
+
+def test_contagem_das_retentativas():
+    backend = BackendFalhas(no_primeiro=["segunda chance"], sempre=["sem conserto"])
+    agendador = novo_agendador(backend)
+    blocos = ["bloco que sai de primeira", "bloco com segunda chance", "bloco sem conserto nenhum"]
+
+    resultado, = agendador.executar(tarefas(blocos))
+
+    e = resultado.estatisticas
+    assert (e["rev1"], e["rev2"], e["orig"], e["erros"]) == (1, 1, 1, 1)
+    assert e["retentativas"] == 2
+    assert resultado.revisados == ["Bloco que sai de primeira", "Bloco com segunda chance", "bloco sem conserto nenhum"]
+    assert agendador.metricas["blocos_retentativa"] == 2
+
+
+def test_retentativas_entram_nos_lotes_do_capitulo_seguinte():
+    backend = BackendFalhas(no_primeiro=["instável"])
+    agendador = novo_agendador(backend, janela_capitulos=1)
+
+    resultados = list(agendador.executar(tarefas(["bloco instável aqui", "bloco estável"], ["outro bloco"])))
+
+    assert [r.estatisticas["rev2"] for r in resultados] == [1, 0]
+    assert resultados[0].revisados[0] == "Bloco instável aqui"
+    # O 2º try não gerou um lote só para ele
+    assert agendador.metricas["lotes_so_retentativas"] == 0
+
+
+def test_cache_evita_nova_geracao(cache):
+    blocos = ["primeiro bloco do capítulo", "segundo bloco do capítulo"]
+
+    primeiro = BackendFake()
+    resultado, = novo_agendador(primeiro, cache=cache).executar(tarefas(blocos))
+    assert resultado.estatisticas["cache_hits"] == 0
+    assert resultado.estatisticas["cache_misses"] == 2
+
+    segundo = BackendFake()
+    repetido, = novo_agendador(segundo, cache=cache).executar(tarefas(blocos))
+
+    assert segundo.chamadas_gerar == 0
+    assert repetido.revisados == resultado.revisados
+    assert repetido.estatisticas["cache_hits"] == 2
+    assert repetido.estatisticas["cache_misses"] == 0
+    assert repetido.estatisticas["rev1"] == 0
+
+
+def test_cache_guarda_so_revisoes_aceitas(cache):
+    blocos = ["bloco revisado", "bloco sem conserto"]
+    list(novo_agendador(BackendFalhas(sempre=["sem conserto"]), cache=cache).executar(tarefas(blocos)))
+
+    resultado, = novo_agendador(BackendFake(), cache=cache).executar(tarefas(blocos))
+
+    assert resultado.estatisticas["cache_hits"] == 1
+    assert resultado.estatisticas["rev1"] == 1
+
+
+def test_lote_que_falha_nao_prende_as_copias_futuras():
+    backend = BackendInstavel()
+    agendador = novo_agendador(backend, dedup=True)
+
+    with pytest.raises(RuntimeError):
+        list(agendador.executar(tarefas(["he walk to sect"])))
+
+    resultado, = agendador.executar(tarefas(["he walk to sect", "he  walk to sect"]))
+
+    assert resultado.revisados == ["He walk to sect", "He walk to sect"]
+    assert resultado.estatisticas["rev1"] == 2  # a cópia conta no resultado do representante
+    assert resultado.estatisticas["duplicados"] == 1
+    assert backend.prompts_gerados == 1
+
+
+def test_copias_que_esperavam_o_lote_que_falhou_ficam_com_o_original():
+    agendador = novo_agendador(BackendInstavel(), dedup=True, janela_capitulos=1)
+    primeira = agendador.preparar_janela(tarefas(["bloco repetido"]))
+    segunda = agendador.preparar_janela(tarefas(["bloco repetido"]))
+    assert segunda.pendentes == [] and not segunda.resolvida
+
+    with pytest.raises(RuntimeError):
+        agendador.revisar_itens(primeira.pendentes)
+
+    assert segunda.resolvida
+    resultado, = agendador.finalizar_janela(segunda)
+    assert resultado.revisados == ["bloco repetido"]
+
+
+def test_copias_contam_no_resultado_do_representante():
+    backend = BackendFalhas(no_primeiro=["instável"], sempre=["sem conserto"])
+    agendador = novo_agendador(backend, dedup=True, janela_capitulos=1)
+    capitulos = [
+        ["bloco sem conserto", "bloco instável", "bloco limpo"],
+        ["bloco sem conserto", "bloco  instável", "bloco limpo", "bloco sem conserto"],
+    ]
+
+    resultados = list(agendador.executar(tarefas(*capitulos)))
+
+    e = [r.estatisticas for r in resultados]
+    assert [(x["rev1"], x["rev2"], x["orig"], x["erros"], x["duplicados"]) for x in e] == [(1, 1, 1, 1, 0),
+                                                                                         (1, 1, 2, 2, 4)]
+    assert resultados[1].revisados == ["bloco sem conserto", "Bloco instável", "Bloco limpo", "bloco sem conserto"]
+    # Cada texto distinto foi gerado uma vez só (mais o 2º try dos que falharam)
+    assert backend.prompts_gerados == 3 + 2
+
+
+class BackendQuebraNaSegunda(BackendFalhas):
+    """Falha os blocos "instável" no 1º try e levanta um erro na 2ª chamada de `gerar`."""
+
+    def __init__(self, **opcoes):
+        super().__init__(no_primeiro=["instável"], **opcoes)
+        self.agendador = None
+        self.prompts: list = []
+
+    def gerar(self, prompts, *args, **kwargs):
+        if self.chamadas_gerar == 1:
+            self.chamadas_gerar += 1
+            # No pipeline a limpeza roda em outra thread: espera a retentativa do 1º lote entrar na fila
+            fim = time.monotonic() + 5
+            while not self.agendador._retentativas and time.monotonic() < fim:
+                time.sleep(0.01)
+            raise RuntimeError("CUDA error: unspecified launch failure")
+        self.prompts.extend(prompts)
+        return super().gerar(prompts, *args, **kwargs)
+
+
+def test_falha_no_arquivo_nao_deixa_retentativas_para_o_seguinte():
+    backend = BackendQuebraNaSegunda()
+    agendador = backend.agendador = novo_agendador(backend, tamanho_lote=1)
+
+    with pytest.raises(RuntimeError):
+        list(agendador.executar(tarefas(["bloco instável um", "bloco instável dois"])))
+    assert agendador.metricas["blocos_retentativa"] == 0
+
+    backend.prompts.clear()
+    resultado, = agendador.executar(tarefas(["bloco do outro arquivo"]))
+
+    assert resultado.estatisticas["rev1"] == 1
+    assert agendador.metricas["blocos_retentativa"] == 0
+    assert not any("instável" in prompt for prompt in backend.prompts)
+
+
+def test_falha_no_pipeline_nao_deixa_retentativas_para_o_seguinte():
+    backend = BackendQuebraNaSegunda()
+    agendador = backend.agendador = novo_agendador(backend, tamanho_lote=1)
+    segmentar = lambda chave, titulo, blocos: TarefaCapitulo(chave=chave, titulo=titulo, blocos=blocos)  # noqa: E731
+
+    with pytest.raises(RuntimeError):
+        PipelineRevisao(agendador, segmentar, lambda resultado: None).executar(
+            [(0, "Capítulo 1", ["bloco instável um", "bloco instável dois"])])
+    assert agendador.retirar_retentativas() == []
+
+    backend.prompts.clear()
+    escritos = []
+    PipelineRevisao(agendador, segmentar, escritos.append).executar([(0, "Capítulo 1", ["bloco do outro arquivo"])])
+
+    assert [r.revisados for r in escritos] == [["Bloco do outro arquivo"]]
+    assert agendador.metricas["blocos_retentativa"] == 0
+    assert not any("instável" in prompt for prompt in backend.prompts)
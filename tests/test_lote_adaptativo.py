@@ -0,0 +1,107 @@
+from typing import List
+
+import pytest
+from conftest import novo_agendador, tarefas
+
+from modelo.backend_fake import BackendFake
+from modelo.carregador import Geracao, MemoriaEsgotada
+from processamento.lote_adaptativo import ControleLote
+
+
+class BackendLimitado(BackendFake):
+    """
+    Simula a memória da GPU por linhas: lotes com mais de `limite` prompts levantam `MemoriaEsgotada`.
+    Anota o tamanho de cada lote tentado (`tentativas`) e de cada lote gerado (`gerados`).
+    """
+
+    def __init__(self, limite, **opcoes):
+        super().__init__(**opcoes)
+        self.limite = limite
+        self.tentativas: List[int] = []
+        self.gerados: List[int] = []
+
+    def gerar(self, prompts, *args, **kwargs) -> List[Geracao]:
+        self.tentativas.append(len(prompts))
+        if self.limite is not None and len(prompts) > self.limite:
+            raise MemoriaEsgotada(f"{len(prompts)} linhas não cabem em {self.limite}")
+        self.gerados.append(len(prompts))
+        return super().gerar(prompts, *args, **kwargs)
+
+
+def capitulos(quantidade: int, blocos: int, inicio: int = 0) -> List[List[str]]:
+    return [[f"capítulo {c} bloco {b} sem revisão" for b in range(blocos)] for c in range(inicio, inicio + quantidade)]
+
+
+def revisar(agendador, caps) -> List[List[str]]:
+    return [r.revisados for r in agendador.executar(tarefas(*caps))]
+
+
+def test_fatiar_respeita_limite_e_orcamento():
+    controle = ControleLote(teto=4, orcamento_tokens=100)
+    itens = [(10, 10)] * 5 + [(40, 20)] * 2
+
+    lotes = controle.fatiar(itens, lambda item: item)
+
+    # 4 linhas x 20 tokens cabem; 2 x 60 não (uma linha sozinha sempre cabe)
+    assert [len(lote) for lote in lotes] == [4, 1, 1, 1]
+
+
+def test_controle_recua_pela_metade_e_volta_a_subir():
+    controle = ControleLote(teto=16, rampa=2)
+
+    assert controle.registrar_falta_memoria(16) == 8
+    assert controle.registrar_falta_memoria(8) == 4
+    assert controle.registrar_sucesso(3) is None  # lote menor que o limite não prova nada
+    assert controle.registrar_sucesso(4) is None
+    assert controle.registrar_sucesso(4) == 5
+    for _ in range(20):
+        controle.registrar_sucesso(controle.maximo)
+    assert controle.maximo == 16
+    assert (controle.recuos, controle.ampliacoes) == (2, 8)
+
+
+def test_falta_de_memoria_corta_o_lote_sem_mudar_o_resultado():
+    caps = capitulos(2, 12)
+    esperado = revisar(novo_agendador(BackendFake(), tamanho_lote=16), caps)
+    backend = BackendLimitado(limite=4)
+    agendador = novo_agendador(backend, tamanho_lote=16)
+    agendador.controle_lote.rampa = 8
+
+    resultados = list(agendador.executar(tarefas(*caps)))
+
+    assert [r.revisados for r in resultados] == esperado
+    # 16 não coube, 8 também não; dali em diante, lotes de 4
+    assert backend.tentativas == [16, 8, 4, 4, 4, 4, 4, 4]
+    assert backend.gerados == [4] * 6
+    assert agendador.controle_lote.maximo == 4
+    assert agendador.metricas["recuos_memoria"] == 2
+    # O lote de 16 tinha blocos dos dois capítulos; o de 8, ao menos de um deles
+    assert max(r.estatisticas["recuos_memoria"] for r in resultados) == 2
+    assert all(r.estatisticas["recuos_memoria"] >= 1 for r in resultados)
+    assert all(r.estatisticas["maior_lote"] == 4 for r in resultados)
+
+
+def test_limite_volta_a_crescer_depois_do_recuo():
+    backend = BackendLimitado(limite=4)
+    agendador = novo_agendador(backend, tamanho_lote=16, janela_capitulos=1)
+    agendador.controle_lote.rampa = 2
+    revisar(agendador, capitulos(1, 16))
+    assert agendador.controle_lote.maximo < 16
+
+    # A memória voltou (ex: outro processo saiu da GPU): a rampa devolve o limite ao teto
+    backend.limite = None
+    backend.gerados.clear()
+    caps = capitulos(14, 16, inicio=1)
+    esperado = revisar(novo_agendador(BackendFake(), tamanho_lote=16), caps)
+
+    assert revisar(agendador, caps) == esperado
+    assert agendador.controle_lote.maximo == 16
+    assert agendador.metricas["ampliacoes_lote"] > 0
+    assert max(backend.gerados) == 16
+
+
+def test_bloco_sozinho_sem_memoria_propaga_o_erro():
+    agendador = novo_agendador(BackendLimitado(limite=0), tamanho_lote=4)
+
+    with pytest.raises(MemoriaEsgotada):
+        revisar(agendador, capitulos(1, 4))
@@ -0,0 +1,65 @@
+from docx import Document
+
+from editor.escritor_saida import EscritorDocx
+from editor.manifesto import ManifestoRevisao, impressao_capitulo
+
+CAPITULOS = [
+    ("Chapter 1", ["linha um do primeiro", "linha dois do primeiro"]),
+    ("Chapter 2", ["único parágrafo do segundo"]),
+    ("Chapter 3", ["primeira do terceiro", "segunda do terceiro", "terceira do terceiro"]),
+]
+
+
+def escrever_saida(caminho_base: str) -> str:
+    """Saída e manifesto como a revisão grava (revisão = texto em maiúsculas)."""
+    escritor = EscritorDocx(caminho_base)
+    manifesto = ManifestoRevisao(escritor.caminho)
+    total = 0
+    for i, (titulo, paragrafos) in enumerate(CAPITULOS):
+        inicio = total + (2 if i > 0 else 1)
+        total += escritor.adicionar_capitulo(i, titulo, [p.upper() for p in paragrafos])
+        manifesto.registrar(titulo, impressao_capitulo(titulo, paragrafos), (inicio, total), {"blocos": len(paragrafos)})
+    escritor.finalizar()
+    manifesto.salvar()
+    return escritor.caminho
+
+
+def test_capitulos_inalterados_vem_da_saida_anterior(tmp_path):
+    caminho = escrever_saida(str(tmp_path / "volume_revisado"))
+    atuais = [CAPITULOS[0], ("Chapter 2", ["parágrafo editado do segundo"]), CAPITULOS[2]]
+
+    reaproveitados = ManifestoRevisao(caminho).reaproveitaveis(
+        [impressao_capitulo(t, p) for t, p in atuais], [t for t, _ in atuais])
+
+    assert sorted(reaproveitados) == [0, 2]
+    assert reaproveitados[0]["paragrafos"] == ["LINHA UM DO PRIMEIRO", "LINHA DOIS DO PRIMEIRO"]
+    assert reaproveitados[2]["paragrafos"] == [p.upper() for p in CAPITULOS[2][1]]
+    assert reaproveitados[2]["estatisticas"] == {"blocos": 3}
+
+
+def test_faixas_batem_com_os_paragrafos_do_python_docx(tmp_path):
+    caminho = escrever_saida(str(tmp_path / "volume_revisado"))
+    textos = [par.text for par in Document(caminho).paragraphs]
+
+    reaproveitados = ManifestoRevisao(caminho).reaproveitaveis(
+        [impressao_capitulo(t, p) for t, p in CAPITULOS], [t for t, _ in CAPITULOS])
+
+    for i, (titulo, _) in enumerate(CAPITULOS):
+        inicio = textos.index(titulo) + 1
+        assert reaproveitados[i]["paragrafos"] == textos[inicio:inicio + len(reaproveitados[i]["paragrafos"])]
+
+
+def test_saida_ilegivel_nao_reaproveita_nada(tmp_path):
+    caminho = escrever_saida(str(tmp_path / "volume_revisado"))
+    with open(caminho, "wb") as f:
+        f.write(b"nao e um zip")
+
+    assert ManifestoRevisao(caminho).reaproveitaveis(
+        [impressao_capitulo(t, p) for t, p in CAPITULOS], [t for t, _ in CAPITULOS]) == {}
+
+
+def test_saida_apagada_nao_reaproveita_nada(tmp_path):
+    caminho = escrever_saida(str(tmp_path / "volume_revisado"))
+    (tmp_path / "volume_revisado.docx").unlink()
+
+    assert ManifestoRevisao(caminho).reaproveitaveis([impressao_capitulo(*CAPITULOS[0])], ["Chapter 1"]) == {}
@@ -0,0 +1,109 @@
+import json
+import re
+
+import pytest
+from conftest import novo_agendador
+from docx import Document
+
+import editor.editor_docx as editor_docx
+from editor.editor_docx import revisar_docx_otimizado
+from modelo.backend_fake import BackendFake
+
+CAPITULOS = 6
+
+
+class BackendQueCai(BackendFake):
+    """Levanta um erro (queda da execução) ao chegar num capítulo escolhido."""
+
+    def __init__(self, cair_em=None, **opcoes):
+        super().__init__(**opcoes)
+        self.cair_em = cair_em
+        self.prompts = []
+
+    def gerar(self, prompts, *args, **kwargs):
+        if self.cair_em and any(self.cair_em in prompt for prompt in prompts):
+            raise RuntimeError("CUDA error: unspecified launch failure")
+        self.prompts.extend(prompts)
+        return super().gerar(prompts, *args, **kwargs)
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    """Uma pasta `dados/` isolada, com um volume de capítulos do mesmo tamanho em `dados/entrada`."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(editor_docx, "PIPELINE_ATIVO", False)  # escrita em sequência: a queda é determinística
+    (tmp_path / "dados" / "entrada").mkdir(parents=True)
+    for nome in ("retomado.docx", "inteiro.docx"):
+        doc = Document()
+        for c in range(CAPITULOS):
+            doc.add_paragraph(f"Chapter {c}", style="Heading 1")
+            for linha in range(3):
+                doc.add_paragraph(f"marker{c} line {linha} of this chapter")
+        doc.save(str(tmp_path / "dados" / "entrada" / nome))
+    return tmp_path
+
+
+def historico(pasta):
+    with open(pasta / "dados" / "logs" / "historico.jsonl", encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f]
+
+
+def test_historico_da_retomada_conta_so_o_trabalho_da_execucao(pasta):
+    with pytest.raises(RuntimeError):
+        revisar_docx_otimizado("retomado.docx", agendador=novo_agendador(BackendQueCai("marker3"), janela_capitulos=1))
+    assert not (pasta / "dados" / "logs" / "historico.jsonl").exists()
+
+    revisar_docx_otimizado("retomado.docx", agendador=novo_agendador(BackendQueCai(), janela_capitulos=1))
+    revisar_docx_otimizado("inteiro.docx", agendador=novo_agendador(BackendQueCai(), janela_capitulos=1))
+
+    retomado, inteiro = historico(pasta)
+    assert (retomado["capitulos"], retomado["capitulos_retomados"]) == (3, 3)
+    assert (inteiro["capitulos"], inteiro["capitulos_retomados"]) == (CAPITULOS, 0)
+    # Capítulos do mesmo tamanho: metade do trabalho, metade dos tokens
+    assert retomado["tokens"] * 2 == inteiro["tokens"]
+    assert retomado["blocos"] * 2 == inteiro["blocos"]
+    assert retomado["tempo_geracao"] <= retomado["duracao_segundos"]
+
+    # A saída retomada continua com todos os capítulos
+    textos = [par.text for par in Document(str(pasta / "dados" / "saida" / "retomado_revisado.docx")).paragraphs]
+    assert [t for t in textos if t.startswith("Chapter")] == [f"Chapter {c}" for c in range(CAPITULOS)]
+
+
+def test_primeiro_capitulo_sai_antes_de_ler_o_volume_inteiro(pasta, monkeypatch):
+    eventos = []
+    ler = editor_docx.iterar_capitulos
+    adicionar = editor_docx.EscritorVolume.adicionar_capitulo
+
+    def iterar_capitulos(caminho):
+        for titulo, paragrafos in ler(caminho):
+            eventos.append(("lido", titulo))
+            yield titulo, paragrafos
+
+    def adicionar_capitulo(self, indice, titulo, revisados):
+        eventos.append(("escrito", titulo))
+        return adicionar(self, indice, titulo, revisados)
+
+    monkeypatch.setattr(editor_docx, "iterar_capitulos", iterar_capitulos)
+    monkeypatch.setattr(editor_docx.EscritorVolume, "adicionar_capitulo", adicionar_capitulo)
+
+    revisar_docx_otimizado("inteiro.docx", agendador=novo_agendador(BackendFake(), janela_capitulos=1))
+
+    assert eventos.index(("escrito", "Chapter 0")) < eventos.index(("lido", f"Chapter {CAPITULOS - 1}"))
+    assert [titulo for evento, titulo in eventos if evento == "escrito"] == [f"Chapter {c}" for c in range(CAPITULOS)]
+
+
+def test_checkpoint_e_conferido_capitulo_a_capitulo(pasta):
+    with pytest.raises(RuntimeError):
+        revisar_docx_otimizado("retomado.docx", agendador=novo_agendador(BackendQueCai("marker3"), janela_capitulos=1))
+
+    # Edita o capítulo 1 (já no checkpoint): só ele e os que faltavam voltam ao LLM
+    doc = Document(str(pasta / "dados" / "entrada" / "retomado.docx"))
+    doc.paragraphs[5].text = "marker1 line 1 edited by hand"
+    doc.save(str(pasta / "dados" / "entrada" / "retomado.docx"))
+    backend = BackendQueCai()
+    revisar_docx_otimizado("retomado.docx", agendador=novo_agendador(backend, janela_capitulos=1))
+
+    assert {m for prompt in backend.prompts for m in re.findall(r"marker\d", prompt)} == {
+        "marker1", "marker3", "marker4", "marker5"}
+    textos = [par.text for par in Document(str(pasta / "dados" / "saida" / "retomado_revisado.docx")).paragraphs]
+    assert "Marker1 line 1 edited by hand" in textos
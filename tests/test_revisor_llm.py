@@ -0,0 +1,44 @@
+import pytest
+from conftest import BackendFalhas, novo_agendador, tarefas
+
+from processamento.revisor_llm import limpar_resposta
+
+
+class LoggerFalso:
+    def __init__(self):
+        self.limpezas_perigosas = []
+
+    def log_limpeza_perigosa(self, indice_bloco, antes, depois):
+        self.limpezas_perigosas.append(indice_bloco)
+
+
+@pytest.mark.parametrize("continuacao", ["", "   ", "\n\n"])
+def test_continuacao_vazia_vai_para_retentativa(continuacao):
+    logger = LoggerFalso()
+
+    assert limpar_resposta(continuacao, indice_bloco=3, logger=logger, texto_completo=False) == ""
+    assert logger.limpezas_perigosas == []
+
+
+def test_continuacao_so_de_artefatos_e_limpeza_perigosa():
+    logger = LoggerFalso()
+
+    assert limpar_resposta("<|im_end|>", indice_bloco=3, logger=logger, texto_completo=False) == "***"
+    assert logger.limpezas_perigosas == [3]
+
+
+def test_texto_completo_sem_marcador_vai_para_retentativa():
+    assert limpar_resposta("He nodded.", texto_completo=True) == ""
+    assert limpar_resposta("<|im_start|>assistant\nHe nodded.", texto_completo=True) == "He nodded."
+
+
+def test_resposta_vazia_do_backend_e_retentada_sem_log_de_limpeza():
+    logger = LoggerFalso()
+    backend = BackendFalhas(no_primeiro=["vazio"])
+    tarefa, = tarefas(["bloco vazio no 1º try"])
+    tarefa.logger = logger
+
+    resultado, = novo_agendador(backend).executar([tarefa])
+
+    assert resultado.estatisticas["rev2"] == 1
+    assert logger.limpezas_perigosas == []
@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+from conftest import BackendInstavel, novo_agendador
+
+from modelo.backend_fake import BackendFake
+from processamento.segmentador import segmentar_capitulo
+from processamento.servico import ServicoRevisao, revisar_remoto, status_remoto
+
+HOST = "127.0.0.1"
+
+
+def rodar(servico: ServicoRevisao, cenario):
+    """
+    Sobe o serviço numa porta livre de localhost, roda `cenario(porta)` e derruba tudo.
+    """
+    async def principal():
+        await servico.iniciar()
+        servidor = await asyncio.start_server(servico.atender, HOST, 0)
+        porta = servidor.sockets[0].getsockname()[1]
+        try:
+            async with servidor:
+                return await cenario(porta)
+        finally:
+            await servico.parar()
+
+    return asyncio.run(asyncio.wait_for(principal(), timeout=30))
+
+
+async def pedir(porta: int, pedido: dict) -> list:
+    """Envia um pedido (uma linha JSON) e lê as respostas até o `fim` ou um erro."""
+    reader, writer = await asyncio.open_connection(HOST, porta)
+    writer.write((json.dumps(pedido) + "\n").encode("utf-8"))
+    await writer.drain()
+    respostas = []
+    while True:
+        resposta = json.loads(await reader.readline())
+        respostas.append(resposta)
+        if resposta.get("fim") or "erro" in resposta:
+            break
+    writer.close()
+    return respostas
+
+
+def servico_fake(backend: BackendFake, **opcoes) -> ServicoRevisao:
+    return ServicoRevisao(novo_agendador(backend, dedup=True), **opcoes)
+
+
+def test_pedido_de_blocos_por_json_em_linhas():
+    servico = servico_fake(BackendFake(), espera_maxima=0.01)
+
+    respostas = rodar(servico, lambda porta: pedir(porta, {"id": 7, "blocos": ["he walk to sect", "she  smile."]}))
+
+    blocos = sorted((r for r in respostas if "indice" in r), key=lambda r: r["indice"])
+    assert blocos == [
+        {"id": 7, "indice": 0, "texto": "He walk to sect", "origem": "rev1"},
+        {"id": 7, "indice": 1, "texto": "She smile.", "origem": "rev1"},
+    ]
+    assert respostas[-1] == {"id": 7, "fim": True, "blocos": 2}
+
+
+def test_pedido_de_capitulo_e_clientes_sincronos():
+    capitulo = "\n".join(f"line {i} of the chapter." for i in range(12))
+    esperado = [BackendFake()._revisar(bloco) for bloco in segmentar_capitulo(capitulo)]
+    servico = servico_fake(BackendFake(), espera_maxima=0.01)
+
+    async def cenario(porta):
+        respostas = await pedir(porta, {"id": "cap", "capitulo": capitulo})
+        revisados = await asyncio.to_thread(revisar_remoto, ["he walk to sect"], HOST, porta)
+        estado = await asyncio.to_thread(status_remoto, HOST, porta)
+        return respostas, revisados, estado
+
+    respostas, revisados, estado = rodar(servico, cenario)
+
+    textos = [r["texto"] for r in sorted((r for r in respostas if "indice" in r), key=lambda r: r["indice"])]
+    assert textos == esperado
+    assert respostas[-1]["blocos"] == len(esperado)
+    assert revisados == ["He walk to sect"]
+    assert estado["requisicoes"] == 2
+    assert estado["blocos_atendidos"] == len(esperado) + 1
+
+
+def test_pedidos_concorrentes_saem_no_mesmo_lote():
+    backend = BackendFake()
+    servico = servico_fake(backend, espera_maxima=0.5, tamanho_lote=8)
+
+    async def cenario(porta):
+        return await asyncio.gather(
+            pedir(porta, {"id": "a", "blocos": ["first client line one", "first client line two"]}),
+            pedir(porta, {"id": "b", "blocos": ["second client line", "he walk to sect"]}),
+        )
+
+    a, b = rodar(servico, cenario)
+
+    assert [r["texto"] for r in a if "indice" in r] == ["First client line one", "First client line two"]
+    assert sorted(r["texto"] for r in b if "indice" in r) == ["He walk to sect", "Second client line"]
+    assert a[-1]["fim"] and b[-1]["fim"]
+    # Os dois pedidos foram juntados num único lote do backend
+    assert backend.chamadas_gerar == 1
+    assert backend.prompts_gerados == 4
+    assert servico.agendador.metricas["lotes"] == 1
+
+
+def test_lote_que_falha_devolve_erro_e_nao_prende_o_proximo_pedido():
+    backend = BackendInstavel()
+    servico = servico_fake(backend, espera_maxima=0.01)
+
+    async def cenario(porta):
+        falha = await pedir(porta, {"id": 1, "blocos": ["he walk to sect"]})
+        repetido = await pedir(porta, {"id": 2, "blocos": ["he walk to sect", "he  walk to sect"]})
+        return falha, repetido
+
+    falha, repetido = rodar(servico, cenario)
+
+    assert falha[-1]["id"] == 1 and "CUDA error" in falha[-1]["erro"]
+    blocos = sorted((r for r in repetido if "indice" in r), key=lambda r: r["indice"])
+    assert [(r["texto"], r["origem"]) for r in blocos] == [("He walk to sect", "rev1"), ("He walk to sect", "duplicado")]
+    assert repetido[-1] == {"id": 2, "fim": True, "blocos": 2}
@@ -0,0 +1,29 @@
+from conftest import tarefas
+
+from modelo.backend_fake import BackendFake
+from processamento.trabalhadores import PoolTrabalhadores
+
+
+def capitulos(arquivo: str, quantidade: int):
+    return [[f"{arquivo} capítulo {c} bloco {b}" for b in range(2)] for c in range(quantidade)]
+
+
+def test_execucao_interrompida_nao_contamina_a_seguinte():
+    revisar = BackendFake()._revisar
+    with PoolTrabalhadores(1, dispositivos=["cpu"], tipo_backend="fake", opcoes_backend={"latencia_fixa": 0.1},
+                           janela_capitulos=2,
+                           opcoes_agendador={"usar_cache": False, "triagem": False, "dedup": False}) as pool:
+        # Arquivo A: quem consome para no 1º capítulo (ex: a escrita levantou um erro)
+        # com o 2º ainda em voo ou já na fila de saída
+        execucao = pool.executar(tarefas(*capitulos("arquivo A", 3)))
+        primeiro = next(execucao)
+        execucao.close()
+        assert primeiro.revisados == [revisar(b) for b in capitulos("arquivo A", 1)[0]]
+        assert all(not t.pendentes for t in pool._trabalhadores.values())
+
+        # Arquivo B no mesmo pool: os resultados atrasados de A chegam com o id antigo e são ignorados
+        caps = capitulos("arquivo B", 6)
+        resultados = list(pool.executar(tarefas(*caps)))
+
+    assert [r.chave for r in resultados] == list(range(6))
+    assert [r.revisados for r in resultados] == [[revisar(b) for b in blocos] for blocos in caps]
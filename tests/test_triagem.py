@@ -0,0 +1,39 @@
+from conftest import novo_agendador, tarefas
+
+from modelo.backend_fake import BackendFake
+from processamento.agendador import AgendadorBlocos
+from processamento.triagem import dispensa_revisao, sorteado_auditoria
+
+# Pontuação e maiúsculas em ordem, gramática errada: a triagem não enxerga
+MTL_BEM_PONTUADO = ["He no want go to sect today.", "Lin Feng face become very ugly, he did not expected this."]
+
+
+def test_heuristicas_nao_veem_gramatica():
+    assert all(dispensa_revisao(bloco) for bloco in MTL_BEM_PONTUADO)
+    assert not dispensa_revisao("he walk to sect")
+
+
+def test_triagem_desligada_por_padrao():
+    backend = BackendFake()
+    agendador = AgendadorBlocos(backend=backend, usar_cache=False)
+
+    resultado, = agendador.executar(tarefas(MTL_BEM_PONTUADO))
+
+    assert resultado.estatisticas["triagem_dispensados"] == 0
+    assert resultado.estatisticas["rev1"] == len(MTL_BEM_PONTUADO)
+    assert backend.prompts_gerados == len(MTL_BEM_PONTUADO)
+
+
+def test_triagem_ligada_dispensa_e_audita():
+    blocos = [f"Line number {i} is already clean." for i in range(200)] + ["he walk to sect"]
+    auditados = sum(sorteado_auditoria(b, 0.05) for b in blocos[:-1])
+    backend = BackendFake()
+
+    resultado, = novo_agendador(backend, triagem=True, auditoria_triagem=0.05).executar(tarefas(blocos))
+
+    e = resultado.estatisticas
+    assert 0 < auditados < 200
+    assert e["triagem_auditados"] == auditados
+    assert e["triagem_dispensados"] == 200 - auditados
+    assert backend.prompts_gerados == auditados + 1
+    assert resultado.revisados[-1] == "He walk to sect"
@@ -5,9 +5,16 @@
 #MODEL_NAME = "teknium/OpenHermes-2.5-Mistral-7B"
 MODEL_NAME = "NousResearch/Hermes-2-Pro-Mistral-7B"
 
+# Backend de inferência: "hf" (modelo real via transformers) ou "fake" (determinístico, para testes/benchmarks)
+BACKEND = "hf"
+
 # Temperatura do modelo (ajuste entre 0.35 e 0.8 conforme desejado)
 TEMPERATURE = 0.35
 
+# Temperatura das retentativas: blocos rejeitados no 1º try voltam numa fila global
+# e são gerados de novo com esta temperatura, misturados aos lotes seguintes
+TEMPERATURA_RETENTATIVA = 0.5
+
 # Prompt base usado para revisão
 #PROMPT_TEMPLATE = montar_prompt_template() # resultado inferior
 PROMPT_TEMPLATE = (
@@ -26,5 +33,132 @@ PROMPT_TEMPLATE = (
 
 
 
+# Dispositivo do backend "hf": "auto" (CUDA se houver, senão CPU), "cuda" ou "cpu"
+DISPOSITIVO = "auto"
+
+# Pesos na CPU: "int8" (camadas lineares quantizadas dinamicamente, pesos em float32 no resto),
+# "bf16" (bfloat16; bom em CPUs com AVX-512/AMX) ou "fp32". Na GPU é sempre float16.
+CPU_QUANTIZACAO = "int8"
+
+# Threads de computação na CPU (None: um por núcleo disponível para o processo)
+CPU_THREADS = None
+
+# Usa o tokenizer rápido (Rust) quando o modelo oferece; False força o tokenizer lento
+TOKENIZER_RAPIDO = True
+
+# Reaproveita o KV-cache da mensagem de sistema (prefixo fixo do PROMPT_TEMPLATE) em todos os lotes
+CACHE_PREFIXO_KV = True
+
+# Cache persistente de blocos revisados (chave: modelo + prompt + temperatura + bloco)
+CACHE_REVISAO_ATIVO = True
+CACHE_REVISAO_CAMINHO = "dados/cache/revisoes.sqlite"
+CACHE_REVISAO_MAX_ENTRADAS = 200_000  # acima disso, descarta as menos usadas (LRU)
+
+# Orçamento de geração por bloco: entrada * FATOR + MARGEM, entre MINIMO e MAXIMO tokens
+ORCAMENTO_FATOR = 1.3
+ORCAMENTO_MARGEM = 24
+ORCAMENTO_MINIMO = 32
+ORCAMENTO_MAXIMO = 768
+
+# Aborto antecipado durante a decodificação: a sequência que entra em loop (um trecho de
+# até LOOP_MAX_NGRAM tokens repetido LOOP_REPETICOES vezes seguidas, cobrindo pelo menos
+# LOOP_MIN_TOKENS), passa de entrada * RAZAO_TAMANHO + FOLGA_TAMANHO tokens ou emite um
+# marcador de chat/papel para na hora e vai direto para a retentativa.
+ABORTO_ATIVO = True
+ABORTO_LOOP_MAX_NGRAM = 32
+ABORTO_LOOP_REPETICOES = 3
+ABORTO_LOOP_MIN_TOKENS = 24
+ABORTO_RAZAO_TAMANHO = 1.25
+ABORTO_FOLGA_TAMANHO = 16
+ABORTO_MARCADORES = ["<|im_start|>", "\nuser:", "\nassistant:", "\nsystem:", "\nUser:", "\nAssistant:"]
+
+# Decodificação assistida por busca no prompt: a cada passo, os tokens que seguem no bloco
+# original a ocorrência dos últimos (até NGRAM_MAX) tokens gerados são propostos como
+# rascunho (até TOKENS_RASCUNHO) e verificados num único forward. A saída tem a mesma
+# distribuição; rende quando a revisão copia muito do original (ver benchmarks/bench_assistida.py).
+DECODIFICACAO_ASSISTIDA = False
+ASSISTIDA_TOKENS_RASCUNHO = 10
+ASSISTIDA_NGRAM_MAX = 3
+
+# Segmentação dos capítulos em blocos:
+# - "linhas": até 7 linhas por bloco, quebrando em fim de frase (comportamento original)
+# - "orcamento": junta linhas até ~ALVO tokens (nunca passa de MAX), quebrando em fim de frase/fala.
+#   Blocos de tamanho parecido desperdiçam menos padding e têm orçamentos de geração parecidos.
+SEGMENTACAO_MODO = "linhas"
+SEGMENTACAO_ALVO_TOKENS = 160
+SEGMENTACAO_MAX_TOKENS = 256
+
+# Triagem antes da geração: blocos que as heurísticas de processamento/triagem.py
+# consideram limpos (nota >= LIMIAR, de 0 a 1) pulam o LLM e ficam como estão.
+# Desligada por padrão: as heurísticas só veem maiúsculas, pontuação e espaços, então
+# frases de MTL bem pontuadas mas erradas ("He no want go to sect today.") passam sem
+# revisão. Ligue só em volumes já revisados, conferindo a auditoria no log.
+# AUDITORIA é a fração dos dispensados que vai ao LLM mesmo assim, para medir
+# quantos o modelo teria alterado (0 desliga a auditoria).
+TRIAGEM_ATIVA = False
+TRIAGEM_LIMIAR = 1.0
+TRIAGEM_MAX_PALAVRAS = 25  # linhas mais longas que isso perdem nota
+TRIAGEM_AUDITORIA = 0.05
+
+# Deduplicação na execução: blocos repetidos (rodapés do tradutor, painéis de status,
+# recapitulações) são gerados uma vez só e copiados para todas as ocorrências.
+# O índice vive enquanto o agendador viver (todos os capítulos e arquivos da execução).
+DEDUP_ATIVO = True
+DEDUP_MAX_ENTRADAS = 100_000  # acima disso, blocos novos deixam de entrar no índice
+
+# Agendador global: quantos capítulos entram juntos na fila de blocos
+# (lotes são montados por tamanho em tokens entre todos os blocos da janela)
+CAPITULOS_POR_JANELA = 8
+
+# Lote adaptativo: cada lote leva até LOTE_MAXIMO blocos, desde que prompt + geração de
+# todas as linhas caibam no orçamento de tokens. O orçamento é LOTE_ORCAMENTO_TOKENS ou,
+# se None, estimado pela memória livre do dispositivo (uma FRACAO dela para o KV-cache).
+# Se faltar memória, o lote cai pela metade e é tentado de novo; depois de
+# LOTE_RAMPA_SUCESSOS lotes bem-sucedidos seguidos, o limite volta a subir.
+LOTE_ADAPTATIVO = True
+LOTE_MAXIMO = 16
+LOTE_ORCAMENTO_TOKENS = None
+LOTE_FRACAO_MEMORIA = 0.5
+LOTE_RAMPA_SUCESSOS = 8
+
+# Execução em vários processos: os capítulos são distribuídos entre N trabalhadores,
+# cada um com o próprio backend (1 desliga). DISPOSITIVOS fixa um dispositivo por
+# trabalhador, em rodízio (ex: ["cuda:0", "cuda:1"]); None escolhe sozinho: uma GPU
+# por trabalhador se houver CUDA, senão divide os núcleos da CPU entre eles.
+TRABALHADORES = 1
+TRABALHADORES_DISPOSITIVOS = None
+
+# Pipeline: leitura, segmentação, lotes, limpeza e escrita rodam em threads
+# próprias, em paralelo com a geração. O tamanho limita cada fila entre etapas.
+PIPELINE_ATIVO = True
+PIPELINE_TAMANHO_FILA = 4
+
+# Fila de trabalhos do app.py (um .docx de dados/entrada por trabalho)
+FILA_TRABALHOS_CAMINHO = "dados/fila/trabalhos.json"
+FILA_INTERVALO_OBSERVACAO = 30  # segundos entre varreduras no modo --observar
+FILA_IDADE_MINIMA = 10          # ignora arquivos modificados há menos que isso (ainda sendo copiados)
+
+# Telemetria estruturada do LoggerProcesso: eventos JSONL ao lado do log em texto e
+# totais no formato do textfile collector do Prometheus (None desliga)
+TELEMETRIA_JSONL = True
+TELEMETRIA_PROMETHEUS_DIR = "dados/metricas"
+
+# Histórico de execuções: uma linha JSON por arquivo revisado (duração, tokens, modelo...).
+# O planejamento (`python app.py --planejar`) estima novos volumes a partir dele. None desliga.
+HISTORICO_REVISOES = "dados/logs/historico.jsonl"
+# Sem histórico, o planejamento assume esta vazão (tokens de entrada revisados por segundo)
+PLANO_TOKENS_POR_SEGUNDO = 25.0
+
+# Serviço local de revisão (python -m processamento.servico)
+SERVICO_HOST = "127.0.0.1"
+SERVICO_PORTA = 8765
+SERVICO_ESPERA_MAXIMA = 0.05  # segundos que um lote espera por blocos de outras requisições
+
 # Definição de author para o ebook
 AUTHOR = "editorAI"
+
+# Saída: o .docx revisado é gravado capítulo a capítulo (memória constante).
+# Formatos extras gerados ao lado dele, com o mesmo nome: "txt", "md", "epub".
+SAIDA_FORMATOS_EXTRAS = []
+# A cada N capítulos publica cópias parciais legíveis (<saida>.parcial.docx etc.); 0 desliga
+SAIDA_PUBLICAR_A_CADA = 10
@@ -1,6 +1,78 @@
+import json
 import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
+
+from utils.config import HISTORICO_REVISOES, TELEMETRIA_JSONL, TELEMETRIA_PROMETHEUS_DIR
+
+
+def formatar_orcamento(gerados: int, orcamento: int) -> str:
+    """
+    Ex: "1,234 de 2,000 tokens do orçamento (62%)".
+    """
+    uso = gerados / orcamento if orcamento else 0.0
+    return f"{gerados:,} de {orcamento:,} tokens do orçamento ({uso:.0%})"
+
+
+# Etapas cronometradas por capítulo (segundos)
+ETAPAS = ("segmentacao", "tokenizacao", "geracao", "limpeza", "escrita_docx")
+
+def formatar_abortos(abortos: Dict[str, int]) -> str:
+    """
+    Ex: "3 (repeticao 2, marcador 1)".
+    """
+    total = sum(abortos.values())
+    if not total:
+        return "0"
+    return f"{total} (" + ", ".join(f"{motivo} {n}" for motivo, n in sorted(abortos.items()) if n) + ")"
+
+
+def formatar_rascunho(aceitos: int, propostos: int) -> str:
+    """
+    Ex: "Decodificação assistida: 1,530 de 1,800 tokens do rascunho aceitos (85%)".
+    """
+    taxa = aceitos / propostos if propostos else 0.0
+    return f"Decodificação assistida: {aceitos:,} de {propostos:,} tokens do rascunho aceitos ({taxa:.0%})"
+
+
+@dataclass
+class RegistroCapitulo:
+    """
+    Estatísticas de um capítulo revisado (as chaves de `ResultadoCapitulo.estatisticas`).
+    """
+    titulo: str
+    blocos: int
+    tokens: int
+    erros: int
+    duracao_segundos: float
+    tokens_saida: int = 0
+    rev1: int = 0
+    rev2: int = 0
+    orig: int = 0
+    recuperados: List[int] = field(default_factory=list)
+    cache_hits: int = 0
+    cache_misses: int = 0
+    desperdicio_padding: float = 0.0
+    tokens_por_segundo: float = 0.0
+    tokens_gerados: int = 0
+    tokens_orcamento: int = 0
+    retentativas: int = 0
+    tamanho_medio_lote: float = 0.0
+    triagem_dispensados: int = 0
+    triagem_tokens_poupados: int = 0
+    triagem_auditados: int = 0
+    triagem_alterados: int = 0
+    duplicados: int = 0
+    abortos: Dict[str, int] = field(default_factory=dict)
+    recuos_memoria: int = 0
+    maior_lote: int = 0
+    rascunho_propostos: int = 0
+    rascunho_aceitos: int = 0
+    tempos_etapas: Dict[str, float] = field(default_factory=dict)
+    retomado: bool = False  # revisado numa execução anterior e refeito a partir do checkpoint
 
 
 class LoggerProcesso:
@@ -12,9 +84,15 @@ class LoggerProcesso:
     - blocos,
     - tokens de entrada e saída,
     - erros (fallbacks),
-    - blocos revisados no 1º e 2º try.
+    - blocos revisados no 1º e 2º try,
+    - tempo de cada etapa (segmentação, tokenização, geração, limpeza, escrita).
 
     Ao final, consolida totais.
+
+    Além do log em texto, emite telemetria estruturada durante a execução:
+    - `<log>.jsonl`: um evento JSON por linha (capítulos, etapas, fim),
+    - `<TELEMETRIA_PROMETHEUS_DIR>/revisor_<arquivo>.prom`: totais no formato texto
+      do Prometheus, para o textfile collector do node_exporter.
     """
 
     def __init__(self, nome_arquivo_base: str):
@@ -28,105 +106,341 @@ class LoggerProcesso:
         self.log_dir = os.path.join("dados", "logs")
         os.makedirs(self.log_dir, exist_ok=True)
 
+        self.nome_arquivo_base = nome_arquivo_base
         self.log_path = os.path.join(self.log_dir, f"{data_hora}_log_{nome_arquivo_base}.txt")
         self.inicio = datetime.now()
 
-        # Armazena tuplas: (blocos, tokens_in, tokens_out, erros, duracao, rev1, rev2, orig)
-        self.capitulos_info = []
+        self.capitulos: List[RegistroCapitulo] = []
+
+        # Capítulos copiados da saída anterior (revisão incremental)
+        self.capitulos_reaproveitados = 0
+        self.recuos_lote = 0  # lotes refeitos por falta de memória (um evento pode envolver vários capítulos)
+
+        # Vários estágios do pipeline escrevem no log; um handle só, protegido por lock
+        self._lock = threading.Lock()
+        self._arquivo = open(self.log_path, "w", encoding="utf-8")
+        self._jsonl = None
+        if TELEMETRIA_JSONL:
+            self._jsonl = open(os.path.splitext(self.log_path)[0] + ".jsonl", "w", encoding="utf-8")
+        self.prometheus_path = None
+        if TELEMETRIA_PROMETHEUS_DIR:
+            os.makedirs(TELEMETRIA_PROMETHEUS_DIR, exist_ok=True)
+            self.prometheus_path = os.path.join(TELEMETRIA_PROMETHEUS_DIR, f"revisor_{nome_arquivo_base}.prom")
+
+        self._escrever(f"[📄] Arquivo: {nome_arquivo_base}.docx\n"
+                       f"[🕒] Início: {self.inicio.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        self._evento("inicio", inicio=self.inicio.isoformat(timespec="seconds"))
 
-        with open(self.log_path, "w", encoding="utf-8") as f:
-            f.write(f"[📄] Arquivo: {nome_arquivo_base}.docx\n")
-            f.write(f"[🕒] Início: {self.inicio.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+    # ----------------------------
+    # Saídas
+    # ----------------------------
 
-    def registrar_capitulo(self, titulo: str, blocos: int, tokens: int, erros: int, duracao_segundos: float,
-                        tokens_saida: int = 0, rev1: int = 0, rev2: int = 0, orig: int = 0,
-                        recuperados: Optional[list[int]] = None
-):
+    def _escrever(self, texto: str) -> None:
+        with self._lock:
+            self._arquivo.write(texto)
+            self._arquivo.flush()
 
+    def _evento(self, tipo: str, **dados) -> None:
+        if self._jsonl is None:
+            return
+        linha = json.dumps({"evento": tipo, "ts": time.time(), "arquivo": self.nome_arquivo_base, **dados},
+                           ensure_ascii=False)
+        with self._lock:
+            self._jsonl.write(linha + "\n")
+            self._jsonl.flush()
+
+    def _exportar_prometheus(self) -> None:
+        if not self.prometheus_path:
+            return
+        rotulo = 'arquivo="' + self.nome_arquivo_base.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        soma = lambda campo: sum(getattr(r, campo) for r in self.capitulos)  # noqa: E731
+        ultimo = self.capitulos[-1] if self.capitulos else None
+
+        metricas = [
+            ("revisor_capitulos_total", "counter", "Capítulos escritos na saída.", [
+                ('origem="regenerado"', len(self.capitulos)),
+                ('origem="reaproveitado"', self.capitulos_reaproveitados)]),
+            ("revisor_blocos_total", "counter", "Blocos revisados.", [("", soma("blocos"))]),
+            ("revisor_blocos_por_resultado_total", "counter",
+             "Blocos por resultado da revisão (cópias também contam no resultado do original).", [
+                ('resultado="rev1"', soma("rev1")), ('resultado="rev2"', soma("rev2")),
+                ('resultado="original"', soma("orig")), ('resultado="duplicado"', soma("duplicados"))]),
+            ("revisor_retentativas_total", "counter", "Blocos reenviados no 2º try.", [("", soma("retentativas"))]),
+            ("revisor_lote_recuos_total", "counter", "Lotes refeitos menores por falta de memória.",
+             [("", self.recuos_lote)]),
+            ("revisor_abortos_total", "counter", "Gerações abortadas durante a decodificação, por motivo.", [
+                (f'motivo="{motivo}"', sum(r.abortos.get(motivo, 0) for r in self.capitulos))
+                for motivo in sorted({m for r in self.capitulos for m in r.abortos})]),
+            ("revisor_triagem_blocos_total", "counter", "Blocos vistos pela triagem antes da geração.", [
+                ('resultado="dispensado"', soma("triagem_dispensados")),
+                ('resultado="auditado"', soma("triagem_auditados")),
+                ('resultado="auditado_alterado"', soma("triagem_alterados"))]),
+            ("revisor_triagem_tokens_poupados_total", "counter", "Tokens que a triagem evitou enviar ao LLM.",
+             [("", soma("triagem_tokens_poupados"))]),
+            ("revisor_cache_total", "counter", "Consultas ao cache de revisões.", [
+                ('resultado="hit"', soma("cache_hits")), ('resultado="miss"', soma("cache_misses"))]),
+            ("revisor_tokens_total", "counter", "Tokens de entrada, saída e decodificação.", [
+                ('tipo="entrada"', soma("tokens")), ('tipo="saida"', soma("tokens_saida")),
+                ('tipo="gerados"', soma("tokens_gerados")), ('tipo="orcamento"', soma("tokens_orcamento"))]),
+            ("revisor_rascunho_tokens_total", "counter", "Tokens do rascunho da decodificação assistida.", [
+                ('resultado="proposto"', soma("rascunho_propostos")), ('resultado="aceito"', soma("rascunho_aceitos"))]),
+            ("revisor_etapa_segundos_total", "counter", "Tempo acumulado por etapa.", [
+                (f'etapa="{etapa}"', sum(r.tempos_etapas.get(etapa, 0.0) for r in self.capitulos))
+                for etapa in ETAPAS]),
+            ("revisor_tokens_por_segundo", "gauge", "Vazão de geração do último capítulo.",
+             [("", ultimo.tokens_por_segundo if ultimo else 0.0)]),
+            ("revisor_desperdicio_padding", "gauge", "Fração de padding nos lotes do último capítulo.",
+             [("", ultimo.desperdicio_padding if ultimo else 0.0)]),
+            ("revisor_tamanho_medio_lote", "gauge", "Blocos por lote no último capítulo.",
+             [("", ultimo.tamanho_medio_lote if ultimo else 0.0)]),
+            ("revisor_ultima_atualizacao_segundos", "gauge", "Timestamp da última atualização.", [("", time.time())]),
+        ]
+
+        linhas = []
+        for nome, tipo, ajuda, amostras in metricas:
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for rotulos, valor in amostras:
+                todos = ",".join(r for r in (rotulo, rotulos) if r)
+                linhas.append(f"{nome}{{{todos}}} {float(valor):g}")
+
+        # O textfile collector lê o arquivo a qualquer momento: escreve ao lado e troca
+        temporario = self.prometheus_path + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write("\n".join(linhas) + "\n")
+        os.replace(temporario, self.prometheus_path)
+
+    # ----------------------------
+    # Registros
+    # ----------------------------
+
+    def registrar_capitulo(self, titulo: str, **estatisticas):
         """
         Adiciona uma entrada no log para o capítulo atual.
 
         Args:
             titulo (str): Nome do capítulo.
-            blocos (int): Quantidade de blocos revisados.
-            tokens (int): Total de tokens de entrada.
-            erros (int): Fallbacks registrados.
-            duracao_segundos (float): Tempo gasto.
-            tokens_saida (int): Tokens gerados.
-            rev1 (int): Revisados no 1º try.
-            rev2 (int): Revisados no 2º try.
-            orig (int): Mantidos originais após 2 falhas.
-        """
-        self.capitulos_info.append((blocos, tokens, tokens_saida, erros, duracao_segundos, rev1, rev2, orig))
-        tempo_fmt = f"{int(duracao_segundos // 60)}m {int(duracao_segundos % 60)}s"
-        if recuperados:
-            if not hasattr(self, "capitulos_recuperados"):
-                self.capitulos_recuperados = []
-            self.capitulos_recuperados.append((titulo, recuperados))
-
-
-        with open(self.log_path, "a", encoding="utf-8") as f:
-            f.write(f"-- {titulo} --\n")
-            f.write(f"Blocos: {blocos}\n")
-            f.write(f"Tokens (entrada): {tokens:,}\n")
-            f.write(f"Tokens (saída):   {tokens_saida:,}\n")
-            f.write(f"Erros (fallback): {erros}\n")
-            f.write(f" - Revisados no 1º try: {rev1}\n")
-            f.write(f" - Revisados no 2º try: {rev2}\n")
-            f.write(f" - Mantidos como original: {orig}\n")
-            if recuperados:
-                f.write(f" - Blocos recuperados manualmente no final: {', '.join(str(i) for i in recuperados)}\n")
-            f.write(f"Tempo: {tempo_fmt}\n\n")
+            **estatisticas: Campos de `RegistroCapitulo` (blocos, tokens, erros,
+                duracao_segundos, rev1, rev2, orig, cache_hits, tempos_etapas...).
+                Com `retomado=True`, o capítulo veio do checkpoint e fica fora do histórico.
+        """
+        campos = RegistroCapitulo.__dataclass_fields__
+        registro = RegistroCapitulo(titulo=titulo, **{k: v for k, v in estatisticas.items() if k in campos})
+        registro.recuperados = list(registro.recuperados or [])
+        self.capitulos.append(registro)
+
+        r = registro
+        tempo_fmt = f"{int(r.duracao_segundos // 60)}m {int(r.duracao_segundos % 60)}s"
+        linhas = [
+            f"-- {titulo} --",
+            f"Blocos: {r.blocos}",
+            f"Tokens (entrada): {r.tokens:,}",
+            f"Tokens (saída):   {r.tokens_saida:,}",
+            f"Erros (fallback): {r.erros}",
+            f" - Revisados no 1º try: {r.rev1}",
+            f" - Revisados no 2º try: {r.rev2}",
+            f" - Mantidos como original: {r.orig}",
+            f"Cache: {r.cache_hits} hits / {r.cache_misses} misses",
+            f"Triagem: {r.triagem_dispensados} blocos dispensados ({r.triagem_tokens_poupados:,} tokens poupados)"
+            f" | auditoria: {r.triagem_alterados} de {r.triagem_auditados} alterados pelo LLM",
+            f"Duplicados: {r.duplicados} blocos copiados de outra ocorrência (contados no resultado dela)",
+            f"Abortos antecipados: {formatar_abortos(r.abortos)}",
+            f"Lotes: padding {r.desperdicio_padding:.1%} | {r.tokens_por_segundo:,.1f} tokens/s"
+            f" | {r.tamanho_medio_lote:.1f} blocos/lote (maior: {r.maior_lote})"
+            f" | recuos por falta de memória: {r.recuos_memoria}",
+            f"Decodificação: {formatar_orcamento(r.tokens_gerados, r.tokens_orcamento)}",
+        ]
+        if r.rascunho_propostos:
+            linhas.append(formatar_rascunho(r.rascunho_aceitos, r.rascunho_propostos))
+        if r.tempos_etapas:
+            linhas.append("Etapas: " + " | ".join(f"{etapa} {r.tempos_etapas[etapa]:.2f}s"
+                                                  for etapa in ETAPAS if etapa in r.tempos_etapas))
+        if r.recuperados:
+            linhas.append(f" - Blocos recuperados manualmente no final: {', '.join(str(i) for i in r.recuperados)}")
+        if r.retomado:
+            linhas.append("Retomado do checkpoint: revisado numa execução anterior")
+        linhas.append(f"Tempo: {tempo_fmt}")
+        self._escrever("\n".join(linhas) + "\n\n")
+
+        self._evento("capitulo", **asdict(registro))
+        self._exportar_prometheus()
+
+    def registrar_capitulo_reaproveitado(self, titulo: str):
+        """
+        Registra um capítulo inalterado, copiado da saída revisada anterior.
+        """
+        self.capitulos_reaproveitados += 1
+        self._escrever(f"-- {titulo} --\nInalterado: reaproveitado da revisão anterior\n\n")
+        self._evento("capitulo_reaproveitado", titulo=titulo)
+
+    def registrar_histograma(self, linhas: List[str], histograma: Optional[dict] = None):
+        """
+        Registra a distribuição de tamanho (tokens estimados) dos blocos segmentados.
+
+        Args:
+            linhas (List[str]): Histograma formatado (ver `processamento.segmentador.formatar_histograma`).
+            histograma (dict, opcional): Faixa -> quantidade de blocos, para o JSONL.
+        """
+        self._escrever("[📊] Tamanho dos blocos (tokens estimados):\n" + "".join(f"{linha}\n" for linha in linhas) + "\n")
+        if histograma is not None:
+            self._evento("histograma_blocos", faixas=histograma)
+
+    def registrar_etapas(self, linhas: List[str], relatorio: Optional[dict] = None):
+        """
+        Registra o tempo ocupado/ocioso de cada etapa do pipeline.
+
+        Args:
+            linhas (List[str]): Uma linha por etapa (ver `processamento.pipeline.formatar_relatorio`).
+            relatorio (dict, opcional): O mesmo relatório em dicionário, para o JSONL.
+        """
+        self._escrever("[⚙️] Etapas do pipeline:\n" + "".join(f" - {linha}\n" for linha in linhas) + "\n")
+        if relatorio is not None:
+            self._evento("pipeline", etapas=relatorio)
 
     def log_limpeza_perigosa(self, indice_bloco: int, antes: str, depois: str):
         """
         Registra diretamente no log principal quando um bloco é apagado pela limpeza.
         """
-        with open(self.log_path, "a", encoding="utf-8") as f:
-            f.write(f"[🚫 BLOCO DELETADO PELA LIMPEZA] | Bloco #{indice_bloco}\n")
-            f.write(">>> ANTES DA LIMPEZA:\n" + antes.strip() + "\n")
-            f.write(">>> DEPOIS DA LIMPEZA:\n" + depois.strip() + "\n")
-            f.write("=" * 100 + "\n")
+        self._escrever(
+            f"[🚫 BLOCO DELETADO PELA LIMPEZA] | Bloco #{indice_bloco}\n"
+            + ">>> ANTES DA LIMPEZA:\n" + antes.strip() + "\n"
+            + ">>> DEPOIS DA LIMPEZA:\n" + depois.strip() + "\n"
+            + "=" * 100 + "\n"
+        )
+        self._evento("limpeza_perigosa", indice_bloco=indice_bloco)
 
+    def log_auditoria_triagem(self, indice_bloco: int, original: str, revisado: str):
+        """
+        Registra um bloco que a triagem teria dispensado, mas que o LLM alterou na auditoria.
+        """
+        self._escrever(
+            f"[🔎 AUDITORIA DA TRIAGEM] | Bloco #{indice_bloco}\n"
+            + ">>> ORIGINAL (seria mantido):\n" + original.strip() + "\n"
+            + ">>> REVISADO PELO LLM:\n" + revisado.strip() + "\n"
+            + "=" * 100 + "\n"
+        )
+        self._evento("auditoria_triagem", indice_bloco=indice_bloco, original=original, revisado=revisado)
 
-    def finalizar_log(self):
+    def log_ajuste_lote(self, evento: str, de: int, para: int):
+        """
+        Registra uma mudança no limite do lote adaptativo ("recuo" por falta de memória ou "ampliacao").
         """
-        Consolida os totais ao final do processo.
+        if evento == "recuo":
+            self.recuos_lote += 1
+            self._escrever(f"[📉] Memória esgotada num lote de {de} blocos: limite reduzido para {para}\n")
+        else:
+            self._escrever(f"[📈] Limite do lote ampliado de {de} para {para} blocos\n")
+        self._evento("ajuste_lote", ajuste=evento, de=de, para=para)
+
+    def finalizar_log(self, desperdicio_padding: Optional[float] = None, tokens_por_segundo: Optional[float] = None,
+                      perfil: Optional[dict] = None):
+        """
+        Consolida os totais ao final do processo e fecha os arquivos.
+
+        Também acrescenta um resumo da execução ao `HISTORICO_REVISOES`.
+
+        Args:
+            desperdicio_padding (float, opcional): Padding acumulado do agendador de lotes.
+            tokens_por_segundo (float, opcional): Vazão acumulada de geração.
+            perfil (dict, opcional): Backend, modelo, dispositivo e trabalhadores da execução.
         """
         fim = datetime.now()
         total_segundos = (fim - self.inicio).total_seconds()
 
-        total_blocos = sum(b for b, _, _, _, _, _, _, _ in self.capitulos_info)
-        total_tokens_in = sum(tin for _, tin, _, _, _, _, _, _ in self.capitulos_info)
-        total_tokens_out = sum(tout for _, _, tout, _, _, _, _, _ in self.capitulos_info)
-        total_erros = sum(e for _, _, _, e, _, _, _, _ in self.capitulos_info)
-        total_rev1 = sum(r1 for _, _, _, _, _, r1, _, _ in self.capitulos_info)
-        total_rev2 = sum(r2 for _, _, _, _, _, _, r2, _ in self.capitulos_info)
-        total_orig = sum(o for _, _, _, _, _, _, _, o in self.capitulos_info)
-
-        media_capitulo = total_segundos / len(self.capitulos_info)
-
-        with open(self.log_path, "a", encoding="utf-8") as f:
-            f.write(f"[✓] Fim: {fim.strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Total de capítulos: {len(self.capitulos_info)}\n")
-            f.write(f"Blocos totais: {total_blocos}\n")
-            f.write(f"Tokens totais (entrada): {total_tokens_in:,}\n")
-            f.write(f"Tokens totais (saída):   {total_tokens_out:,}\n")
-            f.write(f"Erros totais (fallback): {total_erros}\n")
-            f.write(f" - Revisados no 1º try: {total_rev1}\n")
-            f.write(f" - Revisados no 2º try: {total_rev2}\n")
-            f.write(f" - Mantidos como original: {total_orig}\n")
-            f.write(
-                f"Tempo total: {int(total_segundos // 3600)}h "
-                f"{int((total_segundos % 3600) // 60)}m "
-                f"{int(total_segundos % 60)}s\n"
-            )
-            f.write(f"Tempo médio por capítulo: {int(media_capitulo // 60)}m {int(media_capitulo % 60)}s\n")
-            if hasattr(self, "capitulos_recuperados") and self.capitulos_recuperados:
-                f.write("\n[🔁] Recuperações manuais ao final da revisão:\n")
-                for titulo, blocos in self.capitulos_recuperados:
-                    f.write(f" - {titulo}: blocos {', '.join(str(i) for i in blocos)}\n")
-    
+        totais = {campo: sum(getattr(r, campo) for r in self.capitulos)
+                  for campo in ("blocos", "tokens", "tokens_saida", "erros", "rev1", "rev2", "orig",
+                                "cache_hits", "cache_misses", "tokens_gerados", "tokens_orcamento", "retentativas",
+                                "triagem_dispensados", "triagem_tokens_poupados", "triagem_auditados",
+                                "triagem_alterados", "duplicados", "rascunho_propostos", "rascunho_aceitos")}
+        tempos = {etapa: sum(r.tempos_etapas.get(etapa, 0.0) for r in self.capitulos) for etapa in ETAPAS}
+        abortos: Dict[str, int] = {}
+        for r in self.capitulos:
+            for motivo, n in r.abortos.items():
+                abortos[motivo] = abortos.get(motivo, 0) + n
+        recuperados = [(r.titulo, r.recuperados) for r in self.capitulos if r.recuperados]
 
+        media_capitulo = total_segundos / max(1, len(self.capitulos))
+        retomados = sum(r.retomado for r in self.capitulos)
+
+        linhas = [
+            f"[✓] Fim: {fim.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"Total de capítulos: {len(self.capitulos) + self.capitulos_reaproveitados}",
+            f" - Regenerados: {len(self.capitulos)}" + (f" ({retomados} retomados do checkpoint)" if retomados else ""),
+            f" - Reaproveitados (inalterados): {self.capitulos_reaproveitados}",
+            f"Blocos totais: {totais['blocos']}",
+            f"Tokens totais (entrada): {totais['tokens']:,}",
+            f"Tokens totais (saída):   {totais['tokens_saida']:,}",
+            f"Erros totais (fallback): {totais['erros']}",
+            f" - Revisados no 1º try: {totais['rev1']}",
+            f" - Revisados no 2º try: {totais['rev2']}",
+            f" - Mantidos como original: {totais['orig']}",
+            f"Cache: {totais['cache_hits']} hits / {totais['cache_misses']} misses",
+            f"Triagem: {totais['triagem_dispensados']} blocos dispensados"
+            f" ({totais['triagem_tokens_poupados']:,} tokens poupados)"
+            f" | auditoria: {totais['triagem_alterados']} de {totais['triagem_auditados']} alterados pelo LLM",
+            f"Duplicados colapsados: {totais['duplicados']} blocos copiados sem gerar",
+            f"Abortos antecipados: {formatar_abortos(abortos)}",
+            f"Recuos do lote por falta de memória: {self.recuos_lote}",
+            f"Decodificação: {formatar_orcamento(totais['tokens_gerados'], totais['tokens_orcamento'])}",
+        ]
+        if totais["rascunho_propostos"]:
+            linhas.append(formatar_rascunho(totais["rascunho_aceitos"], totais["rascunho_propostos"]))
+        if desperdicio_padding is not None and tokens_por_segundo is not None:
+            linhas.append(f"Lotes: padding {desperdicio_padding:.1%} | {tokens_por_segundo:,.1f} tokens/s")
+        linhas.append("Etapas: " + " | ".join(f"{etapa} {segundos:.1f}s" for etapa, segundos in tempos.items()))
+        linhas.append(
+            f"Tempo total: {int(total_segundos // 3600)}h "
+            f"{int((total_segundos % 3600) // 60)}m "
+            f"{int(total_segundos % 60)}s"
+        )
+        linhas.append(f"Tempo médio por capítulo: {int(media_capitulo // 60)}m {int(media_capitulo % 60)}s")
+        if recuperados:
+            linhas.append("\n[🔁] Recuperações manuais ao final da revisão:")
+            for titulo, blocos in recuperados:
+                linhas.append(f" - {titulo}: blocos {', '.join(str(i) for i in blocos)}")
+        self._escrever("\n".join(linhas) + "\n")
 
+        self._evento("fim", duracao_segundos=total_segundos, capitulos=len(self.capitulos),
+                     capitulos_reaproveitados=self.capitulos_reaproveitados, tempos_etapas=tempos,
+                     desperdicio_padding=desperdicio_padding, tokens_por_segundo=tokens_por_segundo,
+                     abortos=abortos, recuos_lote=self.recuos_lote, **totais)
+        self._exportar_prometheus()
+        self._registrar_historico(fim, total_segundos, tokens_por_segundo, perfil or {})
+        self.fechar()
 
+    def _registrar_historico(self, fim: datetime, total_segundos: float, tokens_por_segundo: Optional[float],
+                             perfil: dict) -> None:
+        if not HISTORICO_REVISOES:
+            return
+        # Só o trabalho desta execução: os capítulos retomados do checkpoint foram
+        # gerados antes de `self.inicio` e inflariam o ritmo usado no planejamento
+        atuais = [r for r in self.capitulos if not r.retomado]
+        soma = lambda campo: sum(getattr(r, campo) for r in atuais)  # noqa: E731
+        registro = {
+            "arquivo": self.nome_arquivo_base,
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "fim": fim.isoformat(timespec="seconds"),
+            "duracao_segundos": total_segundos,
+            "capitulos": len(atuais),
+            "capitulos_retomados": len(self.capitulos) - len(atuais),
+            "capitulos_reaproveitados": self.capitulos_reaproveitados,
+            "blocos": soma("blocos"),
+            "tokens": soma("tokens"),
+            "tokens_gerados": soma("tokens_gerados"),
+            "tempo_geracao": sum(r.tempos_etapas.get("geracao", 0.0) for r in atuais),
+            "tokens_por_segundo": tokens_por_segundo,
+            **perfil,
+        }
+        if os.path.dirname(HISTORICO_REVISOES):
+            os.makedirs(os.path.dirname(HISTORICO_REVISOES), exist_ok=True)
+        with open(HISTORICO_REVISOES, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    def fechar(self) -> None:
+        """
+        Fecha os arquivos de log (chamado por `finalizar_log`).
+        """
+        with self._lock:
+            self._arquivo.close()
+            if self._jsonl is not None:
+                self._jsonl.close()